@@ -4,14 +4,14 @@ from flask import Flask, request, redirect, session, abort
 from flask_login import LoginManager
 from flask_wtf.csrf import CsrfProtect
 
-import dmapiclient
 from dmutils import init_app, flask_featureflags
-from dmutils.user import User
 
 from config import configs
+from . import cache, parallel, timing
+from .api_client import DataAPIClient
 
 
-data_api_client = dmapiclient.DataAPIClient()
+data_api_client = DataAPIClient()
 login_manager = LoginManager()
 feature_flags = flask_featureflags.FeatureFlag()
 csrf = CsrfProtect()
@@ -19,12 +19,15 @@ csrf = CsrfProtect()
 
 from app.main.helpers.services import parse_document_upload_time
 from app.main.helpers.frameworks import question_references
+from app.main.helpers.users import load_user as load_cached_user
+from app.main.helpers.uploads import BoundedUploadRequest
 
 
 def create_app(config_name):
     application = Flask(__name__,
                         static_folder='static/',
                         static_url_path=configs[config_name].STATIC_URL_PATH)
+    application.request_class = BoundedUploadRequest
 
     init_app(
         application,
@@ -33,8 +36,11 @@ def create_app(config_name):
         feature_flags=feature_flags,
         login_manager=login_manager,
     )
+    cache.init_app(application)
+    parallel.init_app(application)
+    timing.init_app(application)
 
-    from .main import main as main_blueprint
+    from .main import main as main_blueprint, content_loader
     from .status import status as status_blueprint
 
     application.register_blueprint(status_blueprint,
@@ -43,6 +49,7 @@ def create_app(config_name):
                                    url_prefix='/suppliers')
     login_manager.login_message_category = "must_login"
     main_blueprint.config = application.config.copy()
+    content_loader.warm_up(application.config['DM_PRELOAD_CONTENT_FRAMEWORKS'])
 
     csrf.init_app(application)
 
@@ -79,7 +86,7 @@ def create_app(config_name):
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.load_user(data_api_client, user_id)
+    return load_cached_user(data_api_client, user_id)
 
 
 def config_attrs(config):
@@ -0,0 +1,340 @@
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+import dmapiclient
+import requests
+from dmapiclient.errors import HTTPError, InvalidResponse
+from flask import current_app, _request_ctx_stack
+from requests.adapters import HTTPAdapter
+from six.moves.urllib.parse import urljoin
+
+from .cache import TTLCache
+from .timing import timer
+
+
+logger = logging.getLogger(__name__)
+
+
+frameworks_cache = TTLCache('frameworks', max_size=100)
+
+# Frameworks in these statuses change only rarely, so can be cached for longer
+SETTLED_FRAMEWORK_STATUSES = ['live', 'expired']
+
+
+class DataAPIClient(dmapiclient.DataAPIClient):
+    """Data API client that memoizes read requests for the lifetime of a request.
+
+    GET responses are kept on the request context, keyed on the request URL and query
+    parameters, so repeated reads of the same resource within one request only
+    reach the API once. Any write (POST, PUT, PATCH or DELETE) clears the cache
+    so later reads in the same request see the result of the write.
+
+    Requests are sent through a `requests.Session` kept for the life of the
+    worker process, so connections to the API are reused rather than opened
+    (and TLS-negotiated) for every call. The size of the connection pool and
+    the connect and read timeouts come from the `DM_DATA_API_*` settings.
+
+    Identical GET requests made at the same time by different threads in a
+    worker are coalesced: while one is waiting for the API, the others wait
+    for its response instead of sending requests of their own. After a
+    write, a request only waits for reads that were sent after the write
+    finished, so it still sees the result of the write.
+
+    Framework records are also kept in a process-wide cache, shared by all
+    requests. Frameworks that are about to change status (or open and close
+    clarification questions) expire after `DM_FRAMEWORK_CACHE_TTL` seconds,
+    live and expired ones after `DM_SETTLED_FRAMEWORK_CACHE_TTL`. Seeing a
+    framework whose status has changed flushes every cached framework.
+
+    """
+    framework_cache_ttl = 0
+    settled_framework_cache_ttl = 0
+
+    pool_connections = 10
+    pool_maxsize = 10
+    pool_block = False
+    connect_timeout = None
+    read_timeout = None
+
+    def __init__(self, *args, **kwargs):
+        super(DataAPIClient, self).__init__(*args, **kwargs)
+        self._framework_states = {}
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+        self._pool_stats = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0, 'saturated': 0}
+        self._pool_stats_lock = threading.Lock()
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self._request_cache_lock = threading.Lock()
+        self._write_generation = 0
+        self.coalesced = 0
+
+    def init_app(self, app):
+        super(DataAPIClient, self).init_app(app)
+        self.framework_cache_ttl = app.config['DM_FRAMEWORK_CACHE_TTL']
+        self.settled_framework_cache_ttl = app.config['DM_SETTLED_FRAMEWORK_CACHE_TTL']
+        self.pool_connections = app.config['DM_DATA_API_POOL_CONNECTIONS']
+        self.pool_maxsize = app.config['DM_DATA_API_POOL_MAXSIZE']
+        self.pool_block = app.config['DM_DATA_API_POOL_BLOCK']
+        self.connect_timeout = app.config['DM_DATA_API_CONNECT_TIMEOUT']
+        self.read_timeout = app.config['DM_DATA_API_READ_TIMEOUT']
+        app.after_request(self._log_request_cache_stats)
+
+    def get_framework(self, framework_slug):
+        key = ('framework', framework_slug)
+        response = frameworks_cache.get(key)
+        if response is None:
+            response = super(DataAPIClient, self).get_framework(framework_slug)
+            self._cache_frameworks(key, response, [response['frameworks']])
+
+        return response
+
+    def find_frameworks(self):
+        key = ('frameworks',)
+        response = frameworks_cache.get(key)
+        if response is None:
+            response = super(DataAPIClient, self).find_frameworks()
+            self._cache_frameworks(key, response, response['frameworks'])
+
+        return response
+
+    def flush_framework_cache(self):
+        frameworks_cache.clear()
+
+    def _cache_frameworks(self, key, response, frameworks):
+        states = {
+            framework['slug']: (framework['status'], framework.get('clarificationQuestionsOpen'))
+            for framework in frameworks
+        }
+        if any(self._framework_states.get(slug, state) != state for slug, state in states.items()):
+            frameworks_cache.clear()
+        self._framework_states.update(states)
+
+        if all(framework['status'] in SETTLED_FRAMEWORK_STATUSES for framework in frameworks):
+            ttl = self.settled_framework_cache_ttl
+        else:
+            ttl = self.framework_cache_ttl
+        frameworks_cache.set(key, response, ttl)
+
+    def pool_stats(self):
+        """Usage of the connection pool since this worker process started.
+
+        `saturated` counts requests made while every pooled connection was
+        already in use: each of those had to open a connection of its own (or
+        wait for one, if `DM_DATA_API_POOL_BLOCK` is set). If it keeps growing,
+        the pool is too small for the number of threads making API calls.
+        `coalesced` counts reads that waited for an identical one already in
+        flight instead of being sent.
+
+        """
+        with self._pool_stats_lock:
+            stats = dict(self._pool_stats, pool_maxsize=self.pool_maxsize, coalesced=self.coalesced)
+
+        session = self._session
+        if session is not None and self._session_pid == os.getpid():
+            pools = session.get_adapter(self.base_url or 'http://').poolmanager.pools
+            stats['connections_opened'] = sum(pools[key].num_connections for key in pools.keys())
+
+        return stats
+
+    def _request(self, method, url, data=None, params=None):
+        if method != 'GET':
+            cache = self._get_request_cache()
+            if cache is not None:
+                cache['responses'].clear()
+            try:
+                return self._send_request(method, url, data=data, params=params)
+            finally:
+                write_generation = self._finish_write()
+                if cache is not None:
+                    cache['write_generation'] = write_generation
+
+        key = (url, _freeze(params))
+        cache = self._get_request_cache()
+        if cache is None:
+            return self._send_coalesced_request(key, url, params)
+
+        with self._request_cache_lock:
+            cached = key in cache['responses']
+            cache['hits' if cached else 'misses'] += 1
+        if not cached:
+            cache['responses'][key] = self._send_coalesced_request(
+                key, url, params, cache.get('write_generation', 0))
+
+        # Views update response dictionaries in place, so every caller gets its own copy
+        return copy.deepcopy(cache['responses'][key])
+
+    def _finish_write(self):
+        # Reads sent from now on may see the write, so later reads mustn't wait for earlier ones
+        with self._in_flight_lock:
+            self._write_generation += 1
+            return self._write_generation
+
+    def _send_coalesced_request(self, key, url, params, write_generation=0):
+        """Send a GET request, or wait for an identical one sent since `write_generation`"""
+        with self._in_flight_lock:
+            call = self._in_flight.get(key)
+            leader = call is None or call.write_generation < write_generation
+            if leader:
+                call = self._in_flight[key] = _InFlightCall(self._write_generation)
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            return call.wait()
+
+        try:
+            call.response = self._send_request('GET', url, params=params)
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            with self._in_flight_lock:
+                # A later read may have replaced this one, if it needed to see a write
+                if self._in_flight.get(key) is call:
+                    del self._in_flight[key]
+            call.done.set()
+
+        # Waiters copy the response after it's returned, so they need an unchanged one
+        return copy.deepcopy(call.response) if call.waiters else call.response
+
+    def _send_request(self, method, url, data=None, params=None):
+        # Mirrors `dmapiclient.BaseAPIClient._request`, but sends the request
+        # through the pooled session with connect and read timeouts
+        if not self.enabled:
+            return None
+
+        url = urljoin(self.base_url, url)
+
+        headers = {
+            "Content-type": "application/json",
+            "Authorization": "Bearer {}".format(self.auth_token),
+            "User-agent": "DM-API-Client/{}".format(dmapiclient.__version__),
+        }
+        headers = self._add_request_id_header(headers)
+
+        start_time = time.time()
+        self._start_pooled_request()
+        try:
+            with timer('api'):
+                response = self._get_session().request(
+                    method, url,
+                    headers=headers,
+                    data=json.dumps(data) if data is not None else None,
+                    params=params,
+                    timeout=(self.connect_timeout, self.read_timeout))
+            response.raise_for_status()
+        except requests.RequestException as e:
+            api_error = HTTPError.create(e)
+            logger.log(
+                logging.INFO if api_error.status_code == 404 else logging.WARNING,
+                "API {api_method} request on {api_url} failed with {api_status} '{api_error}'",
+                extra={
+                    'api_method': method,
+                    'api_url': url,
+                    'api_status': api_error.status_code,
+                    'api_error': api_error.message,
+                    'api_time': time.time() - start_time,
+                })
+            raise api_error
+        finally:
+            self._finish_pooled_request()
+
+        logger.info(
+            "API {api_method} request on {api_url} finished in {api_time}",
+            extra={
+                'api_method': method,
+                'api_url': url,
+                'api_status': response.status_code,
+                'api_time': time.time() - start_time,
+            })
+
+        try:
+            return response.json()
+        except ValueError:
+            raise InvalidResponse(response, message="No JSON object could be decoded")
+
+    def _get_session(self):
+        # Pooled connections can't be shared with forked worker processes, so
+        # each process opens its own
+        with self._session_lock:
+            if self._session is None or self._session_pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize,
+                    pool_block=self.pool_block)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+                self._session_pid = os.getpid()
+
+        return self._session
+
+    def _start_pooled_request(self):
+        with self._pool_stats_lock:
+            stats = self._pool_stats
+            if stats['in_flight'] >= self.pool_maxsize:
+                stats['saturated'] += 1
+            stats['requests'] += 1
+            stats['in_flight'] += 1
+            stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+
+    def _finish_pooled_request(self):
+        with self._pool_stats_lock:
+            self._pool_stats['in_flight'] -= 1
+
+    def _get_request_cache(self):
+        ctx = _request_ctx_stack.top
+        if ctx is None:
+            return None
+        # Parallel calls share the request context between threads, which must all get the same cache
+        with self._request_cache_lock:
+            if not hasattr(ctx, 'data_api_cache'):
+                ctx.data_api_cache = {'responses': {}, 'hits': 0, 'misses': 0}
+        return ctx.data_api_cache
+
+    @staticmethod
+    def _log_request_cache_stats(response):
+        cache = getattr(_request_ctx_stack.top, 'data_api_cache', None)
+        if cache and (cache['hits'] or cache['misses']):
+            current_app.logger.info(
+                "data_api_client.request_cache: {hits} hits, {misses} misses",
+                extra={'hits': cache['hits'], 'misses': cache['misses']})
+        return response
+
+
+class _InFlightCall(object):
+    def __init__(self, write_generation):
+        self.write_generation = write_generation
+        self.done = threading.Event()
+        self.waiters = 0
+        self.response = None
+        self.exception = None
+
+    def wait(self):
+        self.done.wait()
+        if self.exception is not None:
+            raise self.exception
+        # The leader's caller is free to change its response, so waiters get copies
+        return copy.deepcopy(self.response)
+
+
+def _freeze(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        params = params.items()
+    return tuple(sorted((key, _freeze_value(value)) for key, value in params))
+
+
+def _freeze_value(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return value
@@ -0,0 +1,189 @@
+import copy
+import errno
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import session
+from six.moves.urllib.parse import quote
+
+
+_caches = OrderedDict()
+
+
+class TTLCache(object):
+    """A thread-safe, size-bounded, process-wide cache whose entries expire.
+
+    Values are deep-copied on the way in and out, so callers are free to
+    update the dictionaries they get back. Entries set with a `ttl` of None
+    never expire; a `ttl` of 0 or less disables caching for that entry.
+
+    Each worker process has its own copy of every cache. To flush a cache in
+    all workers on a host, `flush_caches` touches a stamp file in
+    `DM_CACHE_FLUSH_DIR`, which caches check at most once a second.
+
+    `invalidate` drops a single entry in all workers on a host the same way,
+    with a stamp file for the key. Caches made with `check_invalidations`
+    look for the key's stamp on every `get`, so the entry is never served
+    again once `invalidate` has returned.
+
+    """
+    flush_dir = None
+    flush_check_interval = 1
+    # Stamp file times may be rounded down, so entries set this soon before a stamp count as invalidated
+    stamp_resolution = 1
+
+    def __init__(self, name, max_size=1000, check_invalidations=False):
+        self.name = name
+        self.max_size = max_size
+        self.check_invalidations = check_invalidations
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flushed_at = time.time()
+        self._flush_checked_at = 0
+
+        _caches[name] = self
+
+    def get(self, key, default=None):
+        self._check_flush_stamp()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            expired = entry is not None and entry[0] is not None and entry[0] <= time.time()
+            if entry is None or expired or self._is_invalidated(key, entry):
+                self.misses += 1
+                return default
+
+            # Re-insert the entry to mark it as the most recently used
+            self._entries[key] = entry
+            self.hits += 1
+
+        return copy.deepcopy(entry[1])
+
+    def set(self, key, value, ttl=None):
+        if ttl is not None and ttl <= 0:
+            return
+
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, value, now)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, key):
+        """Delete an entry here and in other workers on this host that check for invalidations"""
+        self.delete(key)
+        if self.flush_dir:
+            _touch(self._key_stamp_path(key))
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._flushed_at = time.time()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def _is_invalidated(self, key, entry):
+        if not (self.check_invalidations and self.flush_dir):
+            return False
+
+        try:
+            invalidated_at = os.path.getmtime(self._key_stamp_path(key))
+        except OSError:
+            return False
+
+        return entry[2] <= invalidated_at + self.stamp_resolution
+
+    def _key_stamp_path(self, key):
+        return os.path.join(self.flush_dir, '{}.keys'.format(self.name), quote(repr(key), safe=''))
+
+    def _check_flush_stamp(self):
+        if not self.flush_dir:
+            return
+
+        now = time.time()
+        if now - self._flush_checked_at < self.flush_check_interval:
+            return
+        self._flush_checked_at = now
+
+        try:
+            flushed_at = os.path.getmtime(os.path.join(self.flush_dir, self.name))
+        except OSError:
+            return
+
+        if flushed_at > self._flushed_at:
+            self.clear()
+
+
+def init_app(app):
+    TTLCache.flush_dir = app.config['DM_CACHE_FLUSH_DIR']
+
+
+def flush_caches(names=None):
+    """Clear the named caches (or all of them) here and in other workers on this host"""
+    names = list(_caches) if names is None else names
+    for name in names:
+        if name not in _caches:
+            raise ValueError("Unknown cache: {}".format(name))
+
+    for name in names:
+        _caches[name].clear()
+        if TTLCache.flush_dir:
+            _touch(os.path.join(TTLCache.flush_dir, name))
+
+
+def session_cache_key(name, *key):
+    """A cache key for the current user's `name` data that `invalidate_session_cache_key` can make stale.
+
+    Each worker process has its own caches, so deleting an entry only drops
+    it in the worker that handles the request. The key also holds a version
+    number for `name` that's kept in the user's session instead: bumping it
+    means no worker can answer the user's later requests from an entry cached
+    before the change, whichever worker they're sent to.
+
+    """
+    return key + (session.get(_session_version_name(name), 0),)
+
+
+def invalidate_session_cache_key(cache, name, *key):
+    """Drop the current user's entry for `session_cache_key(name, *key)` from `cache` in every worker"""
+    cache.delete(session_cache_key(name, *key))
+    session[_session_version_name(name)] = session.get(_session_version_name(name), 0) + 1
+
+
+def _session_version_name(name):
+    return '{}_version'.format(name)
+
+
+def get_cache_stats():
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def _touch(path):
+    try:
+        os.makedirs(os.path.dirname(path))
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+    with open(path, 'a'):
+        os.utime(path, None)
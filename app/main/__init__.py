@@ -1,26 +1,32 @@
 from flask import Blueprint
-from dmcontent.content_loader import ContentLoader
+
+from .helpers.content import LazyContentLoader
+
+# Built by `python application.py build_content_snapshot`
+CONTENT_SNAPSHOT_PATH = 'app/content-snapshot.pickle'
 
 main = Blueprint('main', __name__)
 
-content_loader = ContentLoader('app/content')
-content_loader.load_manifest('g-cloud-6', 'services', 'edit_service')
-content_loader.load_messages('g-cloud-6', ['dates'])
+content_loader = LazyContentLoader('app/content')
+content_loader.declare_manifest('g-cloud-6', 'services', 'edit_service')
+content_loader.declare_messages('g-cloud-6', ['dates'])
+
+content_loader.declare_manifest('g-cloud-7', 'services', 'edit_service')
+content_loader.declare_manifest('g-cloud-7', 'services', 'edit_submission')
+content_loader.declare_manifest('g-cloud-7', 'declaration', 'declaration')
+content_loader.declare_messages('g-cloud-7', ['dates'])
 
-content_loader.load_manifest('g-cloud-7', 'services', 'edit_service')
-content_loader.load_manifest('g-cloud-7', 'services', 'edit_submission')
-content_loader.load_manifest('g-cloud-7', 'declaration', 'declaration')
-content_loader.load_messages('g-cloud-7', ['dates'])
+content_loader.declare_manifest('digital-outcomes-and-specialists', 'declaration', 'declaration')
+content_loader.declare_manifest('digital-outcomes-and-specialists', 'services', 'edit_submission')
+content_loader.declare_manifest('digital-outcomes-and-specialists', 'brief-responses', 'edit_brief_response')
+content_loader.declare_messages('digital-outcomes-and-specialists', ['dates'])
 
-content_loader.load_manifest('digital-outcomes-and-specialists', 'declaration', 'declaration')
-content_loader.load_manifest('digital-outcomes-and-specialists', 'services', 'edit_submission')
-content_loader.load_manifest('digital-outcomes-and-specialists', 'brief-responses', 'edit_brief_response')
-content_loader.load_messages('digital-outcomes-and-specialists', ['dates'])
+content_loader.declare_manifest('g-cloud-8', 'services', 'edit_service')
+content_loader.declare_manifest('g-cloud-8', 'services', 'edit_submission')
+content_loader.declare_manifest('g-cloud-8', 'declaration', 'declaration')
+content_loader.declare_messages('g-cloud-8', ['dates'])
 
-content_loader.load_manifest('g-cloud-8', 'services', 'edit_service')
-content_loader.load_manifest('g-cloud-8', 'services', 'edit_submission')
-content_loader.load_manifest('g-cloud-8', 'declaration', 'declaration')
-content_loader.load_messages('g-cloud-8', ['dates'])
+content_loader.load_snapshot(CONTENT_SNAPSHOT_PATH)
 
 
 @main.after_request
@@ -3,9 +3,12 @@ import base64
 import flask_login
 import six
 from functools import wraps
+from dmutils import email
 from flask import current_app, flash
 from flask_login import current_user
 
+from ...timing import timed
+
 
 def hash_email(email):
     m = hashlib.sha256()
@@ -23,3 +26,8 @@ def login_required(func):
             return current_app.login_manager.unauthorized()
         return func(*args, **kwargs)
     return decorated_view
+
+
+@timed('email')
+def send_email(*args, **kwargs):
+    return email.send_email(*args, **kwargs)
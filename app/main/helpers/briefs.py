@@ -7,7 +7,14 @@ from flask import abort, current_app, render_template
 from flask_login import current_user
 
 from dmapiclient.audit import AuditTypes
-from dmutils.email import send_email, MandrillException
+from dmutils.email import MandrillException
+
+from ...cache import TTLCache, invalidate_session_cache_key, session_cache_key
+from . import send_email
+
+
+brief_eligibility_cache = TTLCache('brief_eligibility', max_size=5000)
+brief_responses_cache = TTLCache('brief_responses', max_size=5000)
 
 
 def get_brief(data_api_client, brief_id, allowed_statuses=None):
@@ -23,12 +30,39 @@ def get_brief(data_api_client, brief_id, allowed_statuses=None):
 
 
 def is_supplier_eligible_for_brief(data_api_client, supplier_id, brief):
-    return data_api_client.is_supplier_eligible_for_brief(supplier_id, brief['id'])
+    key = (supplier_id, brief['id'])
+    is_eligible = brief_eligibility_cache.get(key)
+    if is_eligible is None:
+        is_eligible = data_api_client.is_supplier_eligible_for_brief(supplier_id, brief['id'])
+        brief_eligibility_cache.set(key, is_eligible, current_app.config['DM_BRIEF_CACHE_TTL'])
+
+    return is_eligible
+
+
+def get_brief_responses(data_api_client, supplier_id, brief_id):
+    key = _brief_responses_cache_key(supplier_id, brief_id)
+    brief_responses = brief_responses_cache.get(key)
+    if brief_responses is None:
+        brief_responses = data_api_client.find_brief_responses(
+            brief_id=brief_id, supplier_id=supplier_id)['briefResponses']
+        brief_responses_cache.set(key, brief_responses, current_app.config['DM_BRIEF_CACHE_TTL'])
+
+    return brief_responses
 
 
 def supplier_has_a_brief_response(data_api_client, supplier_id, brief_id):
-    brief_responses = data_api_client.find_brief_responses(brief_id=brief_id, supplier_id=supplier_id)['briefResponses']
-    return len(brief_responses) != 0
+    return len(get_brief_responses(data_api_client, supplier_id, brief_id)) != 0
+
+
+def brief_response_created(supplier_id, brief_id, brief_response):
+    """Replace the current user's cached responses to a brief with the one they've just created"""
+    invalidate_session_cache_key(brief_responses_cache, 'brief_responses', supplier_id, brief_id)
+    brief_responses_cache.set(
+        _brief_responses_cache_key(supplier_id, brief_id), [brief_response], current_app.config['DM_BRIEF_CACHE_TTL'])
+
+
+def _brief_responses_cache_key(supplier_id, brief_id):
+    return session_cache_key('brief_responses', supplier_id, brief_id)
 
 
 def send_brief_clarification_question(data_api_client, brief, clarification_question):
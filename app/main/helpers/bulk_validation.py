@@ -0,0 +1,113 @@
+import json
+import sys
+import time
+from multiprocessing import Pool
+
+from .. import content_loader
+from .validation import VALIDATORS, get_field_index, get_validator
+
+# Declarations sent to each worker process at a time
+CHUNK_SIZE = 200
+# Progress is reported after every this many declarations
+PROGRESS_INTERVAL = 5000
+
+_worker_state = {}
+
+
+def validate_declarations(framework_slug, input_file, output_file, processes=None, progress_file=sys.stderr):
+    """Validate every declaration in a JSONL dump, writing one JSONL result per supplier.
+
+    Each input line is a JSON object with the supplier's `supplierId` and
+    their `declaration`. Each output line has the `supplierId`, the `status`
+    the declaration should have (`complete` or `started`), whether that's
+    different from its saved status and its error keys by question id, in
+    the same order as the input. Lines that can't be read get an `error`.
+
+    Declarations are validated by a pool of `processes` worker processes
+    (one per CPU by default), and progress is written to `progress_file`.
+    Returns counts of the declarations validated and the time taken.
+
+    """
+    if framework_slug not in VALIDATORS:
+        raise ValueError("No declaration validator for {}".format(framework_slug))
+
+    # Parse and index the content before forking, so every worker starts with it
+    get_field_index(content_loader.get_manifest(framework_slug, 'declaration'), framework_slug)
+
+    stats = {'declarations': 0, 'complete': 0, 'started': 0, 'status_changed': 0, 'unreadable': 0}
+    start_time = time.time()
+
+    pool = Pool(processes, _init_worker, (framework_slug,))
+    try:
+        for result in pool.imap(_validate_line, input_file, CHUNK_SIZE):
+            if result is None:
+                continue
+            output_file.write(json.dumps(result, sort_keys=True) + '\n')
+
+            stats['declarations'] += 1
+            if 'error' in result:
+                stats['unreadable'] += 1
+            else:
+                stats[result['status']] += 1
+                stats['status_changed'] += result['statusChanged']
+
+            if stats['declarations'] % PROGRESS_INTERVAL == 0:
+                _report_progress(progress_file, stats, start_time)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    stats['seconds'] = time.time() - start_time
+    stats['per_second'] = stats['declarations'] / stats['seconds'] if stats['seconds'] else 0.0
+    _report_progress(progress_file, stats, start_time)
+    return stats
+
+
+def _init_worker(framework_slug):
+    _worker_state['framework'] = {'slug': framework_slug}
+    _worker_state['content'] = content_loader.get_manifest(framework_slug, 'declaration')
+
+
+def _validate_line(line):
+    if not line.strip():
+        return None
+
+    try:
+        record = json.loads(line)
+        supplier_id = record['supplierId']
+        answers = record.get('declaration') or {}
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return {'error': "Couldn't read declaration: {}".format(e), 'line': line.strip()[:100]}
+
+    return dict(validate_declaration(_worker_state['framework'], _worker_state['content'], answers),
+                supplierId=supplier_id)
+
+
+def validate_declaration(framework, content, answers):
+    """The status a declaration should have and the errors for its questions"""
+    validator = get_validator(framework, content, answers)
+    # Only errors for questions in the manifest affect the status, as when the declaration is saved
+    questions = validator.field_index.questions
+    errors = dict((field, error) for field, error in validator.errors().items() if field in questions)
+    status = 'started' if errors else 'complete'
+
+    return {
+        'status': status,
+        'statusChanged': answers.get('status') != status,
+        'errors': errors,
+    }
+
+
+def _report_progress(progress_file, stats, start_time):
+    if progress_file is None:
+        return
+
+    elapsed = time.time() - start_time
+    progress_file.write(
+        "Validated {declarations} declarations in {elapsed:.1f}s ({rate:.0f} a second): {complete} complete, "
+        "{started} started, {status_changed} with a changed status, {unreadable} unreadable\n".format(
+            elapsed=elapsed, rate=stats['declarations'] / elapsed if elapsed else 0.0, **stats))
+    progress_file.flush()
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+
+import dmcontent
+import pkg_resources
+from dmcontent.content_loader import ContentLoader
+from six.moves import cPickle as pickle
+
+
+logger = logging.getLogger(__name__)
+
+# Filtered manifests are dropped when there are more than this many
+MAX_FILTERED_MANIFESTS = 500
+
+
+class LazyContentLoader(ContentLoader):
+    """A content loader that parses manifests and messages the first time they're used.
+
+    Manifests and message blocks are declared when the app is imported, but
+    their YAML is only read when a view first asks for them, so workers start
+    serving requests without parsing content for frameworks they may never
+    show. `warm_up` loads declared content straight away.
+
+    Loaded content can be saved to a snapshot file by `save_snapshot` as part
+    of the build, and restored without parsing any YAML by `load_snapshot`.
+    Snapshots record a hash of the content files and declarations they were
+    built from and of the Python and dmcontent versions, and are ignored once
+    any of them has changed.
+
+    `get_filtered_manifest` memoizes filtered manifests, keyed on just the
+    context fields the manifest's questions depend on. `get_lot_manifest`
+    and `get_first_editable_section` serve the per-lot manifests and first
+    sections used when starting a new draft or brief response.
+
+    """
+    def __init__(self, content_path, *args, **kwargs):
+        super(LazyContentLoader, self).__init__(content_path, *args, **kwargs)
+        self._content_path = content_path
+        self._declared_manifests = {}
+        self._declared_messages = {}
+        self._loaded = set()
+        self._load_lock = threading.RLock()
+        self._dependency_fields = {}
+        self._filtered_manifests = {}
+        self._first_editable_sections = {}
+
+    def declare_manifest(self, framework_slug, question_set, manifest):
+        self._declared_manifests[(framework_slug, manifest)] = question_set
+
+    def declare_messages(self, framework_slug, blocks):
+        self._declared_messages.setdefault(framework_slug, []).extend(blocks)
+
+    def get_manifest(self, framework_slug, manifest):
+        self._load_declared_manifest(framework_slug, manifest)
+        return super(LazyContentLoader, self).get_manifest(framework_slug, manifest)
+
+    get_builder = get_manifest
+
+    def get_filtered_manifest(self, framework_slug, manifest, context):
+        """Return `get_manifest(framework_slug, manifest).filter(context)`, reusing earlier results.
+
+        Filtering only looks at the context fields named in the questions'
+        `depends` rules, so drafts that agree on those fields (typically
+        drafts in the same lot) share a filtered manifest. The manifest is
+        shared between requests, so callers mustn't change it.
+
+        """
+        fields = self._get_dependency_fields(framework_slug, manifest)
+        key = (framework_slug, manifest, tuple(_fingerprint(context, field) for field in fields))
+
+        filtered_manifest = self._filtered_manifests.get(key)
+        if filtered_manifest is None:
+            filtered_manifest = self.get_manifest(framework_slug, manifest).filter(context)
+            with self._load_lock:
+                if len(self._filtered_manifests) >= MAX_FILTERED_MANIFESTS:
+                    self._filtered_manifests.clear()
+                self._filtered_manifests[key] = filtered_manifest
+
+        return filtered_manifest
+
+    def get_message(self, framework_slug, *args, **kwargs):
+        self._load_declared_messages(framework_slug)
+        return super(LazyContentLoader, self).get_message(framework_slug, *args, **kwargs)
+
+    def warm_up(self, framework_slugs=None):
+        """Load the declared content for the given frameworks, or for all of them"""
+        for framework_slug, manifest in list(self._declared_manifests):
+            if framework_slugs is None or framework_slug in framework_slugs:
+                self._load_declared_manifest(framework_slug, manifest)
+
+        for framework_slug in list(self._declared_messages):
+            if framework_slugs is None or framework_slug in framework_slugs:
+                self._load_declared_messages(framework_slug)
+
+    def save_snapshot(self, path):
+        self.warm_up()
+        state = {key: _plain_dicts(value) for key, value in vars(self).items() if key != '_load_lock'}
+        snapshot = {'source_hash': self._source_hash(), 'state': state}
+
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, path)
+
+    def load_snapshot(self, path):
+        """Restore content from a snapshot, returning False if it's missing or out of date"""
+        try:
+            with open(path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except IOError:
+            return False
+        except Exception as e:
+            logger.warning("Couldn't read content snapshot {}: {}".format(path, e))
+            return False
+
+        if snapshot['source_hash'] != self._source_hash():
+            logger.info("Content snapshot {} is out of date".format(path))
+            return False
+
+        with self._load_lock:
+            _merge_dicts(vars(self), snapshot['state'])
+        return True
+
+    def _source_hash(self):
+        source_hash = hashlib.sha1()
+        source_hash.update(repr((
+            sys.version_info[:2],
+            _dmcontent_version(),
+            sorted(self._declared_manifests.items()),
+            sorted(self._declared_messages.items()),
+        )).encode('utf-8'))
+
+        for root, dirs, files in os.walk(self._content_path):
+            dirs.sort()
+            for filename in sorted(files):
+                file_path = os.path.join(root, filename)
+                source_hash.update(os.path.relpath(file_path, self._content_path).encode('utf-8'))
+                with open(file_path, 'rb') as f:
+                    source_hash.update(f.read())
+
+        return source_hash.hexdigest()
+
+    def get_lot_manifest(self, framework_slug, manifest, lot_slug):
+        return self.get_filtered_manifest(framework_slug, manifest, {'lot': lot_slug})
+
+    def get_first_editable_section(self, framework_slug, manifest, lot_slug):
+        """The first editable section of a lot's manifest, shared between requests like the manifest"""
+        key = (framework_slug, manifest, lot_slug)
+        if key not in self._first_editable_sections:
+            content = self.get_lot_manifest(framework_slug, manifest, lot_slug)
+            self._first_editable_sections[key] = content.get_section(content.get_next_editable_section_id())
+
+        return self._first_editable_sections[key]
+
+    def _get_dependency_fields(self, framework_slug, manifest):
+        key = (framework_slug, manifest)
+        if key not in self._dependency_fields:
+            sections = self.get_manifest(framework_slug, manifest).sections
+            self._dependency_fields[key] = sorted(_dependency_fields(sections))
+
+        return self._dependency_fields[key]
+
+    def _load_declared_manifest(self, framework_slug, manifest):
+        key = ('manifest', framework_slug, manifest)
+        if key in self._loaded or (framework_slug, manifest) not in self._declared_manifests:
+            return
+
+        with self._load_lock:
+            if key not in self._loaded:
+                self.load_manifest(framework_slug, self._declared_manifests[(framework_slug, manifest)], manifest)
+                self._loaded.add(key)
+
+    def _load_declared_messages(self, framework_slug):
+        key = ('messages', framework_slug)
+        if key in self._loaded or framework_slug not in self._declared_messages:
+            return
+
+        with self._load_lock:
+            if key not in self._loaded:
+                self.load_messages(framework_slug, self._declared_messages[framework_slug])
+                self._loaded.add(key)
+
+
+def _dmcontent_version():
+    # Snapshots hold pickled dmcontent objects, which a new version may lay out differently
+    try:
+        return pkg_resources.get_distribution('digitalmarketplace-content-loader').version
+    except pkg_resources.DistributionNotFound:
+        return getattr(dmcontent, '__version__', None)
+
+
+def _dependency_fields(items):
+    fields = set()
+    for item in items:
+        for rule in getattr(item, 'depends', None) or []:
+            fields.add(rule['on'])
+        fields |= _dependency_fields(getattr(item, 'questions', None) or [])
+
+    return fields
+
+
+def _fingerprint(context, field):
+    if field not in context:
+        return field, False, None
+    return field, True, json.dumps(context[field], sort_keys=True, default=repr)
+
+
+def _plain_dicts(value):
+    # defaultdicts with lambda factories can't be pickled
+    if isinstance(value, dict):
+        return {key: _plain_dicts(item) for key, item in value.items()}
+    return value
+
+
+def _merge_dicts(target, source):
+    # Merging into the loader's own (default)dicts keeps their default factories
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge_dicts(target[key], value)
+        else:
+            target[key] = value
@@ -1,12 +1,25 @@
 # -*- coding: utf-8 -*-
 from dmutils.documents import get_agreement_document_path, COUNTERSIGNED_AGREEMENT_FILENAME
+import hashlib
+import json
 import re
 
-from flask import abort
+from flask import abort, current_app
 from flask_login import current_user
 from dmapiclient import APIError
 from dmutils import s3
 
+from ...cache import TTLCache
+from .validation import get_validator
+
+
+declaration_errors_cache = TTLCache('declaration_errors', max_size=1000)
+communications_cache = TTLCache('communications', max_size=100)
+countersigned_agreements_cache = TTLCache('countersigned_agreements', max_size=10000)
+
+# Subfolders of a framework's communications/updates/ folder, as listed on the updates page
+UPDATES_GROUPS = ['communications', 'clarifications']
+
 
 def get_framework(client, framework_slug, allowed_statuses=None):
     if allowed_statuses is None:
@@ -44,6 +57,50 @@ def register_interest_in_framework(client, framework_slug):
     client.register_framework_interest(current_user.supplier_id, framework_slug, current_user.email_address)
 
 
+def get_framework_communications(bucket, framework_slug):
+    """A framework's communications files, listed at most once every `DM_COMMUNICATIONS_CACHE_TTL` seconds.
+
+    Returns the "last modified" dates shown on the framework dashboard and
+    the files shown on the updates page, split into communications and
+    clarifications. Communications are published rarely, so the listing is
+    shared by all requests; `python application.py flush_cache communications`
+    shows new files straight away.
+
+    """
+    communications = communications_cache.get((bucket, framework_slug))
+    if communications is None:
+        key_list = s3.S3(bucket).list('{}/communications/'.format(framework_slug), load_timestamps=True)
+        communications = summarise_communications(key_list, framework_slug)
+        communications_cache.set(
+            (bucket, framework_slug), communications, current_app.config['DM_COMMUNICATIONS_CACHE_TTL']
+        )
+
+    return communications
+
+
+def summarise_communications(key_list, framework_slug):
+    updates = dict((group, []) for group in UPDATES_GROUPS)
+    updates_prefix = '{}/communications/updates/'.format(framework_slug)
+    for key in key_list:
+        path_parts = key['path'].split('/')
+        if key['path'].startswith(updates_prefix) and path_parts[3] in updates:
+            updates[path_parts[3]].append(dict(key, path='/'.join(path_parts[2:])))
+
+    # Dates come from the most recently listed matching file
+    key_list = list(reversed(key_list))
+    return {
+        'last_modified': {
+            'supplier_pack': get_last_modified_from_first_matching_file(
+                key_list, framework_slug, "communications/{}-supplier-pack.zip".format(framework_slug)
+            ),
+            'supplier_updates': get_last_modified_from_first_matching_file(
+                key_list, framework_slug, "communications/updates/"
+            ),
+        },
+        'updates': updates,
+    }
+
+
 def get_last_modified_from_first_matching_file(key_list, framework_slug, prefix):
     """
     Takes a list of file keys and a string.
@@ -83,6 +140,39 @@ def get_declaration_status(data_api_client, framework_slug):
         return declaration.get('status', 'unstarted')
 
 
+def get_declaration_errors(framework, content, saved_answers, all_answers, changed_fields):
+    """Validate a declaration after `changed_fields` of `saved_answers` have been changed.
+
+    Returns the error keys for every question in the declaration. The errors
+    for the last declaration saved are cached along with a hash of its
+    answers: if they're for `saved_answers`, only the changed fields and the
+    fields whose requirements depend on them are validated again.
+
+    """
+    validator = get_validator(framework, content, all_answers)
+    key = (current_user.supplier_id, framework['slug'])
+
+    saved = declaration_errors_cache.get(key)
+    if saved is not None and saved['answers_hash'] == _declaration_answers_hash(saved_answers):
+        errors = validator.revalidate(saved['errors'], changed_fields)
+    else:
+        errors = validator.errors()
+    questions = validator.field_index.questions
+    errors = dict((field, error) for field, error in errors.items() if field in questions)
+
+    declaration_errors_cache.set(
+        key,
+        {'answers_hash': _declaration_answers_hash(all_answers), 'errors': errors},
+        current_app.config['DM_DECLARATION_ERRORS_CACHE_TTL'])
+    return errors
+
+
+def _declaration_answers_hash(answers):
+    # Saved declarations also have their status, which isn't validated
+    answers = dict((field, value) for field, value in answers.items() if field != 'status')
+    return hashlib.sha1(json.dumps(answers, sort_keys=True).encode('utf-8')).hexdigest()
+
+
 def get_supplier_framework_info(data_api_client, framework_slug):
     try:
         return data_api_client.get_supplier_framework_info(
@@ -257,7 +347,27 @@ def get_status_for_multi_service_lot_and_service_type(
 
 
 def countersigned_framework_agreement_exists_in_bucket(framework_slug, bucket):
-    agreements_bucket = s3.S3(bucket)
-    countersigned_path = get_agreement_document_path(
-        framework_slug, current_user.supplier_id, COUNTERSIGNED_AGREEMENT_FILENAME)
-    return agreements_bucket.path_exists(countersigned_path)
+    """Whether the current supplier's countersigned agreement has been uploaded.
+
+    Countersigned agreements aren't taken down once they're uploaded, so
+    finding one is cached for `DM_COUNTERSIGNED_AGREEMENT_CACHE_TTL` seconds
+    (for good, if that's None), but not finding one only for
+    `DM_MISSING_COUNTERSIGNED_AGREEMENT_CACHE_TTL` seconds. To check again
+    straight away, run `python application.py flush_cache countersigned_agreements`.
+
+    """
+    key = (bucket, framework_slug, current_user.supplier_id)
+    exists = countersigned_agreements_cache.get(key)
+    if exists is None:
+        agreements_bucket = s3.S3(bucket)
+        countersigned_path = get_agreement_document_path(
+            framework_slug, current_user.supplier_id, COUNTERSIGNED_AGREEMENT_FILENAME)
+        exists = bool(agreements_bucket.path_exists(countersigned_path))
+
+        if exists:
+            ttl = current_app.config['DM_COUNTERSIGNED_AGREEMENT_CACHE_TTL']
+        else:
+            ttl = current_app.config['DM_MISSING_COUNTERSIGNED_AGREEMENT_CACHE_TTL']
+        countersigned_agreements_cache.set(key, exists, ttl)
+
+    return exists
@@ -1,9 +1,15 @@
+import calendar
 import re
+import time
 from datetime import datetime
 from flask import abort, current_app
 from flask_login import current_user
 
 from dmapiclient import APIError
+from dmcontent.formats import format_service_price
+from dmutils import s3
+
+from ...cache import TTLCache, invalidate_session_cache_key, session_cache_key
 
 try:
     import urlparse
@@ -11,15 +17,25 @@ except ImportError:
     import urllib.parse as urlparse
 
 
+drafts_cache = TTLCache('drafts', max_size=1000)
+draft_summaries_cache = TTLCache('draft_summaries', max_size=10000)
+signed_urls_cache = TTLCache('signed_urls', max_size=10000)
+
+
 def get_drafts(apiclient, framework_slug):
-    try:
-        drafts = apiclient.find_draft_services(
-            current_user.supplier_id,
-            framework=framework_slug
-        )['services']
+    key = _drafts_cache_key(framework_slug)
+    drafts = drafts_cache.get(key)
+    if drafts is None:
+        try:
+            drafts = apiclient.find_draft_services(
+                current_user.supplier_id,
+                framework=framework_slug
+            )['services']
+
+        except APIError as e:
+            abort(e.status_code)
 
-    except APIError as e:
-        abort(e.status_code)
+        drafts_cache.set(key, drafts, current_app.config['DM_DRAFTS_CACHE_TTL'])
 
     complete_drafts = [draft for draft in drafts if draft['status'] == 'submitted']
     drafts = [draft for draft in drafts if draft['status'] == 'not-submitted']
@@ -27,6 +43,15 @@ def get_drafts(apiclient, framework_slug):
     return drafts, complete_drafts
 
 
+def invalidate_drafts(framework_slug):
+    """Drop the current supplier's cached drafts after changing one of them"""
+    invalidate_session_cache_key(drafts_cache, 'drafts', current_user.supplier_id, framework_slug)
+
+
+def _drafts_cache_key(framework_slug):
+    return session_cache_key('drafts', current_user.supplier_id, framework_slug)
+
+
 def get_lot_drafts(apiclient, framework_slug, lot_slug):
     drafts, complete_drafts = get_drafts(apiclient, framework_slug)
     return (
@@ -47,16 +72,83 @@ def count_unanswered_questions(service_attributes):
     return unanswered_required, unanswered_optional
 
 
+def summarise_drafts(content_loader, framework_slug, drafts):
+    """Add price strings and unanswered question counts to drafts for the services list.
+
+    Drafts in the same lot share a filtered manifest, and each draft's summary
+    is cached until the draft is next updated.
+
+    """
+    ttl = current_app.config['DM_DRAFT_SUMMARY_CACHE_TTL']
+    for draft in drafts:
+        key = (framework_slug, draft.get('id'), draft.get('updatedAt'))
+        cacheable = key[1] is not None and key[2] is not None
+
+        summary = draft_summaries_cache.get(key) if cacheable else None
+        if summary is None:
+            content = content_loader.get_filtered_manifest(framework_slug, 'edit_submission', draft)
+            unanswered_required, unanswered_optional = count_unanswered_questions(content.summary(draft))
+            summary = {
+                'priceString': format_service_price(draft),
+                'unanswered_required': unanswered_required,
+                'unanswered_optional': unanswered_optional,
+            }
+            if cacheable:
+                draft_summaries_cache.set(key, summary, ttl)
+
+        draft.update(summary)
+
+    return drafts
+
+
 def is_service_associated_with_supplier(service):
     return service.get('supplierId') == current_user.supplier_id
 
 
-def get_signed_document_url(uploader, document_path):
-    url = uploader.get_signed_url(document_path)
-    if url is not None:
+def get_signed_document_url(bucket, document_path):
+    """A signed URL for a document in an S3 bucket, pointing at the assets host rather than S3.
+
+    Signed URLs are shared by all requests for the same document until
+    `DM_SIGNED_URL_EXPIRY_MARGIN` seconds before they expire (or for at most
+    `DM_SIGNED_URL_CACHE_TTL` seconds), so repeated downloads don't sign the
+    URL (or connect to the bucket) again.
+
+    """
+    key = (bucket, document_path)
+    url = signed_urls_cache.get(key)
+    if url is None:
+        url = s3.S3(bucket).get_signed_url(document_path)
+        if url is None:
+            return None
+
         url = urlparse.urlparse(url)
         base_url = urlparse.urlparse(current_app.config['DM_ASSETS_URL'])
-        return url._replace(netloc=base_url.netloc, scheme=base_url.scheme).geturl()
+        url = url._replace(netloc=base_url.netloc, scheme=base_url.scheme).geturl()
+
+        expires_at = get_signed_url_expiry(url)
+        if expires_at is not None:
+            ttl = min(
+                expires_at - time.time() - current_app.config['DM_SIGNED_URL_EXPIRY_MARGIN'],
+                current_app.config['DM_SIGNED_URL_CACHE_TTL']
+            )
+            signed_urls_cache.set(key, url, ttl)
+
+    return url
+
+
+def get_signed_url_expiry(url):
+    """The time a signed S3 URL expires, from its query string, or None if it doesn't say"""
+    params = urlparse.parse_qs(urlparse.urlparse(url).query)
+    try:
+        if 'Expires' in params:
+            return int(params['Expires'][0])
+        if 'X-Amz-Date' in params and 'X-Amz-Expires' in params:
+            signed_at = datetime.strptime(params['X-Amz-Date'][0], "%Y%m%dT%H%M%SZ")
+            return calendar.timegm(signed_at.utctimetuple()) + int(params['X-Amz-Expires'][0])
+    except ValueError:
+        pass
+
+    return None
 
 
 def parse_document_upload_time(data):
@@ -0,0 +1,301 @@
+import json
+import os
+import re
+import tempfile
+import time
+from multiprocessing import TimeoutError
+
+import flask
+from dmutils import s3
+from dmutils.documents import file_is_open_document_format, generate_file_name, get_extension, upload_document
+
+from ...parallel import submit_to
+
+
+# Uploads this big or bigger are rejected, as by `dmutils.documents.file_is_less_than_5mb`
+MAX_UPLOAD_SIZE = 5400000
+# Uploads are kept in memory up to this size, and in a temporary file after that
+SPOOL_SIZE = 500 * 1024
+
+# Content types of the files that can be uploaded straight to S3, by extension
+SERVICE_DOCUMENT_CONTENT_TYPES = {
+    '.pdf': 'application/pdf',
+    '.pda': 'application/pdf',
+    '.odt': 'application/vnd.oasis.opendocument.text',
+    '.ods': 'application/vnd.oasis.opendocument.spreadsheet',
+    '.odp': 'application/vnd.oasis.opendocument.presentation',
+}
+AGREEMENT_CONTENT_TYPES = {
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+}
+
+# How many bytes from the start of a file `file_content_matches` looks at
+SNIFF_SIZE = 100
+
+# The timestamp `dmutils.documents.generate_file_name` ends document names with
+DOCUMENT_SUFFIX = re.compile(r'\d{4}-\d{2}-\d{2}-\d{4}$')
+
+
+class BoundedUploadStream(object):
+    """A file for uploads to be written to as the request body is parsed, keeping at most `limit + 1` bytes.
+
+    Bytes past the limit are counted but thrown away, so an oversized upload
+    never takes more than `limit + 1` bytes of memory or disk, and can still
+    be told apart from one that's exactly the limit. Uploads are spooled to a
+    temporary file once they're bigger than `SPOOL_SIZE`, so they can be
+    saved to S3 without being read into memory.
+
+    """
+    def __init__(self, limit=MAX_UPLOAD_SIZE):
+        self.limit = limit
+        self.bytes_received = 0
+        self._bytes_kept = 0
+        self._file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+
+    @property
+    def truncated(self):
+        return self.bytes_received > self._bytes_kept
+
+    def write(self, data):
+        self.bytes_received += len(data)
+        room = self.limit + 1 - self._bytes_kept
+        if room > 0:
+            data = data[:room]
+            self._file.write(data)
+            self._bytes_kept += len(data)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class BoundedUploadRequest(flask.Request):
+    """Request class that writes uploaded files to `BoundedUploadStream`s"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return BoundedUploadStream()
+
+
+def file_is_less_than_5mb(file):
+    return get_upload_size(file) < MAX_UPLOAD_SIZE
+
+
+def file_is_empty(file):
+    return get_upload_size(file) == 0
+
+
+def get_upload_size(file):
+    """The size of an uploaded file, without reading it"""
+    stream = getattr(file, 'stream', file)
+    if isinstance(stream, BoundedUploadStream):
+        return stream.bytes_received
+
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def get_upload_head(file, size=SNIFF_SIZE):
+    """The first `size` bytes of an uploaded file, leaving its position unchanged"""
+    stream = getattr(file, 'stream', file)
+    position = stream.tell()
+    stream.seek(0)
+    head = stream.read(size)
+    stream.seek(position)
+    return head
+
+
+def content_matches_type(head, content_type):
+    """Whether `head`, the start of a file, looks like the start of a file of `content_type`.
+
+    OpenDocument files are zip files that start with an uncompressed
+    `mimetype` entry holding their content type.
+
+    """
+    if content_type == 'application/pdf':
+        return head.startswith(b'%PDF-')
+    if content_type == 'image/jpeg':
+        return head.startswith(b'\xff\xd8\xff')
+    if content_type == 'image/png':
+        return head.startswith(b'\x89PNG\r\n\x1a\n')
+    if content_type.startswith('application/vnd.oasis.opendocument.'):
+        return (
+            head.startswith(b'PK\x03\x04') and
+            head[30:38] == b'mimetype' and
+            head[38:].startswith(content_type.encode('ascii'))
+        )
+
+    return False
+
+
+def file_content_matches(file, content_types):
+    """Whether an uploaded file's content is of the type its extension says, out of `content_types`"""
+    content_type = content_types.get(get_extension(file.filename).lower())
+    return content_type is not None and content_matches_type(get_upload_head(file), content_type)
+
+
+def filter_empty_files(files):
+    """Drop empty files, like `dmutils.documents.filter_empty_files` but without reading them"""
+    return dict((field, contents) for field, contents in files.items() if not file_is_empty(contents))
+
+
+def validate_documents(files):
+    """Errors for documents by field, like `dmutils.documents.validate_documents` but without reading them.
+
+    Documents that aren't too big also have their first few bytes checked
+    against their extension.
+
+    """
+    errors = {}
+    for field, contents in files.items():
+        if not file_is_open_document_format(contents):
+            errors[field] = 'file_is_open_document_format'
+        elif not file_is_less_than_5mb(contents):
+            errors[field] = 'file_is_less_than_5mb'
+        elif not file_content_matches(contents, SERVICE_DOCUMENT_CONTENT_TYPES):
+            errors[field] = 'file_is_open_document_format'
+
+    return errors
+
+
+def upload_service_documents(bucket, documents_url, service, request_files, section, public=True):
+    """Upload the documents for a section of a service at the same time.
+
+    Works like `dmutils.documents.upload_service_documents`, returning the
+    uploaded documents' URLs and errors by field, but uploads documents on
+    the shared `upload` worker thread pool so a section with several
+    documents takes as long as its slowest upload. Each upload has its own
+    S3 connection. Uploads that haven't finished within `DM_UPLOAD_TIMEOUT`
+    seconds are reported as errors.
+
+    """
+    files = dict((field, request_files[field]) for field in section.get_field_names() if field in request_files)
+    files = filter_empty_files(files)
+    errors = validate_documents(files)
+
+    if errors:
+        return None, errors
+
+    if len(files) == 0:
+        return {}, {}
+
+    fields = list(files)
+    results = [
+        submit_to('upload', _upload_document, bucket, documents_url, service, field, files[field], public)
+        for field in fields
+    ]
+    urls = _wait_for_uploads(fields, results, flask.current_app.config['DM_UPLOAD_TIMEOUT'])
+
+    for field, url in zip(fields, urls):
+        if not url:
+            errors[field] = 'file_can_be_saved'
+        else:
+            files[field] = url
+
+    return files, errors
+
+
+def _wait_for_uploads(fields, results, timeout):
+    deadline = time.time() + timeout
+    urls = []
+    for field, result in zip(fields, results):
+        try:
+            urls.append(result.get(max(0, deadline - time.time())))
+        except TimeoutError:
+            result.cancel()
+            flask.current_app.logger.warning(
+                "Upload of {field} timed out after {timeout} seconds",
+                extra={'field': field, 'timeout': timeout})
+            urls.append(None)
+
+    return urls
+
+
+def _upload_document(bucket, documents_url, service, field, file_contents, public):
+    return upload_document(s3.S3(bucket), documents_url, service, field, file_contents, public=public)
+
+
+def get_upload_field_names(section):
+    """The fields of a section's questions that are answered by uploading a document"""
+    return [question.id for question in section.questions if question.type == 'upload']
+
+
+def get_service_document_path(service, field, filename, suffix=None):
+    """The submissions bucket path for a new document for a draft service, as `upload_service_documents` uses"""
+    return generate_file_name(
+        service['frameworkSlug'], 'submissions', service['supplierId'], service['id'], field, filename,
+        suffix=suffix)
+
+
+def is_service_document_path(service, field, path):
+    """Whether `path` could have come from `get_service_document_path` for this draft service's `field`"""
+    name, extension = os.path.splitext(path)
+    match = DOCUMENT_SUFFIX.search(name)
+    if match is None or extension.lower() not in SERVICE_DOCUMENT_CONTENT_TYPES:
+        return False
+
+    return path == get_service_document_path(service, field, path, suffix=match.group(0))
+
+
+def get_upload_policy(bucket, path, content_type, expires_in, acl='private', download_filename=None):
+    """A presigned POST policy for the browser to upload a file straight to S3.
+
+    The policy only lets a file of `content_type` that's smaller than
+    `MAX_UPLOAD_SIZE` be saved as `path` in `bucket`, with the given ACL and
+    download file name, for `expires_in` seconds. S3 can't be made to turn
+    away empty files, so `get_direct_upload_error` checks for those once the
+    upload's done.
+
+    Returns the `url` for the browser to post the file to, and the form
+    `fields` to send with it.
+
+    """
+    fields = [{'name': 'Content-Type', 'value': content_type}]
+    if download_filename is not None:
+        fields.append({'name': 'Content-Disposition', 'value': 'attachment; filename="{}"'.format(download_filename)})
+    conditions = [json.dumps({field['name']: field['value']}) for field in fields]
+
+    form = s3.S3(bucket).bucket.connection.build_post_form_args(
+        bucket, path,
+        expires_in=expires_in,
+        acl=acl,
+        max_content_length=MAX_UPLOAD_SIZE - 1,
+        http_method='https',
+        fields=fields,
+        conditions=conditions,
+    )
+
+    return {
+        'url': form['action'],
+        'fields': dict((field['name'], field['value']) for field in form['fields']),
+    }
+
+
+def get_direct_upload_error(bucket, path, content_types):
+    """Why a file uploaded with a policy from `get_upload_policy` can't be used, or None if it can.
+
+    Errors are the ones `validate_documents` gives for files
+    uploaded through the app, or `file_can_be_saved` if there's no file.
+    Only the first `SNIFF_SIZE` bytes of the file are fetched, to check its
+    content against the type `content_types` gives for its extension.
+
+    """
+    key = s3.S3(bucket).bucket.get_key(path)
+    if key is None:
+        return 'file_can_be_saved'
+    if key.size == 0:
+        return 'file_is_empty'
+    if key.size >= MAX_UPLOAD_SIZE:
+        return 'file_is_less_than_5mb'
+
+    head = key.get_contents_as_string(headers={'Range': 'bytes=0-{}'.format(SNIFF_SIZE - 1)})
+    if not content_matches_type(head, content_types[get_extension(path).lower()]):
+        return 'file_is_open_document_format'
+
+    return None
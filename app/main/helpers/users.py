@@ -0,0 +1,83 @@
+import threading
+import time
+
+import six
+from flask import current_app
+from dmutils.user import User
+
+from ...cache import TTLCache
+
+
+user_cache = TTLCache('users', max_size=10000, check_invalidations=True)
+
+# Cached users are refreshed in the background once they're this far through their TTL
+USER_CACHE_REFRESH_AFTER = 0.75
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def load_user(data_api_client, user_id):
+    """Load the logged in user, from the API at most once every `DM_USER_CACHE_TTL` seconds.
+
+    The cache holds the user record as returned by the API, so the user is
+    checked to be active every time it's loaded. Users are refreshed in the
+    background shortly before their entry expires, so active users don't
+    wait for the API.
+
+    """
+    user_id = int(user_id)
+    ttl = current_app.config['DM_USER_CACHE_TTL']
+
+    cached = user_cache.get(user_id)
+    if cached is None:
+        user_json = _fetch_user(data_api_client, user_id, ttl)
+    else:
+        fetched_at, user_json = cached
+        if time.time() - fetched_at > ttl * USER_CACHE_REFRESH_AFTER:
+            _refresh_user_in_background(current_app._get_current_object(), data_api_client, user_id, ttl)
+
+    if user_json:
+        user = User.from_json(user_json)
+        if user.is_active():
+            return user
+
+
+def invalidate_user(user_id):
+    """Drop a user from every worker's cache, eg after deactivating them"""
+    user_cache.invalidate(int(user_id))
+
+
+def _fetch_user(data_api_client, user_id, ttl):
+    user_json = data_api_client.get_user(user_id=user_id)
+    if user_json:
+        user_cache.set(user_id, (time.time(), user_json), ttl)
+    else:
+        user_cache.delete(user_id)
+
+    return user_json
+
+
+def _refresh_user_in_background(app, data_api_client, user_id, ttl):
+    with _refreshing_lock:
+        if user_id in _refreshing:
+            return
+        _refreshing.add(user_id)
+
+    thread = threading.Thread(target=_refresh_user, args=(app, data_api_client, user_id, ttl))
+    thread.daemon = True
+    thread.start()
+
+
+def _refresh_user(app, data_api_client, user_id, ttl):
+    try:
+        with app.app_context():
+            _fetch_user(data_api_client, user_id, ttl)
+    except Exception as e:
+        # The entry will expire and the user be fetched by the next request
+        app.logger.warning(
+            "Failed to refresh cached user {user_id}: {error}",
+            extra={'user_id': user_id, 'error': six.text_type(e)})
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(user_id)
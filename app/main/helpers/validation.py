@@ -1,11 +1,15 @@
-from functools import reduce
-from operator import add
 import re
+import threading
+from collections import namedtuple
+
 import six
 from werkzeug.datastructures import ImmutableOrderedMultiDict
 
 EMAIL_REGEX = r'^[^@^\s]+@[^@^\.^\s]+(\.[^@^\.^\s]+)+$'
 
+_field_indexes = {}
+_field_indexes_lock = threading.Lock()
+
 
 def get_validator(framework, content, answers):
     """
@@ -18,42 +22,103 @@ def get_validator(framework, content, answers):
         return validator_cls(content, answers)
 
 
+def get_field_index(content, framework_slug, manifest='declaration'):
+    """Return the `DeclarationFieldIndex` for a framework's manifest, building it the first time.
+
+    The content loader builds a new manifest object each time it's asked for
+    one, so indexes are kept by framework, manifest name and the manifest's
+    sections and question ids. Frameworks reuse section and question ids, so
+    the ids alone aren't enough to tell their manifests apart.
+
+    """
+    key = (framework_slug, manifest, tuple((section.id, tuple(section.get_question_ids())) for section in content))
+    with _field_indexes_lock:
+        if key not in _field_indexes:
+            _field_indexes[key] = DeclarationFieldIndex(content)
+
+        return _field_indexes[key]
+
+
+class DeclarationFieldIndex(object):
+    """The questions of a declaration manifest, indexed by question id.
+
+    Looking questions up in the manifest means scanning all of its sections,
+    so validators use this index, which is built once per manifest.
+
+    """
+    def __init__(self, content):
+        self.fields = []
+        self.questions = {}
+
+        for section in content:
+            for question_id in section.get_question_ids():
+                question = content.get_question(question_id)
+                self.fields.append(question_id)
+                self.questions[question_id] = {
+                    'type': question.get('type'),
+                    'number': question.get('number'),
+                    'question': question.get('question'),
+                    'section': section.id,
+                    'validations': dict(
+                        (validation['name'], validation['message'])
+                        for validation in question.get('validations', [])
+                    ),
+                }
+
+
+class RequiredIf(namedtuple('RequiredIf', ['field', 'on', 'condition'])):
+    """`field` must be answered if `condition(answers)` is true.
+
+    `on` names every answer the condition looks at, so that validators know
+    which requirements to check again when those answers change.
+
+    """
+    __slots__ = ()
+
+
 class DeclarationValidator(object):
+    framework_slug = None
     email_validation_fields = []
     number_string_fields = []
     character_limit = None
     optional_fields = set([])
+    conditionally_required = []
 
     def __init__(self, content, answers):
         self.content = content
         self.answers = answers
+        self._field_index = None
+
+    @property
+    def field_index(self):
+        if self._field_index is None:
+            self._field_index = get_field_index(self.content, self.framework_slug)
+        return self._field_index
 
     def get_error_messages_for_page(self, section):
-        all_errors = self.get_error_messages()
-        page_ids = section.get_question_ids()
-        page_errors = ImmutableOrderedMultiDict(filter(lambda err: err[0] in page_ids, all_errors))
-        return page_errors
+        return ImmutableOrderedMultiDict(self.get_error_messages(section.get_question_ids()))
 
-    def get_error_messages(self):
-        raw_errors_map = self.errors()
+    def get_error_messages(self, fields=None):
+        """Error messages for the answers to all questions, or just to the given `fields`"""
+        raw_errors_map = self.errors(fields)
         errors_map = list()
         for question_id in self.all_fields():
             if question_id in raw_errors_map:
-                question_number = self.content.get_question(question_id).get('number')
+                question = self.field_index.questions[question_id]
                 validation_message = self.get_error_message(question_id, raw_errors_map[question_id])
                 errors_map.append((question_id, {
                     'input_name': question_id,
-                    'question': "Question {}".format(question_number)
-                    if question_number else self.content.get_question(question_id).get('question'),
+                    'question': "Question {}".format(question['number'])
+                    if question['number'] else question['question'],
                     'message': validation_message,
                 }))
 
         return errors_map
 
     def get_error_message(self, question_id, message_key):
-        for validation in self.content.get_question(question_id).get('validations', []):
-            if validation['name'] == message_key:
-                return validation['message']
+        validations = self.field_index.questions[question_id]['validations']
+        if message_key in validations:
+            return validations[message_key]
         default_messages = {
             'answer_required': 'You need to answer this question.',
             'under_character_limit': 'Your answer must be no more than {} characters.'.format(self.character_limit),
@@ -66,21 +131,61 @@ class DeclarationValidator(object):
         raise NotImplementedError("only a subclass should be used")
 
     def all_fields(self):
-        return reduce(add, (section.get_question_ids() for section in self.content))
+        return self.field_index.fields
 
     def fields_with_values(self):
         return set(key for key, value in self.answers.items()
                    if value is not None and (not isinstance(value, six.string_types) or len(value) > 0))
 
-    def errors(self):
+    def revalidate(self, previous_errors, changed_fields):
+        """Errors for the answers, given the errors from before `changed_fields` were changed.
+
+        Only the changed fields, and the fields whose requirements depend on
+        them, are validated again: the errors for every other field are the
+        same as before.
+
+        """
+        affected_fields = self.get_affected_fields(changed_fields)
+        errors_map = dict(
+            (field, error) for field, error in previous_errors.items() if field not in affected_fields
+        )
+        errors_map.update(self.errors(affected_fields))
+        return errors_map
+
+    def get_affected_fields(self, changed_fields):
+        dependent_fields = self._get_dependent_fields()
+        affected_fields = set(changed_fields)
+        for field in changed_fields:
+            affected_fields |= dependent_fields.get(field, set())
+        return affected_fields
+
+    @classmethod
+    def _get_dependent_fields(cls):
+        # Built once per validator class, from its own rules rather than a parent's
+        if '_dependent_fields' not in vars(cls):
+            dependent_fields = {}
+            for rule in cls.conditionally_required:
+                for field in rule.on:
+                    dependent_fields.setdefault(field, set()).add(rule.field)
+            cls._dependent_fields = dependent_fields
+        return cls._dependent_fields
+
+    def errors(self, fields=None):
+        """Map of fields to error keys, for all fields or just the given ones.
+
+        Each check only reports errors for the field it checks, so validating
+        some fields gives the same errors for them as validating all of them.
+
+        """
+        fields = None if fields is None else set(fields)
         errors_map = {}
-        errors_map.update(self.character_limit_errors())
-        errors_map.update(self.formatting_errors(self.answers))
-        errors_map.update(self.answer_required_errors())
+        errors_map.update(self.character_limit_errors(fields))
+        errors_map.update(self.formatting_errors(self.answers, fields))
+        errors_map.update(self.answer_required_errors(fields))
         return errors_map
 
-    def answer_required_errors(self):
-        req_fields = self.get_required_fields()
+    def answer_required_errors(self, fields=None):
+        req_fields = self.get_required_fields(fields)
         filled_fields = self.fields_with_values()
         errors_map = {}
 
@@ -89,48 +194,79 @@ class DeclarationValidator(object):
 
         return errors_map
 
-    def character_limit_errors(self):
+    def character_limit_errors(self, fields=None):
         errors_map = {}
-        for question_id in self.all_fields():
-            if self.content.get_question(question_id).get('type') in ['text', 'textbox_large']:
+        if self.character_limit is None:
+            return errors_map
+
+        questions = self.field_index.questions
+        for question_id in self.all_fields() if fields is None else fields & set(questions):
+            if questions[question_id]['type'] in ['text', 'textbox_large']:
                 answer = self.answers.get(question_id) or ''
-                if self.character_limit is not None and len(answer) > self.character_limit:
+                if len(answer) > self.character_limit:
                     errors_map[question_id] = "under_character_limit"
 
         return errors_map
 
-    def formatting_errors(self, answers):
+    def formatting_errors(self, answers, fields=None):
         errors_map = {}
         if self.email_validation_fields is not None and len(self.email_validation_fields) > 0:
             for field in self.email_validation_fields:
+                if fields is not None and field not in fields:
+                    continue
                 if self.answers.get(field) is None or not re.match(EMAIL_REGEX, self.answers.get(field, '')):
                     errors_map[field] = 'invalid_format'
 
         if self.number_string_fields is not None and len(self.number_string_fields) > 0:
             for field, length in self.number_string_fields:
+                if fields is not None and field not in fields:
+                    continue
                 if self.answers.get(field) is None or not re.match(
                         '^\d{{{0}}}$'.format(length), self.answers.get(field, '')
                 ):
                     errors_map[field] = 'invalid_format'
         return errors_map
 
-    def get_required_fields(self):
+    def get_required_fields(self, fields=None):
+        """The fields that must be answered, out of all fields or just the given ones"""
         try:
-            req_fields = self.required_fields
+            req_fields = set(self.required_fields)
         except AttributeError:
             req_fields = set(self.all_fields())
+        if fields is not None:
+            req_fields &= set(fields)
 
         #  Remove optional fields
         if self.optional_fields is not None:
             req_fields -= set(self.optional_fields)
 
+        for rule in self.conditionally_required:
+            if (fields is None or rule.field in fields) and rule.condition(self.answers):
+                req_fields.add(rule.field)
+
         return req_fields
 
 
+G7_DISCRETIONARY_EXCLUSION_FIELDS = [
+    'SQ2-2a', 'SQ3-1a', 'SQ3-1b', 'SQ3-1c', 'SQ3-1d', 'SQ3-1e', 'SQ3-1f', 'SQ3-1g',
+    'SQ3-1h-i', 'SQ3-1h-ii', 'SQ3-1i-i', 'SQ3-1i-ii', 'SQ3-1j'
+]
+
+DOS_DISCRETIONARY_EXCLUSION_FIELDS = [
+    'misleadingInformation', 'confidentialInformation', 'influencedContractingAuthority',
+    'witheldSupportingDocuments', 'seriousMisrepresentation', 'significantOrPersistentDeficiencies',
+    'distortedCompetition', 'conflictOfInterest', 'graveProfessionalMisconduct',
+    'bankrupt', 'environmentalSocialLabourLaw', 'taxEvasion'
+]
+
+DOS_TAX_FIELDS = ["unspentTaxConvictions", "GAAR"]
+
+
 class G7Validator(DeclarationValidator):
     """
     Validator for G-Cloud 7.
     """
+    framework_slug = 'g-cloud-7'
     optional_fields = set([
         "SQ1-1p-i", "SQ1-1p-ii", "SQ1-1p-iii", "SQ1-1p-iv",
         "SQ1-1q-i", "SQ1-1q-ii", "SQ1-1q-iii", "SQ1-1q-iv", "SQ1-1cii", "SQ1-1i-ii",
@@ -139,44 +275,30 @@ class G7Validator(DeclarationValidator):
     email_validation_fields = set(['SQ1-1o', 'SQ1-2b'])
     character_limit = 5000
 
-    def get_required_fields(self):
-        req_fields = super(G7Validator, self).get_required_fields()
-
+    conditionally_required = [
         #  If you answered other to question 19 (trading status)
-        if self.answers.get('SQ1-1ci') == 'other (please specify)':
-            req_fields.add('SQ1-1cii')
-
+        RequiredIf('SQ1-1cii', ['SQ1-1ci'], lambda answers: answers.get('SQ1-1ci') == 'other (please specify)'),
         #  If you answered yes to question 27 (non-UK business registered in EU)
-        if self.answers.get('SQ1-1i-i', False):
-            req_fields.add('SQ1-1i-ii')
-
+        RequiredIf('SQ1-1i-ii', ['SQ1-1i-i'], lambda answers: answers.get('SQ1-1i-i', False)),
         #  If you answered 'licensed' or 'a member of a relevant organisation' in question 29
-        answer_29 = self.answers.get('SQ1-1j-i', [])
-        if answer_29 and len(answer_29) > 0 and \
-                ('licensed' in answer_29 or 'a member of a relevant organisation' in answer_29):
-                req_fields.add('SQ1-1j-ii')
-
+        RequiredIf('SQ1-1j-ii', ['SQ1-1j-i'], lambda answers: any(
+            answer in (answers.get('SQ1-1j-i') or [])
+            for answer in ['licensed', 'a member of a relevant organisation']
+        )),
         # If you answered yes to either question 53 or 54 (tax returns)
-        if self.answers.get('SQ4-1a', False) or self.answers.get('SQ4-1b', False):
-            req_fields.add('SQ4-1c')
-
+        RequiredIf('SQ4-1c', ['SQ4-1a', 'SQ4-1b'],
+                   lambda answers: answers.get('SQ4-1a', False) or answers.get('SQ4-1b', False)),
         # If you answered Yes to questions 39 - 51 (discretionary exclusion)
-        dependent_fields = [
-            'SQ2-2a', 'SQ3-1a', 'SQ3-1b', 'SQ3-1c', 'SQ3-1d', 'SQ3-1e', 'SQ3-1f', 'SQ3-1g',
-            'SQ3-1h-i', 'SQ3-1h-ii', 'SQ3-1i-i', 'SQ3-1i-ii', 'SQ3-1j'
-        ]
-        if any(self.answers.get(field) for field in dependent_fields):
-            req_fields.add('SQ3-1k')
-
+        RequiredIf('SQ3-1k', G7_DISCRETIONARY_EXCLUSION_FIELDS,
+                   lambda answers: any(answers.get(field) for field in G7_DISCRETIONARY_EXCLUSION_FIELDS)),
         # If you answered No to question 26 (established in the UK)
-        if 'SQ5-2a' in self.answers and not self.answers['SQ5-2a']:
-            req_fields.add('SQ1-1i-i')
-            req_fields.add('SQ1-1j-i')
-
-        return req_fields
+        RequiredIf('SQ1-1i-i', ['SQ5-2a'], lambda answers: 'SQ5-2a' in answers and not answers['SQ5-2a']),
+        RequiredIf('SQ1-1j-i', ['SQ5-2a'], lambda answers: 'SQ5-2a' in answers and not answers['SQ5-2a']),
+    ]
 
 
 class DOSValidator(DeclarationValidator):
+    framework_slug = 'digital-outcomes-and-specialists'
     optional_fields = set([
         "mitigatingFactors", "mitigatingFactors2", "tradingStatusOther",
         # Registered in UK = no
@@ -186,46 +308,34 @@ class DOSValidator(DeclarationValidator):
     email_validation_fields = set(["contactEmailContractNotice", "primaryContactEmail"])
     character_limit = 5000
 
-    def get_required_fields(self):
-        req_fields = super(DOSValidator, self).get_required_fields()
-
-        dependent_fields = {
-            # If you responded yes to any of questions 22 to 34
-            "mitigatingFactors": [
-                'misleadingInformation', 'confidentialInformation', 'influencedContractingAuthority',
-                'witheldSupportingDocuments', 'seriousMisrepresentation', 'significantOrPersistentDeficiencies',
-                'distortedCompetition', 'conflictOfInterest', 'distortedCompetition', 'graveProfessionalMisconduct',
-                'bankrupt', 'environmentalSocialLabourLaw', 'taxEvasion'
-            ],
-            # If you responded yes to either 36 or 37
-            "mitigatingFactors2": [
-                "unspentTaxConvictions", "GAAR"
-            ],
-        }
-        for target_field, fields in dependent_fields.items():
-            if any(self.answers.get(field) for field in fields):
-                req_fields.add(target_field)
-
+    conditionally_required = [
+        # If you responded yes to any of questions 22 to 34
+        RequiredIf('mitigatingFactors', DOS_DISCRETIONARY_EXCLUSION_FIELDS,
+                   lambda answers: any(answers.get(field) for field in DOS_DISCRETIONARY_EXCLUSION_FIELDS)),
+        # If you responded yes to either 36 or 37
+        RequiredIf('mitigatingFactors2', DOS_TAX_FIELDS,
+                   lambda answers: any(answers.get(field) for field in DOS_TAX_FIELDS)),
         # Describe your trading status
-        if self.answers.get('tradingStatus') == "other (please specify)":
-            req_fields.add('tradingStatusOther')
-
+        RequiredIf('tradingStatusOther', ['tradingStatus'],
+                   lambda answers: answers.get('tradingStatus') == "other (please specify)"),
         # If your company was not established in the UK
-        if self.answers.get('establishedInTheUK') is False:
-            req_fields.add('appropriateTradeRegisters')
-            # If yes to appropriate trade registers
-            if self.answers.get('appropriateTradeRegisters') is True:
-                req_fields.add('appropriateTradeRegistersNumber')
-
-            req_fields.add('licenceOrMemberRequired')
-            # If not 'none of the above' to licenceOrMemberRequired
-            if self.answers.get('licenceOrMemberRequired') in ['licensed', 'a member of a relevant organisation']:
-                req_fields.add('licenceOrMemberRequiredDetails')
-
-        return req_fields
+        RequiredIf('appropriateTradeRegisters', ['establishedInTheUK'],
+                   lambda answers: answers.get('establishedInTheUK') is False),
+        # If yes to appropriate trade registers
+        RequiredIf('appropriateTradeRegistersNumber', ['establishedInTheUK', 'appropriateTradeRegisters'],
+                   lambda answers: answers.get('establishedInTheUK') is False and
+                   answers.get('appropriateTradeRegisters') is True),
+        RequiredIf('licenceOrMemberRequired', ['establishedInTheUK'],
+                   lambda answers: answers.get('establishedInTheUK') is False),
+        # If not 'none of the above' to licenceOrMemberRequired
+        RequiredIf('licenceOrMemberRequiredDetails', ['establishedInTheUK', 'licenceOrMemberRequired'],
+                   lambda answers: answers.get('establishedInTheUK') is False and
+                   answers.get('licenceOrMemberRequired') in ['licensed', 'a member of a relevant organisation']),
+    ]
 
 
 class G8Validator(DOSValidator):
+    framework_slug = 'g-cloud-8'
     number_string_fields = [('dunsNumber', 9)]
 
 
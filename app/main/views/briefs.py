@@ -1,6 +1,7 @@
 # coding: utf-8
 from __future__ import unicode_literals
 
+import copy
 import re
 
 from flask import abort, flash, redirect, render_template, request, url_for
@@ -10,7 +11,9 @@ from dmapiclient import HTTPError
 
 from ..helpers import login_required
 from ..helpers.briefs import (
+    brief_response_created,
     get_brief,
+    get_brief_responses,
     is_supplier_eligible_for_brief,
     send_brief_clarification_question,
     supplier_has_a_brief_response
@@ -90,8 +93,9 @@ def brief_response(brief_id):
     framework, lot = get_framework_and_lot(
         data_api_client, brief['frameworkSlug'], brief['lotSlug'], allowed_statuses=['live'])
 
-    content = content_loader.get_manifest(framework['slug'], 'edit_brief_response').filter({'lot': lot['slug']})
-    section = content.get_section(content.get_next_editable_section_id())
+    # The section is shared between requests, and gets changed for this brief
+    section = copy.deepcopy(
+        content_loader.get_first_editable_section(framework['slug'], 'edit_brief_response', lot['slug']))
 
     # replace generic 'Apply for opportunity' title with title including the name of the brief
     section.name = "Apply for ‘{}’".format(brief['title'])
@@ -124,15 +128,17 @@ def submit_brief_response(brief_id):
     framework, lot = get_framework_and_lot(
         data_api_client, brief['frameworkSlug'], brief['lotSlug'], allowed_statuses=['live'])
 
-    content = content_loader.get_manifest(framework['slug'], 'edit_brief_response').filter({'lot': lot['slug']})
-    section = content.get_section(content.get_next_editable_section_id())
+    section = content_loader.get_first_editable_section(framework['slug'], 'edit_brief_response', lot['slug'])
     response_data = section.get_data(request.form)
 
     try:
         brief_response = data_api_client.create_brief_response(
             brief_id, current_user.supplier_id, response_data, current_user.email_address
         )['briefResponses']
+        brief_response_created(current_user.supplier_id, brief_id, brief_response)
     except HTTPError as e:
+        # The section is shared between requests, so is copied before being changed for this brief
+        section = copy.deepcopy(section)
         # replace generic 'Apply for opportunity' title with title including the name of the brief
         section.name = "Apply for ‘{}’".format(brief['title'])
         section.inject_brief_questions_into_boolean_list_question(brief)
@@ -163,10 +169,7 @@ def view_response_result(brief_id):
     if not is_supplier_eligible_for_brief(data_api_client, current_user.supplier_id, brief):
         return _render_not_eligible_for_brief_error_page(brief)
 
-    brief_response = data_api_client.find_brief_responses(
-        brief_id=brief_id,
-        supplier_id=current_user.supplier_id
-    )['briefResponses']
+    brief_response = get_brief_responses(data_api_client, current_user.supplier_id, brief_id)
 
     if len(brief_response) == 0:
         return redirect(url_for(".brief_response", brief_id=brief_id))
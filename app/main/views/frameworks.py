@@ -2,45 +2,66 @@
 import itertools
 
 from dateutil.parser import parse as date_parse
-from flask import render_template, request, abort, flash, redirect, url_for, current_app
+from flask import render_template, request, abort, flash, redirect, url_for, current_app, jsonify
 from flask_login import current_user
 import six
 
 from dmapiclient import APIError
 from dmapiclient.audit import AuditTypes
-from dmutils.email import send_email, MandrillException
-from dmcontent.formats import format_service_price
+from dmutils.email import MandrillException
 from dmutils.formats import datetimeformat
 from dmutils import s3
 from dmutils.documents import (
     RESULT_LETTER_FILENAME, AGREEMENT_FILENAME, SIGNED_AGREEMENT_PREFIX, COUNTERSIGNED_AGREEMENT_FILENAME,
-    get_agreement_document_path, get_signed_url, get_extension, file_is_less_than_5mb, file_is_empty,
-    sanitise_supplier_name,
+    get_agreement_document_path, get_extension, sanitise_supplier_name,
 )
 
-from ... import data_api_client
+from ... import data_api_client, flask_featureflags
 from ...main import main, content_loader
-from ..helpers import hash_email, login_required
+from ...parallel import submit, wait_for, wait_for_optional
+from ..helpers import hash_email, login_required, send_email
 from ..helpers.frameworks import (
-    get_declaration_status, get_last_modified_from_first_matching_file, register_interest_in_framework,
+    get_declaration_status, register_interest_in_framework,
     get_supplier_on_framework_from_info, get_declaration_status_from_info, get_supplier_framework_info,
     get_framework, get_framework_and_lot, count_drafts_by_lot, get_statuses_for_lot,
-    countersigned_framework_agreement_exists_in_bucket
+    countersigned_framework_agreement_exists_in_bucket, get_framework_communications, get_declaration_errors
+)
+from ..helpers.uploads import (
+    AGREEMENT_CONTENT_TYPES, file_content_matches, file_is_less_than_5mb, file_is_empty, get_direct_upload_error,
+    get_upload_policy
 )
 from ..helpers.validation import get_validator
 from ..helpers.services import (
-    get_signed_document_url, get_drafts, get_lot_drafts, count_unanswered_questions
+    get_signed_document_url, get_drafts, get_lot_drafts, invalidate_drafts, summarise_drafts
 )
 
 CLARIFICATION_QUESTION_NAME = 'clarification_question'
 
+# Messages for the errors from `get_direct_upload_error`
+AGREEMENT_UPLOAD_ERRORS = {
+    'file_can_be_saved': "Document could not be uploaded",
+    'file_is_empty': "Document must not be empty",
+    'file_is_less_than_5mb': "Document must be less than 5Mb",
+    'file_is_open_document_format': "Document must be a PDF, JPG or PNG",
+}
+
 
 @main.route('/frameworks/<framework_slug>', methods=['GET', 'POST'])
 @login_required
 def framework_dashboard(framework_slug):
-    framework = get_framework(data_api_client, framework_slug)
+    api_timeout = current_app.config['DM_DATA_API_FETCH_TIMEOUT']
+    s3_timeout = current_app.config['DM_S3_FETCH_TIMEOUT']
+
+    framework_result = submit(get_framework, data_api_client, framework_slug)
+    communications_result = submit(
+        get_framework_communications, current_app.config['DM_COMMUNICATIONS_BUCKET'], framework_slug
+    )
+    countersigned_agreement_result = submit(
+        countersigned_framework_agreement_exists_in_bucket, framework_slug, current_app.config['DM_AGREEMENTS_BUCKET']
+    )
 
     if request.method == 'POST':
+        framework = wait_for(framework_result, api_timeout)
         register_interest_in_framework(data_api_client, framework_slug)
         supplier_users = data_api_client.find_users(supplier_id=current_user.supplier_id)
 
@@ -61,9 +82,13 @@ def framework_dashboard(framework_slug):
                 extra={'error': six.text_type(e), 'supplier_id': current_user.supplier_id}
             )
 
-    drafts, complete_drafts = get_drafts(data_api_client, framework_slug)
+    # Drafts and declaration are fetched after any POST, which registers interest in the framework
+    drafts_result = submit(get_drafts, data_api_client, framework_slug)
+    supplier_framework_info_result = submit(get_supplier_framework_info, data_api_client, framework_slug)
 
-    supplier_framework_info = get_supplier_framework_info(data_api_client, framework_slug)
+    framework = wait_for(framework_result, api_timeout)
+    drafts, complete_drafts = wait_for(drafts_result, api_timeout)
+    supplier_framework_info = wait_for(supplier_framework_info_result, api_timeout)
     declaration_status = get_declaration_status_from_info(supplier_framework_info)
     supplier_is_on_framework = get_supplier_on_framework_from_info(supplier_framework_info)
 
@@ -71,8 +96,13 @@ def framework_dashboard(framework_slug):
     if declaration_status == 'unstarted' and framework['status'] == 'live':
         abort(404)
 
-    key_list = s3.S3(current_app.config['DM_COMMUNICATIONS_BUCKET']).list(framework_slug, load_timestamps=True)
-    key_list.reverse()
+    # The page is still useful without "last modified" dates or the countersigned agreement link
+    communications = wait_for_optional(
+        communications_result, s3_timeout, {'last_modified': {}}, "Communications bucket listing"
+    )
+    countersigned_agreement_exists = wait_for_optional(
+        countersigned_agreement_result, s3_timeout, False, "Countersigned agreement check"
+    )
 
     first_page = content_loader.get_manifest(
         framework_slug, 'declaration'
@@ -82,7 +112,7 @@ def framework_dashboard(framework_slug):
     supplier_pack_filename = '{}-supplier-pack.zip'.format(framework_slug)
     result_letter_filename = RESULT_LETTER_FILENAME
     countersigned_agreement_file = None
-    if countersigned_framework_agreement_exists_in_bucket(framework_slug, current_app.config['DM_AGREEMENTS_BUCKET']):
+    if countersigned_agreement_exists:
         countersigned_agreement_file = COUNTERSIGNED_AGREEMENT_FILENAME
 
     return render_template(
@@ -104,14 +134,7 @@ def framework_dashboard(framework_slug):
         declaration_status=declaration_status,
         first_page_of_declaration=first_page,
         framework=framework,
-        last_modified={
-            'supplier_pack': get_last_modified_from_first_matching_file(
-                key_list, framework_slug, "communications/{}".format(supplier_pack_filename)
-            ),
-            'supplier_updates': get_last_modified_from_first_matching_file(
-                key_list, framework_slug, "communications/updates/"
-            )
-        },
+        last_modified=communications['last_modified'],
         supplier_is_on_framework=supplier_is_on_framework,
         supplier_pack_filename=supplier_pack_filename,
         result_letter_filename=result_letter_filename,
@@ -183,22 +206,14 @@ def framework_submission_services(framework_slug, lot_slug):
             draft = data_api_client.create_new_draft_service(
                 framework_slug, lot_slug, current_user.supplier_id, {}, current_user.email_address,
             )['services']
+            invalidate_drafts(framework_slug)
 
         return redirect(
             url_for('.view_service_submission',
                     framework_slug=framework_slug, lot_slug=lot_slug, service_id=draft['id'])
         )
 
-    for draft in itertools.chain(drafts, complete_drafts):
-        draft['priceString'] = format_service_price(draft)
-        content = content_loader.get_manifest(framework_slug, 'edit_submission').filter(draft)
-        sections = content.summary(draft)
-
-        unanswered_required, unanswered_optional = count_unanswered_questions(sections)
-        draft.update({
-            'unanswered_required': unanswered_required,
-            'unanswered_optional': unanswered_optional,
-        })
+    summarise_drafts(content_loader, framework_slug, itertools.chain(drafts, complete_drafts))
 
     return render_template(
         "frameworks/services.html",
@@ -253,8 +268,7 @@ def framework_supplier_declaration(framework_slug, section_id=None):
         if len(errors) > 0:
             status_code = 400
         else:
-            validator = get_validator(framework, content, all_answers)
-            if validator.get_error_messages():
+            if get_declaration_errors(framework, content, saved_answers, all_answers, submitted_answers):
                 all_answers.update({"status": "started"})
             else:
                 all_answers.update({"status": "complete"})
@@ -298,8 +312,9 @@ def framework_supplier_declaration(framework_slug, section_id=None):
 @main.route('/frameworks/<framework_slug>/files/<path:filepath>', methods=['GET'])
 @login_required
 def download_supplier_file(framework_slug, filepath):
-    uploader = s3.S3(current_app.config['DM_COMMUNICATIONS_BUCKET'])
-    url = get_signed_document_url(uploader, "{}/communications/{}".format(framework_slug, filepath))
+    url = get_signed_document_url(
+        current_app.config['DM_COMMUNICATIONS_BUCKET'], "{}/communications/{}".format(framework_slug, filepath)
+    )
     if not url:
         abort(404)
 
@@ -313,9 +328,8 @@ def download_agreement_file(framework_slug, document_name):
     if supplier_framework_info is None or not supplier_framework_info.get("declaration"):
         abort(404)
 
-    agreements_bucket = s3.S3(current_app.config['DM_AGREEMENTS_BUCKET'])
     path = get_agreement_document_path(framework_slug, current_user.supplier_id, document_name)
-    url = get_signed_url(agreements_bucket, path, current_app.config['DM_ASSETS_URL'])
+    url = get_signed_document_url(current_app.config['DM_AGREEMENTS_BUCKET'], path)
     if not url:
         abort(404)
 
@@ -332,16 +346,7 @@ def framework_updates(framework_slug, error_message=None, default_textbox_value=
                                    'user_id': current_user.id,
                                    'supplier_id': current_user.supplier_id})
 
-    communications_bucket = s3.S3(current_app.config['DM_COMMUNICATIONS_BUCKET'])
-    file_list = communications_bucket.list('{}/communications/updates/'.format(framework_slug), load_timestamps=True)
-    files = {
-        'communications': [],
-        'clarifications': [],
-    }
-    for file in file_list:
-        path_parts = file['path'].split('/')
-        file['path'] = '/'.join(path_parts[2:])
-        files[path_parts[3]].append(file)
+    communications = get_framework_communications(current_app.config['DM_COMMUNICATIONS_BUCKET'], framework_slug)
 
     return render_template(
         "frameworks/updates.html",
@@ -349,7 +354,7 @@ def framework_updates(framework_slug, error_message=None, default_textbox_value=
         clarification_question_name=CLARIFICATION_QUESTION_NAME,
         clarification_question_value=default_textbox_value,
         error_message=error_message,
-        files=files,
+        files=communications['updates'],
         dates=content_loader.get_message(framework_slug, 'dates'),
         agreement_countersigned=countersigned_framework_agreement_exists_in_bucket(
             framework_slug, current_app.config['DM_AGREEMENTS_BUCKET'])
@@ -493,48 +498,123 @@ def framework_agreement(framework_slug):
 @login_required
 def upload_framework_agreement(framework_slug):
     framework = get_framework(data_api_client, framework_slug, allowed_statuses=['standstill', 'live'])
-
-    supplier_framework = data_api_client.get_supplier_framework_info(
-        current_user.supplier_id, framework_slug
-    )['frameworkInterest']
-    if not supplier_framework or not supplier_framework['onFramework']:
-        abort(404)
+    supplier_framework = _get_supplier_framework_on_framework(framework_slug)
 
     upload_error = None
     if not file_is_less_than_5mb(request.files['agreement']):
         upload_error = "Document must be less than 5Mb"
     elif file_is_empty(request.files['agreement']):
         upload_error = "Document must not be empty"
+    elif not file_content_matches(request.files['agreement'], AGREEMENT_CONTENT_TYPES):
+        upload_error = "Document must be a PDF, JPG or PNG"
 
     if upload_error is not None:
-        return render_template(
-            "frameworks/agreement.html",
-            framework=framework,
-            supplier_framework=supplier_framework,
-            upload_error=upload_error,
-            agreement_filename=AGREEMENT_FILENAME
-        ), 400
+        return _render_agreement_upload_error(framework, supplier_framework, upload_error)
 
     agreements_bucket = s3.S3(current_app.config['DM_AGREEMENTS_BUCKET'])
     extension = get_extension(request.files['agreement'].filename)
 
-    path = get_agreement_document_path(
+    agreements_bucket.save(
+        _get_signed_agreement_path(framework_slug, extension),
+        request.files['agreement'],
+        acl='private',
+        download_filename=_get_signed_agreement_download_filename(extension)
+    )
+
+    _register_framework_agreement_returned(framework_slug, framework)
+
+    return redirect(url_for('.framework_agreement', framework_slug=framework_slug))
+
+
+@main.route('/frameworks/<framework_slug>/agreement/upload-policy', methods=['POST'])
+@login_required
+@flask_featureflags.is_active_feature('DIRECT_UPLOADS')
+def framework_agreement_upload_policy(framework_slug):
+    """A presigned POST policy for the browser to upload a signed agreement straight to S3"""
+    get_framework(data_api_client, framework_slug, allowed_statuses=['standstill', 'live'])
+    _get_supplier_framework_on_framework(framework_slug)
+
+    extension = get_extension(request.form.get('filename', ''))
+    content_type = AGREEMENT_CONTENT_TYPES.get(extension.lower())
+    if content_type is None:
+        return jsonify(error=AGREEMENT_UPLOAD_ERRORS['file_is_open_document_format']), 400
+
+    return jsonify(get_upload_policy(
+        current_app.config['DM_AGREEMENTS_BUCKET'],
+        _get_signed_agreement_path(framework_slug, extension),
+        content_type,
+        current_app.config['DM_UPLOAD_POLICY_EXPIRY'],
+        acl='private',
+        download_filename=_get_signed_agreement_download_filename(extension)
+    ))
+
+
+@main.route('/frameworks/<framework_slug>/agreement/uploaded', methods=['POST'])
+@login_required
+@flask_featureflags.is_active_feature('DIRECT_UPLOADS')
+def confirm_framework_agreement_upload(framework_slug):
+    """Record a signed agreement the browser has uploaded with a policy from `framework_agreement_upload_policy`.
+
+    Responds with the URL of the agreement page for the browser to go to next.
+
+    """
+    framework = get_framework(data_api_client, framework_slug, allowed_statuses=['standstill', 'live'])
+    _get_supplier_framework_on_framework(framework_slug)
+
+    path = request.form.get('key', '')
+    extension = get_extension(path)
+    if extension.lower() not in AGREEMENT_CONTENT_TYPES:
+        abort(400)
+    if path != _get_signed_agreement_path(framework_slug, extension):
+        abort(400)
+
+    upload_error = get_direct_upload_error(current_app.config['DM_AGREEMENTS_BUCKET'], path, AGREEMENT_CONTENT_TYPES)
+    if upload_error is not None:
+        return jsonify(error=AGREEMENT_UPLOAD_ERRORS[upload_error]), 400
+
+    _register_framework_agreement_returned(framework_slug, framework)
+
+    return jsonify(url=url_for('.framework_agreement', framework_slug=framework_slug))
+
+
+def _get_supplier_framework_on_framework(framework_slug):
+    supplier_framework = data_api_client.get_supplier_framework_info(
+        current_user.supplier_id, framework_slug
+    )['frameworkInterest']
+    if not supplier_framework or not supplier_framework['onFramework']:
+        abort(404)
+
+    return supplier_framework
+
+
+def _get_signed_agreement_path(framework_slug, extension):
+    return get_agreement_document_path(
         framework_slug,
         current_user.supplier_id,
         '{}{}'.format(SIGNED_AGREEMENT_PREFIX, extension)
     )
-    agreements_bucket.save(
-        path,
-        request.files['agreement'],
-        acl='private',
-        download_filename='{}-{}-{}{}'.format(
-            sanitise_supplier_name(current_user.supplier_name),
-            current_user.supplier_id,
-            SIGNED_AGREEMENT_PREFIX,
-            extension
-        )
+
+
+def _get_signed_agreement_download_filename(extension):
+    return '{}-{}-{}{}'.format(
+        sanitise_supplier_name(current_user.supplier_name),
+        current_user.supplier_id,
+        SIGNED_AGREEMENT_PREFIX,
+        extension
     )
 
+
+def _render_agreement_upload_error(framework, supplier_framework, upload_error):
+    return render_template(
+        "frameworks/agreement.html",
+        framework=framework,
+        supplier_framework=supplier_framework,
+        upload_error=upload_error,
+        agreement_filename=AGREEMENT_FILENAME
+    ), 400
+
+
+def _register_framework_agreement_returned(framework_slug, framework):
     data_api_client.register_framework_agreement_returned(
         current_user.supplier_id, framework_slug, current_user.email_address)
 
@@ -564,5 +644,3 @@ def upload_framework_agreement(framework_slug):
                    'supplier_id': current_user.supplier_id,
                    'email_hash': hash_email(current_user.email_address)})
         abort(503, "Framework agreement email failed to send")
-
-    return redirect(url_for('.framework_agreement', framework_slug=framework_slug))
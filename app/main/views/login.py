@@ -7,11 +7,11 @@ from flask_login import login_user
 from dmapiclient import HTTPError
 from dmapiclient.audit import AuditTypes
 from dmutils.user import User
-from dmutils.email import decode_invitation_token, generate_token, send_email, MandrillException
+from dmutils.email import decode_invitation_token, generate_token, MandrillException
 
 from .. import main
 from ..forms.auth_forms import EmailAddressForm, CreateUserForm
-from ..helpers import hash_email, login_required
+from ..helpers import hash_email, login_required, send_email
 from ... import data_api_client
 
 
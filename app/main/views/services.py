@@ -1,16 +1,19 @@
 from flask_login import current_user
-from flask import render_template, request, redirect, url_for, abort, flash, current_app
+from flask import render_template, request, redirect, url_for, abort, flash, current_app, jsonify
 
 from ... import data_api_client, flask_featureflags
 from ...main import main, content_loader
 from ..helpers import login_required
 from ..helpers.services import is_service_associated_with_supplier, get_signed_document_url, count_unanswered_questions, \
-    get_next_section_name
+    get_next_section_name, invalidate_drafts
 from ..helpers.frameworks import get_framework_and_lot, get_declaration_status
+from ..helpers.uploads import (
+    SERVICE_DOCUMENT_CONTENT_TYPES, get_direct_upload_error, get_service_document_path, get_upload_field_names,
+    get_upload_policy, is_service_document_path, upload_service_documents
+)
 
 from dmapiclient import HTTPError
-from dmutils import s3
-from dmutils.documents import upload_service_documents
+from dmutils.documents import get_extension
 
 
 @main.route('/services')
@@ -163,11 +166,7 @@ def start_new_draft_service(framework_slug, lot_slug):
 
     framework, lot = get_framework_and_lot(data_api_client, framework_slug, lot_slug, allowed_statuses=['open'])
 
-    content = content_loader.get_manifest(framework_slug, 'edit_submission').filter(
-        {'lot': lot['slug']}
-    )
-
-    section = content.get_section(content.get_next_editable_section_id())
+    section = content_loader.get_first_editable_section(framework_slug, 'edit_submission', lot['slug'])
 
     return render_template(
         "services/edit_submission_section.html",
@@ -184,11 +183,7 @@ def create_new_draft_service(framework_slug, lot_slug):
 
     framework, lot = get_framework_and_lot(data_api_client, framework_slug, lot_slug, allowed_statuses=['open'])
 
-    content = content_loader.get_manifest(framework_slug, 'edit_submission').filter(
-        {'lot': lot['slug']}
-    )
-
-    section = content.get_section(content.get_next_editable_section_id())
+    section = content_loader.get_first_editable_section(framework_slug, 'edit_submission', lot['slug'])
 
     update_data = section.get_data(request.form)
 
@@ -197,6 +192,7 @@ def create_new_draft_service(framework_slug, lot_slug):
             framework_slug, lot['slug'], current_user.supplier_id, update_data,
             current_user.email_address, page_questions=section.get_field_names()
         )['services']
+        invalidate_drafts(framework_slug)
     except HTTPError as e:
         update_data = section.unformat_data(update_data)
         errors = section.get_error_messages(e.message)
@@ -231,14 +227,13 @@ def copy_draft_service(framework_slug, lot_slug, service_id):
     if not is_service_associated_with_supplier(draft):
         abort(404)
 
-    content = content_loader.get_manifest(framework_slug, 'edit_submission').filter(
-        {'lot': lot['slug']}
-    )
+    content = content_loader.get_lot_manifest(framework_slug, 'edit_submission', lot['slug'])
 
     draft_copy = data_api_client.copy_draft_service(
         service_id,
         current_user.email_address
     )['services']
+    invalidate_drafts(framework_slug)
 
     return redirect(url_for(".edit_service_submission",
                             framework_slug=framework['slug'],
@@ -265,6 +260,7 @@ def complete_draft_service(framework_slug, lot_slug, service_id):
         service_id,
         current_user.email_address
     )
+    invalidate_drafts(framework_slug)
 
     flash({
         'service_name': draft.get('serviceName') or draft.get('lotName'),
@@ -301,6 +297,7 @@ def delete_draft_service(framework_slug, lot_slug, service_id):
             service_id,
             current_user.email_address
         )
+        invalidate_drafts(framework_slug)
 
         flash({'service_name': draft.get('serviceName', draft['lotName'])}, 'service_deleted')
         if lot['oneServiceLimit']:
@@ -323,8 +320,7 @@ def service_submission_document(framework_slug, supplier_id, document_name):
     if current_user.supplier_id != supplier_id:
         abort(404)
 
-    uploader = s3.S3(current_app.config['DM_SUBMISSIONS_BUCKET'])
-    s3_url = get_signed_document_url(uploader,
+    s3_url = get_signed_document_url(current_app.config['DM_SUBMISSIONS_BUCKET'],
                                      "{}/submissions/{}/{}".format(framework_slug, supplier_id, document_name))
     if not s3_url:
         abort(404)
@@ -349,7 +345,7 @@ def view_service_submission(framework_slug, lot_slug, service_id):
     if not is_service_associated_with_supplier(draft):
         abort(404)
 
-    content = content_loader.get_manifest(framework['slug'], 'edit_submission').filter(draft)
+    content = content_loader.get_filtered_manifest(framework['slug'], 'edit_submission', draft)
 
     sections = content.summary(draft)
 
@@ -392,7 +388,7 @@ def edit_service_submission(framework_slug, lot_slug, service_id, section_id, qu
     if not is_service_associated_with_supplier(draft):
         abort(404)
 
-    content = content_loader.get_manifest(framework_slug, 'edit_submission').filter(draft)
+    content = content_loader.get_filtered_manifest(framework_slug, 'edit_submission', draft)
     section = content.get_section(section_id)
     if section and (question_slug is not None):
         section = section.get_question_as_section(question_slug)
@@ -432,7 +428,7 @@ def update_section_submission(framework_slug, lot_slug, service_id, section_id,
     if not is_service_associated_with_supplier(draft):
         abort(404)
 
-    content = content_loader.get_manifest(framework_slug, 'edit_submission').filter(draft)
+    content = content_loader.get_filtered_manifest(framework_slug, 'edit_submission', draft)
     section = content.get_section(section_id)
     if section and (question_slug is not None):
         section = section.get_question_as_section(question_slug)
@@ -443,10 +439,9 @@ def update_section_submission(framework_slug, lot_slug, service_id, section_id,
     errors = None
     update_data = section.get_data(request.form)
 
-    uploader = s3.S3(current_app.config['DM_SUBMISSIONS_BUCKET'])
     documents_url = url_for('.dashboard', _external=True) + '/assets/'
     uploaded_documents, document_errors = upload_service_documents(
-        uploader, documents_url, draft, request.files, section,
+        current_app.config['DM_SUBMISSIONS_BUCKET'], documents_url, draft, request.files, section,
         public=False)
 
     if document_errors:
@@ -462,6 +457,7 @@ def update_section_submission(framework_slug, lot_slug, service_id, section_id,
                 current_user.email_address,
                 page_questions=section.get_field_names()
             )
+            invalidate_drafts(framework_slug)
         except HTTPError as e:
             update_data = section.unformat_data(update_data)
             errors = section.get_error_messages(e.message)
@@ -500,6 +496,85 @@ def update_section_submission(framework_slug, lot_slug, service_id, section_id,
                                 _anchor=section_id))
 
 
+@main.route('/frameworks/<framework_slug>/submissions/<lot_slug>/<service_id>/edit/<section_id>/upload-policy',
+            methods=['POST'])
+@login_required
+@flask_featureflags.is_active_feature('DIRECT_UPLOADS')
+def section_document_upload_policy(framework_slug, lot_slug, service_id, section_id):
+    """A presigned POST policy for the browser to upload one of a section's documents straight to S3"""
+    draft, section = _get_draft_section_to_update(framework_slug, lot_slug, service_id, section_id)
+
+    field = request.form.get('field')
+    if field not in get_upload_field_names(section):
+        abort(400)
+
+    filename = request.form.get('filename', '')
+    content_type = SERVICE_DOCUMENT_CONTENT_TYPES.get(get_extension(filename).lower())
+    if content_type is None:
+        return jsonify(errors={field: 'file_is_open_document_format'}), 400
+
+    return jsonify(get_upload_policy(
+        current_app.config['DM_SUBMISSIONS_BUCKET'],
+        get_service_document_path(draft, field, filename),
+        content_type,
+        current_app.config['DM_UPLOAD_POLICY_EXPIRY']
+    ))
+
+
+@main.route('/frameworks/<framework_slug>/submissions/<lot_slug>/<service_id>/edit/<section_id>/uploaded',
+            methods=['POST'])
+@login_required
+@flask_featureflags.is_active_feature('DIRECT_UPLOADS')
+def confirm_section_document_upload(framework_slug, lot_slug, service_id, section_id):
+    """Save a document the browser has uploaded with a policy from `section_document_upload_policy` to the draft"""
+    draft, section = _get_draft_section_to_update(framework_slug, lot_slug, service_id, section_id)
+
+    field = request.form.get('field')
+    path = request.form.get('key', '')
+    if field not in get_upload_field_names(section) or not is_service_document_path(draft, field, path):
+        abort(400)
+
+    error = get_direct_upload_error(current_app.config['DM_SUBMISSIONS_BUCKET'], path, SERVICE_DOCUMENT_CONTENT_TYPES)
+    if error is not None:
+        return jsonify(errors={field: error}), 400
+
+    document_url = url_for('.dashboard', _external=True) + '/assets/' + path
+    try:
+        data_api_client.update_draft_service(
+            service_id,
+            {field: document_url},
+            current_user.email_address,
+            page_questions=[field]
+        )
+        invalidate_drafts(framework_slug)
+    except HTTPError as e:
+        return jsonify(errors=e.message), 400
+
+    return jsonify(url=document_url)
+
+
+def _get_draft_section_to_update(framework_slug, lot_slug, service_id, section_id):
+    get_framework_and_lot(data_api_client, framework_slug, lot_slug, allowed_statuses=['open'])
+
+    try:
+        draft = data_api_client.get_draft_service(service_id)['services']
+    except HTTPError as e:
+        abort(e.status_code)
+
+    if draft['lotSlug'] != lot_slug or draft['frameworkSlug'] != framework_slug:
+        abort(404)
+
+    if not is_service_associated_with_supplier(draft):
+        abort(404)
+
+    content = content_loader.get_filtered_manifest(framework_slug, 'edit_submission', draft)
+    section = content.get_section(section_id)
+    if section is None or not section.editable:
+        abort(404)
+
+    return draft, section
+
+
 @main.route('/frameworks/<framework_slug>/submissions/<lot_slug>/<service_id>/remove/<section_id>/<question_slug>',
             methods=['GET', 'POST'])
 @login_required
@@ -512,7 +587,7 @@ def remove_subsection(framework_slug, lot_slug, service_id, section_id, question
     if not is_service_associated_with_supplier(draft):
         abort(404)
 
-    content = content_loader.get_manifest(framework_slug, 'edit_submission').filter(draft)
+    content = content_loader.get_filtered_manifest(framework_slug, 'edit_submission', draft)
     section = content.get_section(section_id)
     containing_section = section
     if section and (question_slug is not None):
@@ -532,6 +607,7 @@ def remove_subsection(framework_slug, lot_slug, service_id, section_id, question
                 update_json,
                 current_user.email_address
             )
+            invalidate_drafts(draft['frameworkSlug'])
             flash({'service_name': question_to_remove.label}, 'service_deleted')
         except HTTPError as e:
             if e.status_code == 400:
@@ -8,36 +8,42 @@ import six
 
 from dmapiclient import APIError
 from dmapiclient.audit import AuditTypes
-from dmutils.email import send_email, generate_token, MandrillException
+from dmutils.email import generate_token, MandrillException
 from dmcontent.content_loader import ContentNotFoundError
 
 from ...main import main, content_loader
 from ... import data_api_client
+from ...parallel import submit, gather
 from ..forms.suppliers import (
     EditSupplierForm, EditContactInformationForm, DunsNumberForm, CompaniesHouseNumberForm,
     CompanyContactDetailsForm, CompanyNameForm, EmailAddressForm
 )
 from ..helpers.frameworks import get_frameworks_by_status
-from ..helpers import hash_email, login_required
+from ..helpers import hash_email, login_required, send_email
 from .users import get_current_suppliers_users
 
 
 @main.route('')
 @login_required
 def dashboard():
-    supplier = data_api_client.get_supplier(
-        current_user.supplier_id
-    )['suppliers']
+    supplier, all_frameworks, supplier_frameworks, users = gather(
+        submit(data_api_client.get_supplier, current_user.supplier_id),
+        submit(data_api_client.find_frameworks),
+        submit(data_api_client.get_supplier_frameworks, current_user.supplier_id),
+        submit(get_current_suppliers_users),
+    )
+
+    supplier = supplier['suppliers']
     supplier['contact'] = supplier['contactInformation'][0]
 
     all_frameworks = sorted(
-        data_api_client.find_frameworks()['frameworks'],
+        all_frameworks['frameworks'],
         key=lambda framework: framework['slug'],
         reverse=True
     )
     supplier_frameworks = {
         framework['frameworkSlug']: framework
-        for framework in data_api_client.get_supplier_frameworks(current_user.supplier_id)['frameworkInterest']
+        for framework in supplier_frameworks['frameworkInterest']
     }
 
     for framework in all_frameworks:
@@ -67,7 +73,7 @@ def dashboard():
     return render_template(
         "suppliers/dashboard.html",
         supplier=supplier,
-        users=get_current_suppliers_users(),
+        users=users,
         frameworks={
             'coming': get_frameworks_by_status(all_frameworks, 'coming'),
             'open': get_frameworks_by_status(all_frameworks, 'open'),
@@ -2,6 +2,7 @@ from flask_login import current_user
 from flask import render_template, abort, flash, url_for, redirect, current_app
 
 from ..helpers import login_required
+from ..helpers.users import invalidate_user
 from ...main import main
 from ... import data_api_client
 
@@ -73,6 +74,7 @@ def deactivate_user(user_id):
         abort(404)
 
     data_api_client.update_user(user_id=user_to_deactivate['id'], active=False, updater=current_user.email_address)
+    invalidate_user(user_to_deactivate['id'])
 
     flash({
         'deactivate_user_name': user_to_deactivate['name'],
@@ -0,0 +1,211 @@
+import os
+import threading
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
+
+import six
+from flask import abort, current_app, _app_ctx_stack, _request_ctx_stack
+
+
+# The config setting for the number of threads in each worker thread pool
+POOL_SIZE_SETTINGS = {
+    'fetch': 'DM_PARALLEL_FETCH_POOL_SIZE',
+    'upload': 'DM_PARALLEL_UPLOAD_POOL_SIZE',
+}
+
+_pools = {}
+_pools_pid = None
+_pool_lock = threading.Lock()
+_worker = threading.local()
+
+
+def submit(func, *args, **kwargs):
+    """Start calling `func(*args, **kwargs)` on the shared `fetch` worker thread pool, as `submit_to` does"""
+    return submit_to('fetch', func, *args, **kwargs)
+
+
+def submit_to(pool_name, func, *args, **kwargs):
+    """Start calling `func(*args, **kwargs)` on one of the shared worker thread pools.
+
+    Each pool's size is set by its setting in `POOL_SIZE_SETTINGS`. They're
+    kept apart so that slow work, like uploading files to S3, can't hold up
+    the API calls that pages wait for.
+
+    The call runs in the caller's application and request contexts, so it can
+    use `current_app`, `request` and `current_user` as usual. Returns a
+    `PendingCall`: its `get(timeout=None)` method waits for the return value,
+    re-raising any exception from the call.
+
+    Calls still waiting for a worker when their request ends, or when
+    `wait_for` or `wait_for_optional` give up on them, are cancelled and
+    never run. Calls that have already started can't be stopped, and finish
+    after the request has been torn down; their results are thrown away, so
+    they shouldn't change `session` or `g`.
+
+    Calls made from inside a pool worker run straight away in that worker, so
+    nested fetches can't deadlock the pool.
+
+    """
+    app_ctx = _app_ctx_stack.top
+    if app_ctx is None:
+        raise RuntimeError("Parallel fetches need an application context")
+    request_ctx = _request_ctx_stack.top
+
+    if getattr(_worker, 'active', False):
+        return CompletedResult.from_call(func, *args, **kwargs)
+
+    call = PendingCall()
+    if request_ctx is not None:
+        if not hasattr(request_ctx, 'parallel_calls'):
+            request_ctx.parallel_calls = []
+        request_ctx.parallel_calls.append(call)
+
+    pool = _get_pool(app_ctx.app, pool_name)
+    call.result = pool.apply_async(_call_in_context, (call, app_ctx, request_ctx, func, args, kwargs))
+    return call
+
+
+def gather(*results):
+    """Wait for several submitted calls and return their values in order"""
+    return [result.get() for result in results]
+
+
+def wait_for(result, timeout):
+    """Wait for a call the page can't do without, aborting with a 503 if it takes too long.
+
+    The timeout includes any time the call spends waiting for a worker.
+
+    """
+    try:
+        return result.get(timeout)
+    except TimeoutError:
+        result.cancel()
+        abort(503, "Timed out waiting for a dependency")
+
+
+def wait_for_optional(result, timeout, default, name):
+    """Wait for a call the page can do without, returning `default` if it fails or takes too long.
+
+    The timeout includes any time the call spends waiting for a worker.
+
+    """
+    try:
+        return result.get(timeout)
+    except TimeoutError:
+        result.cancel()
+        current_app.logger.warning(
+            "{name} timed out after {timeout} seconds",
+            extra={'name': name, 'timeout': timeout})
+    except Exception as e:
+        current_app.logger.warning(
+            "{name} failed: {error}",
+            extra={'name': name, 'error': six.text_type(e)})
+
+    return default
+
+
+def init_app(app):
+    app.teardown_request(_cancel_request_calls)
+
+
+class CallCancelled(Exception):
+    """Raised by `PendingCall.get` for a call that was cancelled before it ran"""
+
+
+class PendingCall(object):
+    """A call submitted to a worker pool, which can be cancelled until it starts"""
+    def __init__(self):
+        self.result = None
+        self._lock = threading.Lock()
+        self._started = False
+        self._cancelled = False
+
+    def start(self):
+        """Mark the call as started, returning False if it's been cancelled"""
+        with self._lock:
+            self._started = not self._cancelled
+            return self._started
+
+    def cancel(self):
+        """Stop the call from running if it hasn't started, returning whether it was stopped"""
+        with self._lock:
+            if not self._started:
+                self._cancelled = True
+            return self._cancelled
+
+    def ready(self):
+        return self.result.ready()
+
+    def successful(self):
+        return self.result.successful()
+
+    def get(self, timeout=None):
+        return self.result.get(timeout)
+
+
+class CompletedResult(object):
+    """An `AsyncResult` look-alike for a call that has already finished"""
+    def __init__(self, value=None, exception=None):
+        self._value = value
+        self._exception = exception
+
+    @classmethod
+    def from_call(cls, func, *args, **kwargs):
+        try:
+            return cls(value=func(*args, **kwargs))
+        except Exception as e:
+            return cls(exception=e)
+
+    def cancel(self):
+        return False
+
+    def ready(self):
+        return True
+
+    def successful(self):
+        return self._exception is None
+
+    def get(self, timeout=None):
+        if self._exception is not None:
+            raise self._exception
+        return self._value
+
+
+def _call_in_context(call, app_ctx, request_ctx, func, args, kwargs):
+    if not call.start():
+        raise CallCancelled()
+
+    _worker.active = True
+
+    # The contexts are shared with the calling thread rather than pushed as new
+    # ones: pushing a request context again would reopen the session and run
+    # the request teardown handlers when the call finishes.
+    _app_ctx_stack.push(app_ctx)
+    if request_ctx is not None:
+        _request_ctx_stack.push(request_ctx)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        if request_ctx is not None:
+            _request_ctx_stack.pop()
+        _app_ctx_stack.pop()
+
+
+def _cancel_request_calls(exception=None):
+    # Calls that haven't started yet would otherwise run with the torn down request context
+    for call in getattr(_request_ctx_stack.top, 'parallel_calls', []):
+        call.cancel()
+
+
+def _get_pool(app, pool_name):
+    global _pools_pid
+
+    # Threads don't survive a fork, so each worker process needs its own pools
+    with _pool_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        if pool_name not in _pools:
+            _pools[pool_name] = ThreadPool(app.config[POOL_SIZE_SETTINGS[pool_name]])
+
+    return _pools[pool_name]
@@ -2,6 +2,7 @@ from flask import jsonify, current_app, request
 
 from . import status
 from .. import data_api_client
+from ..cache import get_cache_stats
 from dmutils.status import get_flags
 
 
@@ -21,7 +22,9 @@ def status():
             status="ok",
             version=version,
             api_status=api_status,
-            flags=get_flags(current_app)
+            flags=get_flags(current_app),
+            caches=get_cache_stats(),
+            data_api_pool=data_api_client.pool_stats()
         )
 
     return jsonify(
@@ -0,0 +1,115 @@
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import jinja2
+from dmutils import s3
+from flask import current_app, _request_ctx_stack
+
+
+# Categories in the order they're reported, with their Server-Timing descriptions
+CATEGORIES = [
+    ('api', 'Data API'),
+    ('s3', 'S3'),
+    ('email', 'Email'),
+    ('render', 'Templates'),
+]
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def timer(category):
+    """Add the time taken by the `with` block to the current request's `category` total.
+
+    Requests record how many calls they make to each of the services pages
+    depend on and how long those calls take in total, to be reported in the
+    `Server-Timing` header and the request log. Calls made in parallel are
+    added up, so a total can be longer than the request itself.
+
+    """
+    start_time = time.time()
+    try:
+        yield
+    finally:
+        _record(category, time.time() - start_time)
+
+
+def timed(category):
+    """Decorator version of `timer`"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(category):
+                return func(*args, **kwargs)
+        wrapper.timed_category = category
+        return wrapper
+    return decorator
+
+
+def get_timings():
+    ctx = _request_ctx_stack.top
+    with _lock:
+        return {category: list(totals) for category, totals in getattr(ctx, 'upstream_timings', {}).items()}
+
+
+def init_app(app):
+    app.jinja_env.template_class = TimedTemplate
+    _time_s3_calls()
+    app.after_request(_report_timings)
+
+
+class TimedTemplate(jinja2.Template):
+    def render(self, *args, **kwargs):
+        with timer('render'):
+            return super(TimedTemplate, self).render(*args, **kwargs)
+
+
+def _record(category, duration):
+    ctx = _request_ctx_stack.top
+    if ctx is None:
+        return
+
+    # Parallel fetches share the request context, so can record at the same time
+    with _lock:
+        if not hasattr(ctx, 'upstream_timings'):
+            ctx.upstream_timings = {}
+        totals = ctx.upstream_timings.setdefault(category, [0, 0.0])
+        totals[0] += 1
+        totals[1] += duration
+
+
+def _time_s3_calls():
+    if not inspect.isclass(s3.S3):
+        return
+
+    for name, attr in list(vars(s3.S3).items()):
+        if inspect.isfunction(attr) and not name.startswith('_') and not hasattr(attr, 'timed_category'):
+            setattr(s3.S3, name, timed('s3')(attr))
+
+
+def _report_timings(response):
+    timings = get_timings()
+    if not timings:
+        return response
+
+    response.headers['Server-Timing'] = ', '.join(
+        '{};dur={:.1f};desc="{} ({} calls)"'.format(category, timings[category][1] * 1000, description,
+                                                    timings[category][0])
+        for category, description in CATEGORIES if category in timings
+    )
+
+    extra = {}
+    for category, (count, duration) in timings.items():
+        extra['{}_calls'.format(category)] = count
+        extra['{}_time'.format(category)] = duration
+    current_app.logger.info(
+        "Upstream timings: " + ", ".join(
+            "{category}: {{{category}_calls}} calls in {{{category}_time}}s".format(category=category)
+            for category, _ in CATEGORIES if category in timings
+        ),
+        extra=extra)
+
+    return response
@@ -2,7 +2,11 @@
 
 import os
 import re
+import sys
 from app import create_app
+from app.cache import flush_caches
+from app.main import content_loader, CONTENT_SNAPSHOT_PATH
+from app.main.helpers.bulk_validation import validate_declarations as validate_declaration_dump
 from dmutils import init_manager
 
 application = create_app(
@@ -16,5 +20,36 @@ application.jinja_options = {
 
 manager = init_manager(application, 5003, ['./app/content/frameworks'])
 
+
+@manager.option('names', nargs='*', help="Caches to flush (all of them if none are given)")
+def flush_cache(names):
+    """Flush process-wide caches in every worker on this host"""
+    flush_caches(names or None)
+
+
+@manager.command
+def build_content_snapshot():
+    """Parse all framework content and save it for workers to load at startup"""
+    content_loader.save_snapshot(CONTENT_SNAPSHOT_PATH)
+
+
+@manager.option('framework_slug', help="Framework the declarations are for")
+@manager.option('-i', '--input', dest='input_path', default='-',
+                help="JSONL file of declarations, one {\"supplierId\": ..., \"declaration\": {...}} per line")
+@manager.option('-o', '--output', dest='output_path', default='-', help="File to write JSONL results to")
+@manager.option('-p', '--processes', dest='processes', type=int, default=None,
+                help="Number of worker processes (the number of CPUs by default)")
+def validate_declarations(framework_slug, input_path, output_path, processes):
+    """Validate every supplier declaration in a JSONL dump, for example after declaration content changes"""
+    input_file = sys.stdin if input_path == '-' else open(input_path)
+    output_file = sys.stdout if output_path == '-' else open(output_path, 'w')
+    try:
+        validate_declaration_dump(framework_slug, input_file, output_file, processes)
+    finally:
+        for f in (input_file, output_file):
+            if f not in (sys.stdin, sys.stdout):
+                f.close()
+
+
 if __name__ == '__main__':
     manager.run()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+"""Benchmark declaration validation on generated supplier declarations.
+
+Run from the project root with `python -m benchmarks.declaration_validation`.
+
+Declarations are generated from each framework's declaration manifest:
+G-Cloud 7 ones start from `FULL_G7_SUBMISSION`, the others from an answer to
+every question. Some answers are then dropped or changed, so the validators
+see both complete declarations and ones with errors.
+
+Results are written as JSON, with the latency of each validator method in
+microseconds and, on Python 3, the memory it allocates in bytes: the most
+in use at once during a call, and how much is still in use afterwards
+(including the return value). Python 2 has no `tracemalloc`, so a note
+that allocations weren't measured is printed to stderr instead. With
+`--baseline`, each result also has the relative change in its median
+latency.
+
+"""
+from __future__ import division
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+from app.main import content_loader
+from app.main.helpers.validation import VALIDATORS, get_validator
+from tests.fixtures import FULL_G7_SUBMISSION
+
+timer = getattr(time, 'perf_counter', time.time)
+
+FRAMEWORKS = ['g-cloud-7', 'digital-outcomes-and-specialists', 'g-cloud-8']
+
+# Fraction of answers dropped or changed in each generated declaration
+DROPPED_ANSWERS = 0.02
+CHANGED_ANSWERS = 0.05
+
+
+def generate_declarations(framework_slug, content, count, rng):
+    complete = FULL_G7_SUBMISSION if framework_slug == 'g-cloud-7' else complete_declaration(framework_slug, content)
+    fields = sorted(complete)
+
+    declarations = []
+    for _ in range(count):
+        declaration = dict(complete)
+        for field in fields:
+            roll = rng.random()
+            if roll < DROPPED_ANSWERS:
+                del declaration[field]
+            elif roll < DROPPED_ANSWERS + CHANGED_ANSWERS:
+                declaration[field] = changed_answer(declaration[field], rng)
+        declarations.append(declaration)
+
+    return declarations
+
+
+def complete_declaration(framework_slug, content):
+    validator_cls = VALIDATORS[framework_slug]
+    email_fields = set(validator_cls.email_validation_fields or [])
+    number_string_fields = dict(validator_cls.number_string_fields or [])
+
+    declaration = {}
+    for section in content:
+        for question_id in section.get_question_ids():
+            question = content.get_question(question_id)
+            if question_id in email_fields:
+                declaration[question_id] = 'supplier@example.com'
+            elif question_id in number_string_fields:
+                declaration[question_id] = '1' * number_string_fields[question_id]
+            else:
+                declaration[question_id] = answer_for(question)
+
+    return declaration
+
+
+def answer_for(question):
+    options = [option.get('value', option.get('label')) for option in question.get('options') or []]
+    question_type = question.get('type')
+
+    if question_type == 'boolean':
+        return True
+    if question_type == 'checkboxes':
+        return options[:1]
+    if question_type == 'radios' and options:
+        return options[0]
+    return 'An answer to the question'
+
+
+def changed_answer(answer, rng):
+    if isinstance(answer, bool):
+        return not answer
+    if isinstance(answer, list):
+        return []
+    return rng.choice(['', 'x' * 5001, 'other (please specify)', answer])
+
+
+def measure(func, calls):
+    """Latencies in microseconds and bytes allocated for each call of `func` in `calls`"""
+    latencies = []
+    for args in calls:
+        start = timer()
+        func(*args)
+        latencies.append((timer() - start) * 1e6)
+
+    allocations = []
+    if tracemalloc is not None:
+        # Measured separately, as tracing allocations slows every call down
+        tracemalloc.start()
+        for args in calls:
+            tracemalloc.clear_traces()
+            result = func(*args)
+            retained, peak = tracemalloc.get_traced_memory()
+            allocations.append((peak, retained))
+            del result
+        tracemalloc.stop()
+
+    return summarise(latencies, allocations)
+
+
+def summarise(latencies, allocations):
+    latencies = sorted(latencies)
+    result = {
+        'calls': len(latencies),
+        'mean_us': sum(latencies) / len(latencies),
+        'median_us': percentile(latencies, 50),
+        'p95_us': percentile(latencies, 95),
+        'max_us': latencies[-1],
+    }
+    if allocations:
+        peaks, retained = zip(*allocations)
+        result['mean_peak_bytes'] = sum(peaks) / len(peaks)
+        result['max_peak_bytes'] = max(peaks)
+        result['mean_retained_bytes'] = sum(retained) / len(retained)
+
+    return result
+
+
+def percentile(values, percent):
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+def run(declaration_count, seed):
+    rng = random.Random(seed)
+    results = []
+
+    for framework_slug in FRAMEWORKS:
+        framework = {'slug': framework_slug}
+        content = content_loader.get_manifest(framework_slug, 'declaration')
+        declarations = generate_declarations(framework_slug, content, declaration_count, rng)
+        validators = [get_validator(framework, content, declaration) for declaration in declarations]
+        name = type(validators[0]).__name__
+
+        # Indexes are built on first use, which shouldn't count towards any one call
+        validators[0].get_error_messages()
+
+        benchmarks = [
+            ('get_error_messages', lambda validator: validator.get_error_messages(),
+             [(validator,) for validator in validators]),
+            ('get_error_messages_for_page', lambda validator, section: validator.get_error_messages_for_page(section),
+             [(validator, section) for validator in validators for section in content]),
+            ('get_required_fields', lambda validator: validator.get_required_fields(),
+             [(validator,) for validator in validators]),
+        ]
+        for method, func, calls in benchmarks:
+            result = measure(func, calls)
+            result.update(name='{}.{}'.format(name, method), framework=framework_slug)
+            results.append(result)
+
+    return results
+
+
+def compare(results, baseline):
+    baseline_results = dict((result['name'], result) for result in baseline['results'])
+    for result in results:
+        previous = baseline_results.get(result['name'])
+        if previous:
+            result['median_change'] = (result['median_us'] - previous['median_us']) / previous['median_us']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark declaration validation")
+    parser.add_argument('--declarations', type=int, default=500,
+                        help="Declarations to generate for each framework")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for generating declarations")
+    parser.add_argument('--output', help="File to write results to, rather than stdout")
+    parser.add_argument('--baseline', help="Results of an earlier run, to report changes against")
+    args = parser.parse_args(argv)
+
+    if tracemalloc is None:
+        sys.stderr.write("tracemalloc is not available on Python {}: allocations not measured\n".format(
+            platform.python_version()))
+
+    results = run(args.declarations, args.seed)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+    report = {
+        'python': platform.python_version(),
+        'allocations_measured': tracemalloc is not None,
+        'declarations': args.declarations,
+        'seed': args.seed,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,47 @@ class Config(object):
     DM_SUBMISSIONS_BUCKET = None
     DM_ASSETS_URL = None
 
+    # Content is loaded when first used. Frameworks listed here are loaded when the app starts.
+    DM_PRELOAD_CONTENT_FRAMEWORKS = []
+
+    # Connections to the Data API are pooled and reused, see app/api_client.py.
+    # POOL_CONNECTIONS is the number of hosts to keep pools for and POOL_MAXSIZE
+    # the number of connections kept per host, which should be at least the
+    # number of threads in a worker that make API calls.
+    DM_DATA_API_POOL_CONNECTIONS = 2
+    DM_DATA_API_POOL_MAXSIZE = 10
+    DM_DATA_API_POOL_BLOCK = False
+    DM_DATA_API_CONNECT_TIMEOUT = 3.05
+    DM_DATA_API_READ_TIMEOUT = 15
+
+    # Process-wide caches, see app/cache.py
+    DM_CACHE_FLUSH_DIR = '/tmp/digitalmarketplace-supplier-frontend/cache'
+    DM_FRAMEWORK_CACHE_TTL = 30
+    DM_SETTLED_FRAMEWORK_CACHE_TTL = 3600
+    DM_DRAFTS_CACHE_TTL = 60
+    DM_DRAFT_SUMMARY_CACHE_TTL = 3600
+    DM_BRIEF_CACHE_TTL = 60
+    DM_USER_CACHE_TTL = 60
+    DM_DECLARATION_ERRORS_CACHE_TTL = 3600
+    DM_COMMUNICATIONS_CACHE_TTL = 300
+    DM_COUNTERSIGNED_AGREEMENT_CACHE_TTL = None
+    DM_MISSING_COUNTERSIGNED_AGREEMENT_CACHE_TTL = 60
+    DM_SIGNED_URL_CACHE_TTL = 3600
+    # Seconds before a signed URL expires that it stops being handed out
+    DM_SIGNED_URL_EXPIRY_MARGIN = 10
+    # Seconds a presigned policy for uploading a document straight to S3 can be used for
+    DM_UPLOAD_POLICY_EXPIRY = 600
+
+    # Worker threads shared by all requests for making independent API calls at once
+    DM_PARALLEL_FETCH_POOL_SIZE = 10
+    # Seconds a page waits for each of its parallel fetches
+    DM_DATA_API_FETCH_TIMEOUT = 20
+    DM_S3_FETCH_TIMEOUT = 3
+    # Worker threads shared by all requests for uploading a section's documents to S3 at once
+    DM_PARALLEL_UPLOAD_POOL_SIZE = 4
+    # Seconds a request waits for its document uploads before giving up on them
+    DM_UPLOAD_TIMEOUT = 60
+
     DEBUG = False
 
     RESET_PASSWORD_EMAIL_NAME = 'Digital Marketplace Admin'
@@ -68,6 +109,7 @@ class Config(object):
     RAISE_ERROR_ON_MISSING_FEATURES = True
 
     FEATURE_FLAGS_EDIT_SECTIONS = False
+    FEATURE_FLAGS_DIRECT_UPLOADS = False
 
     # Logging
     DM_LOG_LEVEL = 'DEBUG'
@@ -95,9 +137,23 @@ class Test(Config):
     DM_CLARIFICATION_QUESTION_EMAIL = 'digitalmarketplace@mailinator.com'
 
     FEATURE_FLAGS_EDIT_SECTIONS = enabled_since('2015-06-03')
+    FEATURE_FLAGS_DIRECT_UPLOADS = enabled_since('2016-10-16')
 
     DM_DATA_API_AUTH_TOKEN = 'myToken'
 
+    DM_CACHE_FLUSH_DIR = None
+    DM_FRAMEWORK_CACHE_TTL = 0
+    DM_SETTLED_FRAMEWORK_CACHE_TTL = 0
+    DM_DRAFTS_CACHE_TTL = 0
+    DM_DRAFT_SUMMARY_CACHE_TTL = 0
+    DM_BRIEF_CACHE_TTL = 0
+    DM_USER_CACHE_TTL = 0
+    DM_DECLARATION_ERRORS_CACHE_TTL = 0
+    DM_COMMUNICATIONS_CACHE_TTL = 0
+    DM_COUNTERSIGNED_AGREEMENT_CACHE_TTL = 0
+    DM_MISSING_COUNTERSIGNED_AGREEMENT_CACHE_TTL = 0
+    DM_SIGNED_URL_CACHE_TTL = 0
+
     SECRET_KEY = 'not_very_secret'
 
     DM_SUBMISSIONS_BUCKET = 'digitalmarketplace-submissions-dev-dev'
@@ -134,6 +190,8 @@ class Live(Config):
 
     DM_FRAMEWORK_AGREEMENTS_EMAIL = 'enquiries@digitalmarketplace.service.gov.uk'
 
+    DM_PRELOAD_CONTENT_FRAMEWORKS = ['g-cloud-8', 'digital-outcomes-and-specialists']
+
 
 class Preview(Live):
     pass
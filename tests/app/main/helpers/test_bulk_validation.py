@@ -0,0 +1,48 @@
+import json
+
+import six
+from nose.tools import assert_equal, assert_in, assert_raises
+
+from app.main.helpers.bulk_validation import validate_declarations
+from ...helpers import FULL_G7_SUBMISSION
+
+
+def _validate(lines):
+    output_file = six.StringIO()
+    stats = validate_declarations(
+        'g-cloud-7', six.StringIO('\n'.join(lines)), output_file, processes=2, progress_file=None)
+    return [json.loads(line) for line in output_file.getvalue().splitlines()], stats
+
+
+def test_results_are_written_in_input_order():
+    incomplete = dict(FULL_G7_SUBMISSION, status='complete')
+    del incomplete['SQ3-1i-i']
+    lines = [
+        json.dumps({'supplierId': 1, 'declaration': dict(FULL_G7_SUBMISSION, status='complete')}),
+        json.dumps({'supplierId': 2, 'declaration': incomplete}),
+    ]
+
+    results, stats = _validate(lines)
+
+    assert_equal(results, [
+        {'supplierId': 1, 'status': 'complete', 'statusChanged': False, 'errors': {}},
+        {'supplierId': 2, 'status': 'started', 'statusChanged': True, 'errors': {'SQ3-1i-i': 'answer_required'}},
+    ])
+    assert_equal(stats['declarations'], 2)
+    assert_equal(stats['complete'], 1)
+    assert_equal(stats['started'], 1)
+    assert_equal(stats['status_changed'], 1)
+
+
+def test_unreadable_lines_are_reported():
+    results, stats = _validate(['not json', '', json.dumps({'declaration': {}})])
+
+    assert_equal(len(results), 2)
+    assert_in('error', results[0])
+    assert_in('error', results[1])
+    assert_equal(stats['unreadable'], 2)
+
+
+def test_unknown_framework():
+    with assert_raises(ValueError):
+        validate_declarations('g-cloud-5', six.StringIO(''), six.StringIO(), progress_file=None)
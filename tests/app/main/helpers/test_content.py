@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+
+import mock
+from nose.tools import assert_equal, assert_raises
+from dmcontent.content_loader import ContentNotFoundError
+
+from app.main.helpers.content import LazyContentLoader
+
+
+def _content_loader():
+    content_loader = LazyContentLoader('app/content')
+    content_loader.declare_manifest('g-cloud-7', 'services', 'edit_submission')
+    content_loader.declare_manifest('g-cloud-8', 'declaration', 'declaration')
+    content_loader.declare_messages('g-cloud-7', ['dates'])
+    return content_loader
+
+
+class TestLazyContentLoader(object):
+    def setup(self):
+        self.content_loader = _content_loader()
+
+    def test_manifests_are_loaded_on_first_use(self):
+        with mock.patch.object(self.content_loader, 'load_manifest',
+                               wraps=self.content_loader.load_manifest) as load_manifest:
+            self.content_loader.get_manifest('g-cloud-7', 'edit_submission')
+            self.content_loader.get_manifest('g-cloud-7', 'edit_submission')
+
+        load_manifest.assert_called_once_with('g-cloud-7', 'services', 'edit_submission')
+
+    def test_get_builder_loads_manifests(self):
+        assert self.content_loader.get_builder('g-cloud-7', 'edit_submission').sections
+
+    def test_messages_are_loaded_on_first_use(self):
+        with mock.patch.object(self.content_loader, 'load_messages',
+                               wraps=self.content_loader.load_messages) as load_messages:
+            self.content_loader.get_message('g-cloud-7', 'dates')
+            self.content_loader.get_message('g-cloud-7', 'dates')
+
+        load_messages.assert_called_once_with('g-cloud-7', ['dates'])
+
+    def test_undeclared_manifests_are_not_found(self):
+        with assert_raises(ContentNotFoundError):
+            self.content_loader.get_manifest('g-cloud-6', 'edit_submission')
+
+    def test_warm_up_loads_declared_content_for_the_given_frameworks(self):
+        with mock.patch.object(self.content_loader, 'load_manifest') as load_manifest:
+            self.content_loader.warm_up(['g-cloud-8'])
+
+        load_manifest.assert_called_once_with('g-cloud-8', 'declaration', 'declaration')
+
+    def test_warm_up_loads_all_declared_content(self):
+        with mock.patch.object(self.content_loader, 'load_manifest') as load_manifest, \
+                mock.patch.object(self.content_loader, 'load_messages') as load_messages:
+            self.content_loader.warm_up()
+
+        assert_equal(load_manifest.call_count, 2)
+        load_messages.assert_called_once_with('g-cloud-7', ['dates'])
+
+
+class TestContentSnapshot(object):
+    def setup(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.snapshot_dir, 'content-snapshot.pickle')
+
+    def teardown(self):
+        shutil.rmtree(self.snapshot_dir)
+
+    def test_snapshot_is_loaded_instead_of_yaml(self):
+        _content_loader().save_snapshot(self.snapshot_path)
+
+        content_loader = _content_loader()
+        assert content_loader.load_snapshot(self.snapshot_path)
+        with mock.patch.object(content_loader, 'load_manifest') as load_manifest, \
+                mock.patch.object(content_loader, 'load_messages') as load_messages:
+            manifest = content_loader.get_manifest('g-cloud-7', 'edit_submission')
+            content_loader.get_message('g-cloud-7', 'dates')
+
+        assert_equal(
+            [section.id for section in manifest.sections],
+            [section.id for section in _content_loader().get_manifest('g-cloud-7', 'edit_submission').sections]
+        )
+        assert not load_manifest.called
+        assert not load_messages.called
+
+    def test_snapshot_is_ignored_if_declarations_have_changed(self):
+        _content_loader().save_snapshot(self.snapshot_path)
+
+        content_loader = _content_loader()
+        content_loader.declare_manifest('g-cloud-8', 'services', 'edit_submission')
+
+        assert not content_loader.load_snapshot(self.snapshot_path)
+
+    def test_snapshot_is_ignored_if_dmcontent_has_changed(self):
+        with mock.patch('app.main.helpers.content._dmcontent_version', return_value='1.0.2'):
+            _content_loader().save_snapshot(self.snapshot_path)
+
+        with mock.patch('app.main.helpers.content._dmcontent_version', return_value='2.0.0'):
+            assert not _content_loader().load_snapshot(self.snapshot_path)
+
+    def test_missing_snapshot_is_ignored(self):
+        assert not _content_loader().load_snapshot(self.snapshot_path)
+
+
+class TestFilteredManifests(object):
+    def setup(self):
+        self.content_loader = _content_loader()
+
+    def test_filtered_manifest_is_reused_for_drafts_in_the_same_lot(self):
+        first = self.content_loader.get_filtered_manifest(
+            'g-cloud-7', 'edit_submission', {'lot': 'scs', 'serviceName': 'One'})
+        second = self.content_loader.get_filtered_manifest(
+            'g-cloud-7', 'edit_submission', {'lot': 'scs', 'serviceName': 'Two'})
+
+        assert first is second
+
+    def test_filtered_manifest_matches_filter(self):
+        for lot in ['iaas', 'scs']:
+            filtered = self.content_loader.get_filtered_manifest('g-cloud-7', 'edit_submission', {'lot': lot})
+            expected = self.content_loader.get_manifest('g-cloud-7', 'edit_submission').filter({'lot': lot})
+
+            assert_equal(
+                [question.id for section in filtered.sections for question in section.questions],
+                [question.id for section in expected.sections for question in section.questions]
+            )
+
+    def test_drafts_in_different_lots_get_different_manifests(self):
+        scs = self.content_loader.get_filtered_manifest('g-cloud-7', 'edit_submission', {'lot': 'scs'})
+        iaas = self.content_loader.get_filtered_manifest('g-cloud-7', 'edit_submission', {'lot': 'iaas'})
+
+        assert scs is not iaas
+
+    def test_lot_is_a_dependency_field(self):
+        assert 'lot' in self.content_loader._get_dependency_fields('g-cloud-7', 'edit_submission')
+
+    def test_first_editable_section_is_reused(self):
+        section = self.content_loader.get_first_editable_section('g-cloud-7', 'edit_submission', 'scs')
+        content = self.content_loader.get_manifest('g-cloud-7', 'edit_submission').filter({'lot': 'scs'})
+
+        assert section is self.content_loader.get_first_editable_section('g-cloud-7', 'edit_submission', 'scs')
+        assert_equal(section.id, content.get_next_editable_section_id())
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import pytest
 from nose.tools import assert_equal
-from app.main.helpers.frameworks import get_statuses_for_lot
+from app.main.helpers.frameworks import get_statuses_for_lot, summarise_communications
 
 
 def get_lot_status_examples():
@@ -301,3 +301,28 @@ def test_get_status_for_lot(parameters, expected_result):
             unit_plural='labs'
         )
     )
+
+
+def test_summarise_communications():
+    key_list = [
+        {'path': 'g-cloud-7/communications/g-cloud-7-supplier-pack.zip', 'last_modified': '2015-01-01'},
+        {'path': 'g-cloud-7/communications/updates/communications/file 1.odt', 'last_modified': '2015-02-01'},
+        {'path': 'g-cloud-7/communications/updates/clarifications/file 2.odt', 'last_modified': '2015-03-01'},
+        {'path': 'g-cloud-7/communications/updates/other/file 3.odt', 'last_modified': '2015-04-01'},
+    ]
+
+    communications = summarise_communications(key_list, 'g-cloud-7')
+
+    assert_equal(communications['last_modified'], {
+        'supplier_pack': '2015-01-01',
+        'supplier_updates': '2015-04-01',
+    })
+    assert_equal(communications['updates'], {
+        'communications': [
+            {'path': 'updates/communications/file 1.odt', 'last_modified': '2015-02-01'}
+        ],
+        'clarifications': [
+            {'path': 'updates/clarifications/file 2.odt', 'last_modified': '2015-03-01'}
+        ],
+    })
+    assert_equal(key_list[1]['path'], 'g-cloud-7/communications/updates/communications/file 1.odt')
@@ -0,0 +1,255 @@
+import threading
+from io import BytesIO
+
+import mock
+from dmutils.s3 import S3ResponseError
+from nose.tools import assert_equal, assert_false, assert_is_none, assert_true
+from werkzeug.datastructures import FileStorage
+
+from app.main.helpers.uploads import (
+    AGREEMENT_CONTENT_TYPES, SERVICE_DOCUMENT_CONTENT_TYPES, BoundedUploadStream, content_matches_type,
+    file_content_matches, file_is_empty, file_is_less_than_5mb, get_direct_upload_error, get_upload_policy,
+    get_upload_size, is_service_document_path, upload_service_documents
+)
+from ...helpers import BaseApplicationTest
+
+
+def test_bounded_upload_stream_keeps_up_to_one_byte_over_the_limit():
+    stream = BoundedUploadStream(limit=10)
+    stream.write(b'x' * 8)
+    stream.write(b'y' * 8)
+    stream.seek(0)
+
+    assert_equal(stream.read(), b'x' * 8 + b'yyy')
+    assert_equal(stream.bytes_received, 16)
+    assert_true(stream.truncated)
+
+
+def test_bounded_upload_stream_under_the_limit_is_kept_whole():
+    stream = BoundedUploadStream(limit=10)
+    stream.write(b'0123456789')
+    stream.seek(0)
+
+    assert_equal(stream.read(), b'0123456789')
+    assert_false(stream.truncated)
+
+
+def test_upload_size_of_bounded_stream_counts_discarded_bytes():
+    stream = BoundedUploadStream(limit=10)
+    stream.write(b'x' * 100)
+
+    assert_equal(get_upload_size(FileStorage(stream)), 100)
+
+
+def test_upload_size_of_other_files_leaves_position_unchanged():
+    stream = BytesIO(b'0123456789')
+    stream.seek(3)
+
+    assert_equal(get_upload_size(FileStorage(stream)), 10)
+    assert_equal(stream.tell(), 3)
+
+
+def test_file_size_checks():
+    assert_true(file_is_empty(FileStorage(BytesIO(b''))))
+    assert_false(file_is_empty(FileStorage(BytesIO(b'doc'))))
+    assert_true(file_is_less_than_5mb(FileStorage(BytesIO(b'doc'))))
+
+    stream = BoundedUploadStream()
+    stream.write(b'x' * 5400000)
+    assert_false(file_is_less_than_5mb(FileStorage(stream)))
+
+
+def _open_document(content_type):
+    # A zip file header, then the name and content of an uncompressed `mimetype` entry
+    return b'PK\x03\x04' + b'\x00' * 26 + b'mimetype' + content_type.encode('ascii')
+
+
+def test_content_matches_type():
+    assert_true(content_matches_type(b'%PDF-1.4', 'application/pdf'))
+    assert_true(content_matches_type(b'\xff\xd8\xff\xe0', 'image/jpeg'))
+    assert_true(content_matches_type(b'\x89PNG\r\n\x1a\n', 'image/png'))
+    assert_true(content_matches_type(
+        _open_document('application/vnd.oasis.opendocument.text'), 'application/vnd.oasis.opendocument.text'))
+
+    assert_false(content_matches_type(b'MZ\x90\x00', 'application/pdf'))
+    assert_false(content_matches_type(b'%PDF-1.4', 'image/png'))
+    assert_false(content_matches_type(b'PK\x03\x04' + b'\x00' * 60, 'application/vnd.oasis.opendocument.text'))
+    assert_false(content_matches_type(
+        _open_document('application/vnd.oasis.opendocument.spreadsheet'), 'application/vnd.oasis.opendocument.text'))
+
+
+def test_file_content_matches_extension_and_leaves_position_unchanged():
+    stream = BytesIO(b'%PDF-1.4 doc')
+    stream.seek(3)
+
+    assert_true(file_content_matches(FileStorage(stream, 'document.pdf'), SERVICE_DOCUMENT_CONTENT_TYPES))
+    assert_equal(stream.tell(), 3)
+    assert_false(file_content_matches(FileStorage(stream, 'document.odt'), SERVICE_DOCUMENT_CONTENT_TYPES))
+    assert_false(file_content_matches(FileStorage(stream, 'document.pdf.exe'), SERVICE_DOCUMENT_CONTENT_TYPES))
+    assert_true(file_content_matches(
+        FileStorage(BytesIO(b'\x89PNG\r\n\x1a\n'), 'agreement.PNG'), AGREEMENT_CONTENT_TYPES))
+
+
+@mock.patch('dmutils.s3.S3')
+class TestUploadServiceDocuments(BaseApplicationTest):
+    service = {'id': 1, 'supplierId': 1234, 'frameworkSlug': 'g-cloud-7'}
+    fields = ['pricingDocumentURL', 'sfiaRateDocumentURL', 'termsAndConditionsDocumentURL']
+
+    def _upload(self, request_files):
+        section = mock.Mock()
+        section.get_field_names.return_value = self.fields
+
+        with self.app.test_request_context('/'):
+            return upload_service_documents(
+                'submissions-bucket', 'http://localhost/assets/', self.service, request_files, section, public=False)
+
+    def _files(self, fields, filename='document.pdf', content=b'%PDF-1.4 doc'):
+        return dict((field, FileStorage(BytesIO(content), filename)) for field in fields)
+
+    def test_documents_are_uploaded_at_the_same_time(self, S3):
+        S3.return_value.bucket_short_name = 'submissions'
+        both_uploading = threading.Event()
+        uploading = []
+
+        def save(path, file, acl):
+            uploading.append(path)
+            if len(uploading) == 2:
+                both_uploading.set()
+            assert_true(both_uploading.wait(5))
+        S3.return_value.save.side_effect = save
+
+        urls, errors = self._upload(self._files(['pricingDocumentURL', 'termsAndConditionsDocumentURL']))
+
+        assert_equal(errors, {})
+        assert_equal(sorted(urls), ['pricingDocumentURL', 'termsAndConditionsDocumentURL'])
+        for url in urls.values():
+            assert_true(url.startswith('http://localhost/assets/g-cloud-7/submissions/1234/1-'))
+
+    def test_failed_uploads_are_reported_by_field(self, S3):
+        S3.return_value.bucket_short_name = 'submissions'
+        request_files = self._files(['pricingDocumentURL', 'sfiaRateDocumentURL'])
+
+        def save(path, file, acl):
+            if file is request_files['sfiaRateDocumentURL']:
+                raise S3ResponseError(500, 'Fail')
+        S3.return_value.save.side_effect = save
+
+        urls, errors = self._upload(request_files)
+
+        assert_equal(errors, {'sfiaRateDocumentURL': 'file_can_be_saved'})
+
+    def test_uploads_that_take_too_long_are_reported_by_field(self, S3):
+        S3.return_value.bucket_short_name = 'submissions'
+        self.app.config['DM_UPLOAD_TIMEOUT'] = 0.05
+        finish_upload = threading.Event()
+        S3.return_value.save.side_effect = lambda path, file, acl: finish_upload.wait(5)
+
+        try:
+            urls, errors = self._upload(self._files(['pricingDocumentURL']))
+        finally:
+            finish_upload.set()
+
+        assert_equal(errors, {'pricingDocumentURL': 'file_can_be_saved'})
+
+    def test_invalid_documents_are_not_uploaded(self, S3):
+        urls, errors = self._upload(self._files(['pricingDocumentURL'], filename='document.exe'))
+
+        assert_is_none(urls)
+        assert_equal(list(errors), ['pricingDocumentURL'])
+        assert_false(S3.return_value.save.called)
+
+    def test_documents_that_are_not_what_their_extension_says_are_not_uploaded(self, S3):
+        urls, errors = self._upload(self._files(['pricingDocumentURL'], content=b'MZ\x90\x00'))
+
+        assert_is_none(urls)
+        assert_equal(errors, {'pricingDocumentURL': 'file_is_open_document_format'})
+        assert_false(S3.return_value.save.called)
+
+    def test_oversized_documents_are_not_read(self, S3):
+        stream = BoundedUploadStream()
+        stream.write(b'x' * 6000000)
+        stream.read = mock.Mock(side_effect=AssertionError("Oversized upload was read"))
+
+        urls, errors = self._upload({'pricingDocumentURL': FileStorage(stream, 'document.pdf')})
+
+        assert_is_none(urls)
+        assert_equal(errors, {'pricingDocumentURL': 'file_is_less_than_5mb'})
+        assert_false(stream.read.called)
+        assert_false(S3.return_value.save.called)
+
+
+def test_service_document_paths_must_be_for_the_service_and_field():
+    service = {'id': 1, 'supplierId': 1234, 'frameworkSlug': 'g-cloud-7'}
+    path = 'g-cloud-7/submissions/1234/1-pricing-document-2015-01-02-0304.pdf'
+
+    assert_true(is_service_document_path(service, 'pricingDocumentURL', path))
+    assert_false(is_service_document_path(service, 'serviceDefinitionDocumentURL', path))
+    assert_false(is_service_document_path(
+        service, 'pricingDocumentURL', 'g-cloud-7/submissions/1234/12-pricing-document-2015-01-02-0304.pdf'))
+    assert_false(is_service_document_path(
+        service, 'pricingDocumentURL', 'g-cloud-7/submissions/1235/1-pricing-document-2015-01-02-0304.pdf'))
+    assert_false(is_service_document_path(
+        service, 'pricingDocumentURL', 'g-cloud-7/submissions/1234/1-pricing-document-x.pdf'))
+    assert_false(is_service_document_path(
+        service, 'pricingDocumentURL', 'g-cloud-7/submissions/1234/1-pricing-document-2015-01-02-0304.exe'))
+
+
+@mock.patch('dmutils.s3.S3')
+def test_upload_policy_limits_the_size_and_content_type(S3):
+    build_post_form_args = S3.return_value.bucket.connection.build_post_form_args
+    build_post_form_args.return_value = {
+        'action': 'https://bucket.s3.amazonaws.com/',
+        'fields': [{'name': 'key', 'value': 'path/file.pdf'}, {'name': 'signature', 'value': 'sig'}],
+    }
+
+    policy = get_upload_policy('bucket', 'path/file.pdf', 'application/pdf', 600, download_filename='file.pdf')
+
+    assert_equal(policy, {
+        'url': 'https://bucket.s3.amazonaws.com/',
+        'fields': {'key': 'path/file.pdf', 'signature': 'sig'},
+    })
+    build_post_form_args.assert_called_once_with(
+        'bucket', 'path/file.pdf',
+        expires_in=600,
+        acl='private',
+        max_content_length=5399999,
+        http_method='https',
+        fields=[
+            {'name': 'Content-Type', 'value': 'application/pdf'},
+            {'name': 'Content-Disposition', 'value': 'attachment; filename="file.pdf"'},
+        ],
+        conditions=[
+            '{"Content-Type": "application/pdf"}',
+            '{"Content-Disposition": "attachment; filename=\\"file.pdf\\""}',
+        ],
+    )
+
+
+@mock.patch('dmutils.s3.S3')
+def test_direct_upload_errors(S3):
+    get_key = S3.return_value.bucket.get_key
+
+    get_key.return_value = None
+    assert_equal(get_direct_upload_error('bucket', 'path/file.pdf', SERVICE_DOCUMENT_CONTENT_TYPES),
+                 'file_can_be_saved')
+    get_key.return_value = mock.Mock(size=0)
+    assert_equal(get_direct_upload_error('bucket', 'path/file.pdf', SERVICE_DOCUMENT_CONTENT_TYPES),
+                 'file_is_empty')
+    get_key.return_value = mock.Mock(size=5400000)
+    assert_equal(get_direct_upload_error('bucket', 'path/file.pdf', SERVICE_DOCUMENT_CONTENT_TYPES),
+                 'file_is_less_than_5mb')
+    get_key.return_value = mock.Mock(size=5399999)
+    get_key.return_value.get_contents_as_string.return_value = b'MZ\x90\x00'
+    assert_equal(get_direct_upload_error('bucket', 'path/file.pdf', SERVICE_DOCUMENT_CONTENT_TYPES),
+                 'file_is_open_document_format')
+    get_key.return_value.get_contents_as_string.return_value = b'%PDF-1.4'
+    assert_is_none(get_direct_upload_error('bucket', 'path/file.pdf', SERVICE_DOCUMENT_CONTENT_TYPES))
+
+
+@mock.patch('dmutils.s3.S3')
+def test_direct_upload_content_is_checked_without_downloading_the_whole_file(S3):
+    key = S3.return_value.bucket.get_key.return_value = mock.Mock(size=5399999)
+    key.get_contents_as_string.return_value = b'\x89PNG\r\n\x1a\n'
+
+    assert_is_none(get_direct_upload_error('bucket', 'path/file.png', AGREEMENT_CONTENT_TYPES))
+    key.get_contents_as_string.assert_called_once_with(headers={'Range': 'bytes=0-99'})
@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+
+import mock
+from nose.tools import assert_equal, assert_is_none
+
+from app import cache
+from app.cache import TTLCache
+from app.main.helpers.users import load_user, invalidate_user, user_cache
+from ...helpers import BaseCacheTest
+
+
+@mock.patch('app.cache.time')
+@mock.patch('app.main.helpers.users.time')
+class TestLoadUser(BaseCacheTest):
+    caches = [user_cache]
+    cache_config = {'DM_USER_CACHE_TTL': 60}
+
+    def setup(self):
+        super(TestLoadUser, self).setup()
+        self.data_api_client = mock.Mock()
+        self.data_api_client.get_user.return_value = self.user(
+            123, "email@email.com", 1234, 'Supplier Name', 'Name')
+
+    def _set_time(self, now, *time_mocks):
+        for time_mock in time_mocks:
+            time_mock.time.return_value = now
+
+    def test_user_is_fetched_once(self, users_time, cache_time):
+        self._set_time(1000, users_time, cache_time)
+
+        with self.app.app_context():
+            load_user(self.data_api_client, u'123')
+            user = load_user(self.data_api_client, u'123')
+
+        assert_equal(user.id, 123)
+        self.data_api_client.get_user.assert_called_once_with(user_id=123)
+
+    def test_user_is_fetched_again_after_expiry(self, users_time, cache_time):
+        self._set_time(1000, users_time, cache_time)
+        with self.app.app_context():
+            load_user(self.data_api_client, u'123')
+            self._set_time(1061, users_time, cache_time)
+            load_user(self.data_api_client, u'123')
+
+        assert_equal(self.data_api_client.get_user.call_count, 2)
+
+    @mock.patch('app.main.helpers.users.threading.Thread')
+    def test_user_is_refreshed_in_background_near_expiry(self, thread, users_time, cache_time):
+        self._set_time(1000, users_time, cache_time)
+        with self.app.app_context():
+            load_user(self.data_api_client, u'123')
+            self._set_time(1050, users_time, cache_time)
+            user = load_user(self.data_api_client, u'123')
+
+        assert_equal(user.id, 123)
+        assert_equal(self.data_api_client.get_user.call_count, 1)
+        assert_equal(thread.call_args[1]['args'][2], 123)
+        thread.return_value.start.assert_called_once_with()
+
+    def test_inactive_users_are_not_loaded(self, users_time, cache_time):
+        self._set_time(1000, users_time, cache_time)
+        self.data_api_client.get_user.return_value = self.user(
+            123, "email@email.com", 1234, 'Supplier Name', 'Name', active=False)
+
+        with self.app.app_context():
+            assert_is_none(load_user(self.data_api_client, u'123'))
+            assert_is_none(load_user(self.data_api_client, u'123'))
+
+    def test_invalidated_users_are_fetched_again(self, users_time, cache_time):
+        self._set_time(1000, users_time, cache_time)
+
+        with self.app.app_context():
+            load_user(self.data_api_client, u'123')
+            invalidate_user(123)
+            load_user(self.data_api_client, u'123')
+
+        assert_equal(self.data_api_client.get_user.call_count, 2)
+
+
+class TestInvalidateUserInOtherWorkers(BaseCacheTest):
+    caches = [user_cache]
+    cache_config = {'DM_USER_CACHE_TTL': 60}
+
+    def setup(self):
+        super(TestInvalidateUserInOtherWorkers, self).setup()
+        self.flush_dir = tempfile.mkdtemp()
+        TTLCache.flush_dir = self.flush_dir
+        self.data_api_client = mock.Mock()
+        self.data_api_client.get_user.return_value = self.user(
+            123, "email@email.com", 1234, 'Supplier Name', 'Name')
+
+    def teardown(self):
+        TTLCache.flush_dir = None
+        shutil.rmtree(self.flush_dir)
+        super(TestInvalidateUserInOtherWorkers, self).teardown()
+
+    def test_deactivated_user_is_rejected_by_other_workers(self):
+        # Stands in for the user cache in another worker process
+        other_worker_cache = TTLCache('users', max_size=10000, check_invalidations=True)
+        cache._caches['users'] = user_cache
+
+        with self.app.app_context(), mock.patch('app.main.helpers.users.user_cache', other_worker_cache):
+            assert_equal(load_user(self.data_api_client, u'123').id, 123)
+
+        self.data_api_client.get_user.return_value = self.user(
+            123, "email@email.com", 1234, 'Supplier Name', 'Name', active=False)
+        invalidate_user(123)
+
+        with self.app.app_context(), mock.patch('app.main.helpers.users.user_cache', other_worker_cache):
+            assert_is_none(load_user(self.data_api_client, u'123'))
+        assert_equal(self.data_api_client.get_user.call_count, 2)
@@ -266,3 +266,12 @@ def test_character_limit_errors(content, submission):
 def test_get_validator():
     validator = get_validator({"slug": "digital-outcomes-and-specialists"}, None, None)
     assert isinstance(validator, DOSValidator)
+
+
+def test_changing_established_in_the_uk_revalidates_dependent_fields():
+    validator = DOSValidator(None, {})
+
+    assert validator.get_affected_fields(['establishedInTheUK']) == {
+        'establishedInTheUK', 'appropriateTradeRegisters', 'appropriateTradeRegistersNumber',
+        'licenceOrMemberRequired', 'licenceOrMemberRequiredDetails',
+    }
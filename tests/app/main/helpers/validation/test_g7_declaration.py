@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
-from nose.tools import assert_equal
+from nose.tools import assert_equal, assert_is
 
-from app.main.helpers.validation import G7Validator, get_validator
+from app.main.helpers.validation import G7Validator, get_field_index, get_validator
 from app.main import content_loader
 
 
@@ -264,6 +264,98 @@ def test_character_limit_errors():
         assert_equal(validator.errors(), {})
 
 
+def test_errors_can_be_limited_to_some_fields():
+    content = content_loader.get_manifest('g-cloud-7', 'declaration')
+    submission = FULL_G7_SUBMISSION.copy()
+    del submission['SQ3-1i-i']
+    submission['SQ1-1o'] = 'not an email'
+    validator = G7Validator(content, submission)
+
+    assert_equal(validator.errors(['SQ1-1o', 'SQ1-1a']), {'SQ1-1o': 'invalid_format'})
+    assert_equal(validator.errors(['SQ3-1i-i']), {'SQ3-1i-i': 'answer_required'})
+
+
+def test_page_errors_match_errors_for_the_whole_declaration():
+    content = content_loader.get_manifest('g-cloud-7', 'declaration')
+    submission = FULL_G7_SUBMISSION.copy()
+    del submission['SQ3-1i-i']
+    submission['SQ1-1o'] = 'not an email'
+    submission['SQ1-1a'] = 'a' * 5001
+    validator = G7Validator(content, submission)
+    all_errors = validator.get_error_messages()
+
+    for section in content:
+        page_ids = section.get_question_ids()
+        assert_equal(
+            list(validator.get_error_messages_for_page(section).items()),
+            [error for error in all_errors if error[0] in page_ids]
+        )
+
+
+class FakeSection(object):
+    def __init__(self, id, question_ids):
+        self.id = id
+        self.question_ids = question_ids
+
+    def get_question_ids(self):
+        return self.question_ids
+
+
+class FakeManifest(object):
+    def __init__(self, questions):
+        self.sections = [FakeSection('section', sorted(questions))]
+        self.questions = questions
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def get_question(self, question_id):
+        return self.questions[question_id]
+
+
+def test_field_indexes_are_kept_apart_for_frameworks_with_the_same_question_ids():
+    first_index = get_field_index(FakeManifest({'question': {'number': 1}}), 'first-framework')
+    second_index = get_field_index(FakeManifest({'question': {'number': 2}}), 'second-framework')
+
+    assert_equal(first_index.questions['question']['number'], 1)
+    assert_equal(second_index.questions['question']['number'], 2)
+
+
+def test_field_index_is_shared_by_copies_of_a_manifest():
+    index = get_field_index(content_loader.get_manifest('g-cloud-7', 'declaration'), 'g-cloud-7')
+
+    assert_is(get_field_index(content_loader.get_manifest('g-cloud-7', 'declaration'), 'g-cloud-7'), index)
+    assert_equal(index.fields, G7Validator(content_loader.get_manifest('g-cloud-7', 'declaration'), {}).all_fields())
+
+
+def test_revalidate_checks_fields_that_depend_on_changed_fields():
+    content = content_loader.get_manifest('g-cloud-7', 'declaration')
+    submission = FULL_G7_SUBMISSION.copy()
+    del submission['SQ1-1cii']
+    submission['SQ1-1ci'] = "something"
+    previous_errors = G7Validator(content, submission).errors()
+
+    submission['SQ1-1ci'] = "other (please specify)"
+    validator = G7Validator(content, submission)
+
+    assert_equal(validator.get_affected_fields(['SQ1-1ci']), {'SQ1-1ci', 'SQ1-1cii'})
+    assert_equal(validator.revalidate(previous_errors, ['SQ1-1ci']), validator.errors())
+    assert_equal(validator.revalidate(previous_errors, ['SQ1-1ci']), {'SQ1-1cii': 'answer_required'})
+
+
+def test_revalidate_keeps_errors_for_unchanged_fields():
+    content = content_loader.get_manifest('g-cloud-7', 'declaration')
+    submission = FULL_G7_SUBMISSION.copy()
+    del submission['SQ3-1i-i']
+    submission['SQ1-1o'] = 'not an email'
+    previous_errors = G7Validator(content, submission).errors()
+
+    submission['SQ1-1o'] = 'supplier@example.com'
+    validator = G7Validator(content, submission)
+
+    assert_equal(validator.revalidate(previous_errors, ['SQ1-1o']), {'SQ3-1i-i': 'answer_required'})
+
+
 def test_get_validator():
     validator = get_validator({"slug": "g-cloud-7"}, None, None)
     assert_equal(type(validator), G7Validator)
@@ -1,11 +1,14 @@
 # coding: utf-8
 from __future__ import unicode_literals
 
+import copy
+
 import mock
 from dmapiclient import api_stubs, HTTPError
 from dmapiclient.audit import AuditTypes
 from dmutils.email import MandrillException
-from ..helpers import BaseApplicationTest, FakeMail
+from app.main.helpers.briefs import brief_eligibility_cache, brief_responses_cache
+from ..helpers import BaseApplicationTest, BaseCacheTest, FakeMail
 from lxml import html
 
 
@@ -673,3 +676,81 @@ class TestResponseResultPage(BaseApplicationTest):
 
         assert res.status_code == 302
         assert res.location == 'http://localhost/suppliers/opportunities/1234/responses/create'
+
+
+@mock.patch("app.main.views.briefs.data_api_client")
+class TestBriefCaches(BaseCacheTest):
+    caches = [brief_eligibility_cache, brief_responses_cache]
+    cache_config = {'DM_BRIEF_CACHE_TTL': 60}
+
+    def setup(self):
+        super(TestBriefCaches, self).setup()
+        self.brief = api_stubs.brief(status='live')
+        self.brief['briefs']['essentialRequirements'] = ['Essential one', 'Essential two', 'Essential three']
+        self.brief['briefs']['niceToHaveRequirements'] = ['Nice one', 'Top one', 'Get sorted']
+
+        lots = [api_stubs.lot(slug="digital-specialists", allows_brief=True)]
+        self.framework = api_stubs.framework(status="live", slug="digital-outcomes-and-specialists",
+                                             clarification_questions_open=False, lots=lots)
+
+        with self.app.test_client():
+            self.login()
+
+    def _setup_data_api_client(self, data_api_client):
+        data_api_client.get_brief.return_value = self.brief
+        data_api_client.get_framework.return_value = self.framework
+        data_api_client.is_supplier_eligible_for_brief.return_value = True
+        data_api_client.find_brief_responses.return_value = {"briefResponses": []}
+        data_api_client.create_brief_response.return_value = {
+            'briefResponses': {"essentialRequirements": [True, False, True]}
+        }
+
+    def test_eligibility_and_responses_are_checked_once(self, data_api_client):
+        self._setup_data_api_client(data_api_client)
+
+        self.client.get('/suppliers/opportunities/1234/responses/create')
+        res = self.client.get('/suppliers/opportunities/1234/responses/create')
+
+        assert res.status_code == 200
+        data_api_client.is_supplier_eligible_for_brief.assert_called_once_with(1234, 1234)
+        data_api_client.find_brief_responses.assert_called_once_with(brief_id=1234, supplier_id=1234)
+
+    def test_submitting_a_response_updates_cached_responses(self, data_api_client):
+        self._setup_data_api_client(data_api_client)
+
+        self.client.get('/suppliers/opportunities/1234/responses/create')
+        self.client.post('/suppliers/opportunities/1234/responses/create', data=brief_form_submission)
+        res = self.client.get('/suppliers/opportunities/1234/responses/result')
+
+        assert res.status_code == 200
+        doc = html.fromstring(res.get_data(as_text=True))
+        assert doc.xpath('//h1')[0].text.strip() == "You don’t meet all the essential requirements"
+        assert data_api_client.is_supplier_eligible_for_brief.call_count == 1
+        assert data_api_client.find_brief_responses.call_count == 1
+
+    def test_shared_brief_response_section_is_not_changed(self, data_api_client):
+        self._setup_data_api_client(data_api_client)
+        self.client.get('/suppliers/opportunities/1234/responses/create')
+
+        other_brief = copy.deepcopy(self.brief)
+        other_brief['briefs']['id'] = 2345
+        other_brief['briefs']['title'] = 'Another thing'
+        other_brief['briefs']['essentialRequirements'] = ['Another essential']
+        other_brief['briefs']['niceToHaveRequirements'] = []
+        data_api_client.get_brief.return_value = other_brief
+        res = self.client.get('/suppliers/opportunities/2345/responses/create')
+
+        data = res.get_data(as_text=True)
+        assert res.status_code == 200
+        assert 'Apply for ‘Another thing’' in data
+        assert 'Essential two' not in data
+
+    def test_ineligible_suppliers_are_cached(self, data_api_client):
+        self._setup_data_api_client(data_api_client)
+        data_api_client.is_supplier_eligible_for_brief.return_value = False
+
+        self.client.get('/suppliers/opportunities/1234/responses/create')
+        res = self.client.get('/suppliers/opportunities/1234/responses/create')
+
+        assert res.status_code == 400
+        assert data_api_client.is_supplier_eligible_for_brief.call_count == 1
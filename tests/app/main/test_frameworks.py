@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import json
+import time
 try:
     from StringIO import StringIO
 except ImportError:
@@ -11,7 +13,11 @@ from dmapiclient.audit import AuditTypes
 from dmutils.email import MandrillException
 from dmutils.s3 import S3ResponseError
 
-from ..helpers import BaseApplicationTest, FULL_G7_SUBMISSION, FakeMail
+from app.main.helpers.frameworks import (
+    communications_cache, countersigned_agreements_cache, declaration_errors_cache
+)
+from app.main.helpers.services import drafts_cache, draft_summaries_cache, signed_urls_cache
+from ..helpers import BaseApplicationTest, BaseCacheTest, FULL_G7_SUBMISSION, FakeMail, empty_g7_draft
 
 
 def _return_fake_s3_file_dict(directory, filename, ext, last_modified=None, size=None):
@@ -528,6 +534,61 @@ class TestFrameworksDashboard(BaseApplicationTest):
             assert_not_in(u'Sign and return your framework agreement', data)
             assert_in(u'Download your countersigned framework agreement', data)
 
+    def test_last_updated_not_shown_if_listing_communications_fails(self, data_api_client, s3):
+        s3.return_value.list.side_effect = S3ResponseError(500, 'Amazon has collapsed. The internet is over.')
+
+        with self.app.test_client():
+            self.login()
+
+            data_api_client.get_framework.return_value = self.framework(status='open')
+            data_api_client.get_supplier_framework_info.return_value = self.supplier_framework()
+            res = self.client.get("/suppliers/frameworks/g-cloud-7")
+
+            assert_equal(res.status_code, 200)
+            doc = html.fromstring(res.get_data(as_text=True))
+            self._assert_last_updated_times(doc, [
+                {'text': "Download guidance and legal documentation (.zip)"},
+                {'text': "Read updates and ask clarification questions"}
+            ])
+
+    def test_last_updated_not_shown_if_listing_communications_times_out(self, data_api_client, s3):
+        self.app.config['DM_S3_FETCH_TIMEOUT'] = 0.01
+        s3.return_value.list.side_effect = lambda *args, **kwargs: time.sleep(0.5) or [
+            _return_fake_s3_file_dict('g-cloud-7/communications/', 'g-cloud-7-supplier-pack', 'zip')
+        ]
+
+        with self.app.test_client():
+            self.login()
+
+            data_api_client.get_framework.return_value = self.framework(status='open')
+            data_api_client.get_supplier_framework_info.return_value = self.supplier_framework()
+            res = self.client.get("/suppliers/frameworks/g-cloud-7")
+
+            assert_equal(res.status_code, 200)
+            doc = html.fromstring(res.get_data(as_text=True))
+            self._assert_last_updated_times(doc, [
+                {'text': "Download guidance and legal documentation (.zip)"},
+                {'text': "Read updates and ask clarification questions"}
+            ])
+
+    def test_countersigned_agreement_link_not_shown_if_check_fails(self, data_api_client, s3):
+        with self.app.test_client():
+            self.login()
+            s3.return_value.path_exists.side_effect = S3ResponseError(500, 'Amazon has collapsed.')
+            data_api_client.get_framework.return_value = self.framework(status='standstill')
+            data_api_client.find_draft_services.return_value = {
+                "services": [
+                    {'serviceName': 'A service', 'status': 'submitted', 'lotSlug': 'iaas'}
+                ]
+            }
+            data_api_client.get_supplier_framework_info.return_value = self.supplier_framework(
+                on_framework=True)
+
+            res = self.client.get("/suppliers/frameworks/g-cloud-7")
+
+            assert_equal(res.status_code, 200)
+            assert_not_in(u'Download your countersigned framework agreement', res.get_data(as_text=True))
+
 
 @mock.patch('app.main.views.frameworks.data_api_client', autospec=True)
 class TestFrameworkAgreement(BaseApplicationTest):
@@ -623,7 +684,7 @@ class TestFrameworkAgreementUpload(BaseApplicationTest):
             res = self.client.post(
                 '/suppliers/frameworks/g-cloud-7/agreement',
                 data={
-                    'agreement': (StringIO(b'doc'), 'test.pdf'),
+                    'agreement': (StringIO(b'%PDF-1.4 doc'), 'test.pdf'),
                 }
             )
 
@@ -640,7 +701,7 @@ class TestFrameworkAgreementUpload(BaseApplicationTest):
             res = self.client.post(
                 '/suppliers/frameworks/g-cloud-7/agreement',
                 data={
-                    'agreement': (StringIO(b'doc'), 'test.pdf'),
+                    'agreement': (StringIO(b'%PDF-1.4 doc'), 'test.pdf'),
                 }
             )
 
@@ -659,7 +720,7 @@ class TestFrameworkAgreementUpload(BaseApplicationTest):
             res = self.client.post(
                 '/suppliers/frameworks/g-cloud-7/agreement',
                 data={
-                    'agreement': (StringIO(b'doc'), 'test.pdf'),
+                    'agreement': (StringIO(b'%PDF-1.4 doc'), 'test.pdf'),
                 }
             )
 
@@ -679,13 +740,32 @@ class TestFrameworkAgreementUpload(BaseApplicationTest):
             res = self.client.post(
                 '/suppliers/frameworks/g-cloud-7/agreement',
                 data={
-                    'agreement': (StringIO(b'doc'), 'test.pdf'),
+                    'agreement': (StringIO(b'%PDF-1.4 doc'), 'test.pdf'),
                 }
             )
 
             assert_equal(res.status_code, 400)
             assert_in(u'Document must not be empty', res.get_data(as_text=True))
 
+    def test_page_returns_400_if_uploaded_file_is_over_the_limit(self, data_api_client, send_email, s3):
+        with self.app.test_client():
+            self.login()
+
+            data_api_client.get_framework.return_value = self.framework(status='standstill')
+            data_api_client.get_supplier_framework_info.return_value = self.supplier_framework(
+                on_framework=True)
+
+            res = self.client.post(
+                '/suppliers/frameworks/g-cloud-7/agreement',
+                data={
+                    'agreement': (StringIO(b'x' * 5400000), 'test.pdf'),
+                }
+            )
+
+            assert_equal(res.status_code, 400)
+            assert_in(u'Document must be less than 5Mb', res.get_data(as_text=True))
+            assert not s3.return_value.save.called
+
     def test_api_is_not_updated_and_email_not_sent_if_upload_fails(self, data_api_client, send_email, s3):
         with self.app.test_client():
             self.login()
@@ -698,7 +778,7 @@ class TestFrameworkAgreementUpload(BaseApplicationTest):
             res = self.client.post(
                 '/suppliers/frameworks/g-cloud-7/agreement',
                 data={
-                    'agreement': (StringIO(b'doc'), 'test.pdf'),
+                    'agreement': (StringIO(b'%PDF-1.4 doc'), 'test.pdf'),
                 }
             )
 
@@ -724,7 +804,7 @@ class TestFrameworkAgreementUpload(BaseApplicationTest):
             res = self.client.post(
                 '/suppliers/frameworks/g-cloud-7/agreement',
                 data={
-                    'agreement': (StringIO(b'doc'), 'test.pdf'),
+                    'agreement': (StringIO(b'%PDF-1.4 doc'), 'test.pdf'),
                 }
             )
 
@@ -751,7 +831,7 @@ class TestFrameworkAgreementUpload(BaseApplicationTest):
             res = self.client.post(
                 '/suppliers/frameworks/g-cloud-7/agreement',
                 data={
-                    'agreement': (StringIO(b'doc'), 'test.pdf'),
+                    'agreement': (StringIO(b'%PDF-1.4 doc'), 'test.pdf'),
                 }
             )
 
@@ -777,7 +857,7 @@ class TestFrameworkAgreementUpload(BaseApplicationTest):
             res = self.client.post(
                 '/suppliers/frameworks/g-cloud-7/agreement',
                 data={
-                    'agreement': (StringIO(b'doc'), 'test.pdf'),
+                    'agreement': (StringIO(b'%PDF-1.4 doc'), 'test.pdf'),
                 }
             )
 
@@ -801,7 +881,7 @@ class TestFrameworkAgreementUpload(BaseApplicationTest):
             res = self.client.post(
                 '/suppliers/frameworks/g-cloud-7/agreement',
                 data={
-                    'agreement': (StringIO(b'doc'), 'test.jpg'),
+                    'agreement': (StringIO(b'\xff\xd8\xff doc'), 'test.jpg'),
                 }
             )
 
@@ -814,6 +894,143 @@ class TestFrameworkAgreementUpload(BaseApplicationTest):
             assert_equal(res.status_code, 302)
             assert_equal(res.location, 'http://localhost/suppliers/frameworks/g-cloud-7/agreement')
 
+    def test_document_that_is_not_what_its_extension_says_is_not_uploaded(self, data_api_client, send_email, s3):
+        with self.app.test_client():
+            self.login()
+
+            data_api_client.get_framework.return_value = self.framework(status='standstill')
+            data_api_client.get_supplier_framework_info.return_value = self.supplier_framework(
+                on_framework=True)
+
+            res = self.client.post(
+                '/suppliers/frameworks/g-cloud-7/agreement',
+                data={
+                    'agreement': (StringIO(b'MZ\x90\x00'), 'test.pdf'),
+                }
+            )
+
+            assert_equal(res.status_code, 400)
+            assert_in(u'Document must be a PDF, JPG or PNG', res.get_data(as_text=True))
+            assert not s3.return_value.save.called
+            assert not data_api_client.register_framework_agreement_returned.called
+
+
+
+@mock.patch('dmutils.s3.S3')
+@mock.patch('app.main.frameworks.send_email')
+@mock.patch('app.main.views.frameworks.data_api_client', autospec=True)
+class TestDirectFrameworkAgreementUpload(BaseApplicationTest):
+    path = 'g-cloud-7/agreements/1234/1234-signed-framework-agreement.pdf'
+
+    def setup(self):
+        super(TestDirectFrameworkAgreementUpload, self).setup()
+        with self.app.test_client():
+            self.login()
+
+    def _set_up_supplier_framework(self, data_api_client, on_framework=True):
+        data_api_client.get_framework.return_value = self.framework(status='standstill')
+        data_api_client.get_supplier_framework_info.return_value = self.supplier_framework(
+            on_framework=on_framework)
+
+    def test_upload_policy_is_for_the_signed_agreement_path(self, data_api_client, send_email, s3):
+        self._set_up_supplier_framework(data_api_client)
+        build_post_form_args = s3.return_value.bucket.connection.build_post_form_args
+        build_post_form_args.return_value = {
+            'action': 'https://agreements.s3.amazonaws.com/',
+            'fields': [{'name': 'key', 'value': self.path}],
+        }
+
+        res = self.client.post('/suppliers/frameworks/g-cloud-7/agreement/upload-policy',
+                               data={'filename': 'agreement.pdf'})
+
+        assert_equal(res.status_code, 200)
+        assert_equal(json.loads(res.get_data(as_text=True)), {
+            'url': 'https://agreements.s3.amazonaws.com/',
+            'fields': {'key': self.path},
+        })
+        args, kwargs = build_post_form_args.call_args
+        assert_equal(args[1], self.path)
+        assert_equal(kwargs['acl'], 'private')
+        assert_in({'name': 'Content-Disposition',
+                   'value': 'attachment; filename="Supplier_Name-1234-signed-framework-agreement.pdf"'},
+                  kwargs['fields'])
+        assert_in('{"Content-Type": "application/pdf"}', kwargs['conditions'])
+
+    def test_upload_policy_is_not_given_for_other_file_types(self, data_api_client, send_email, s3):
+        self._set_up_supplier_framework(data_api_client)
+
+        res = self.client.post('/suppliers/frameworks/g-cloud-7/agreement/upload-policy',
+                               data={'filename': 'agreement.docx'})
+
+        assert_equal(res.status_code, 400)
+        assert_equal(json.loads(res.get_data(as_text=True)), {'error': 'Document must be a PDF, JPG or PNG'})
+        assert not s3.return_value.bucket.connection.build_post_form_args.called
+
+    def test_upload_policy_is_not_given_if_supplier_not_on_framework(self, data_api_client, send_email, s3):
+        self._set_up_supplier_framework(data_api_client, on_framework=False)
+
+        res = self.client.post('/suppliers/frameworks/g-cloud-7/agreement/upload-policy',
+                               data={'filename': 'agreement.pdf'})
+
+        assert_equal(res.status_code, 404)
+
+    def test_confirmed_upload_is_registered(self, data_api_client, send_email, s3):
+        self._set_up_supplier_framework(data_api_client)
+        s3.return_value.bucket.get_key.return_value = mock.Mock(size=100)
+        s3.return_value.bucket.get_key.return_value.get_contents_as_string.return_value = b'%PDF-1.4'
+
+        res = self.client.post('/suppliers/frameworks/g-cloud-7/agreement/uploaded', data={'key': self.path})
+
+        assert_equal(res.status_code, 200)
+        assert_equal(json.loads(res.get_data(as_text=True)), {'url': '/suppliers/frameworks/g-cloud-7/agreement'})
+        s3.return_value.bucket.get_key.assert_called_once_with(self.path)
+        data_api_client.register_framework_agreement_returned.assert_called_once_with(
+            1234, 'g-cloud-7', 'email@email.com')
+        assert_true(send_email.called)
+
+    def test_confirmed_upload_must_be_the_suppliers_agreement(self, data_api_client, send_email, s3):
+        self._set_up_supplier_framework(data_api_client)
+
+        res = self.client.post('/suppliers/frameworks/g-cloud-7/agreement/uploaded', data={
+            'key': 'g-cloud-7/agreements/1235/1235-signed-framework-agreement.pdf'
+        })
+
+        assert_equal(res.status_code, 400)
+        assert not data_api_client.register_framework_agreement_returned.called
+
+    def test_empty_upload_is_not_registered(self, data_api_client, send_email, s3):
+        self._set_up_supplier_framework(data_api_client)
+        s3.return_value.bucket.get_key.return_value = mock.Mock(size=0)
+
+        res = self.client.post('/suppliers/frameworks/g-cloud-7/agreement/uploaded', data={'key': self.path})
+
+        assert_equal(res.status_code, 400)
+        assert_equal(json.loads(res.get_data(as_text=True)), {'error': 'Document must not be empty'})
+        assert not data_api_client.register_framework_agreement_returned.called
+        assert not send_email.called
+
+    def test_missing_upload_is_not_registered(self, data_api_client, send_email, s3):
+        self._set_up_supplier_framework(data_api_client)
+        s3.return_value.bucket.get_key.return_value = None
+
+        res = self.client.post('/suppliers/frameworks/g-cloud-7/agreement/uploaded', data={'key': self.path})
+
+        assert_equal(res.status_code, 400)
+        assert_equal(json.loads(res.get_data(as_text=True)), {'error': 'Document could not be uploaded'})
+        assert not data_api_client.register_framework_agreement_returned.called
+
+    def test_upload_that_is_not_what_its_extension_says_is_not_registered(self, data_api_client, send_email, s3):
+        self._set_up_supplier_framework(data_api_client)
+        s3.return_value.bucket.get_key.return_value = mock.Mock(size=100)
+        s3.return_value.bucket.get_key.return_value.get_contents_as_string.return_value = b'MZ\x90\x00'
+
+        res = self.client.post('/suppliers/frameworks/g-cloud-7/agreement/uploaded', data={'key': self.path})
+
+        assert_equal(res.status_code, 400)
+        assert_equal(json.loads(res.get_data(as_text=True)), {'error': 'Document must be a PDF, JPG or PNG'})
+        assert not data_api_client.register_framework_agreement_returned.called
+        assert not send_email.called
+
 
 @mock.patch('app.main.views.frameworks.data_api_client', autospec=True)
 @mock.patch('dmutils.s3.S3')
@@ -903,6 +1120,49 @@ class TestFrameworkDocumentDownload(BaseApplicationTest):
             assert_equal(res.status_code, 404)
 
 
+@mock.patch('dmutils.s3.S3')
+class TestSignedUrlCache(BaseCacheTest):
+    caches = [signed_urls_cache]
+    cache_config = {'DM_SIGNED_URL_CACHE_TTL': 3600}
+
+    def _download_twice(self):
+        with self.app.test_client():
+            self.login()
+            self.client.get('/suppliers/frameworks/g-cloud-7/files/example.pdf')
+            return self.client.get('/suppliers/frameworks/g-cloud-7/files/example.pdf')
+
+    def test_signed_url_is_reused_until_it_nearly_expires(self, S3):
+        url = 'http://url/path?Signature=abc&Expires={}'.format(int(time.time()) + 300)
+        S3.return_value.get_signed_url.return_value = url
+
+        res = self._download_twice()
+
+        assert_equal(res.location, url.replace('http://url', 'http://asset-host'))
+        assert_equal(S3.return_value.get_signed_url.call_count, 1)
+
+    def test_signed_url_about_to_expire_is_not_reused(self, S3):
+        S3.return_value.get_signed_url.return_value = 'http://url/path?Expires={}'.format(int(time.time()) + 5)
+
+        self._download_twice()
+
+        assert_equal(S3.return_value.get_signed_url.call_count, 2)
+
+    def test_signed_url_with_sigv4_expiry_is_reused(self, S3):
+        S3.return_value.get_signed_url.return_value = 'http://url/path?X-Amz-Date={}&X-Amz-Expires=300'.format(
+            time.strftime('%Y%m%dT%H%M%SZ', time.gmtime()))
+
+        self._download_twice()
+
+        assert_equal(S3.return_value.get_signed_url.call_count, 1)
+
+    def test_signed_url_without_expiry_is_not_reused(self, S3):
+        S3.return_value.get_signed_url.return_value = 'http://url/path?param=value'
+
+        self._download_twice()
+
+        assert_equal(S3.return_value.get_signed_url.call_count, 2)
+
+
 @mock.patch('app.main.views.frameworks.data_api_client', autospec=True)
 class TestSupplierDeclaration(BaseApplicationTest):
     def test_get_with_no_previous_answers(self, data_api_client):
@@ -1028,6 +1288,127 @@ class TestSupplierDeclaration(BaseApplicationTest):
             assert not data_api_client.set_supplier_declaration.called
 
 
+@mock.patch('app.main.views.frameworks.data_api_client')
+@mock.patch('dmutils.s3.S3')
+class TestCommunicationsCache(BaseCacheTest):
+    caches = [communications_cache]
+    cache_config = {'DM_COMMUNICATIONS_CACHE_TTL': 300}
+
+    def test_communications_are_listed_once_for_dashboard_and_updates(self, s3, data_api_client):
+        s3.return_value.list.return_value = [
+            _return_fake_s3_file_dict('g-cloud-7/communications/updates/communications/', 'file 1', 'odt')
+        ]
+        data_api_client.get_framework.return_value = self.framework(status='open')
+        data_api_client.get_supplier_framework_info.return_value = self.supplier_framework()
+
+        with self.app.test_client():
+            self.login()
+
+            self.client.get('/suppliers/frameworks/g-cloud-7')
+            self.client.get('/suppliers/frameworks/g-cloud-7')
+            res = self.client.get('/suppliers/frameworks/g-cloud-7/updates')
+
+        assert_equal(res.status_code, 200)
+        assert_in(u'file 1', res.get_data(as_text=True))
+        s3.return_value.list.assert_called_once_with('g-cloud-7/communications/', load_timestamps=True)
+
+    def test_failed_listings_are_not_cached(self, s3, data_api_client):
+        s3.return_value.list.side_effect = [S3ResponseError(500, 'Amazon has collapsed.'), []]
+        data_api_client.get_framework.return_value = self.framework(status='open')
+        data_api_client.get_supplier_framework_info.return_value = self.supplier_framework()
+
+        with self.app.test_client():
+            self.login()
+
+            self.client.get('/suppliers/frameworks/g-cloud-7')
+            self.client.get('/suppliers/frameworks/g-cloud-7')
+            self.client.get('/suppliers/frameworks/g-cloud-7')
+
+        assert_equal(s3.return_value.list.call_count, 2)
+
+
+@mock.patch('app.main.views.frameworks.data_api_client')
+@mock.patch('dmutils.s3.S3')
+class TestCountersignedAgreementCache(BaseCacheTest):
+    caches = [countersigned_agreements_cache]
+    cache_config = {
+        'DM_COUNTERSIGNED_AGREEMENT_CACHE_TTL': None,
+        'DM_MISSING_COUNTERSIGNED_AGREEMENT_CACHE_TTL': 60,
+    }
+
+    def _get_dashboard_twice(self, data_api_client):
+        data_api_client.get_framework.return_value = self.framework(status='standstill')
+        data_api_client.get_supplier_framework_info.return_value = self.supplier_framework(on_framework=True)
+
+        with self.app.test_client():
+            self.login()
+            self.client.get('/suppliers/frameworks/g-cloud-7')
+            return self.client.get('/suppliers/frameworks/g-cloud-7')
+
+    def test_countersigned_agreement_is_only_looked_for_until_found(self, s3, data_api_client):
+        s3.return_value.path_exists.return_value = True
+
+        res = self._get_dashboard_twice(data_api_client)
+
+        assert_in(u'Download your countersigned framework agreement', res.get_data(as_text=True))
+        assert_equal(s3.return_value.path_exists.call_count, 1)
+
+    def test_missing_countersigned_agreement_is_cached_briefly(self, s3, data_api_client):
+        s3.return_value.path_exists.return_value = False
+
+        self._get_dashboard_twice(data_api_client)
+
+        assert_equal(s3.return_value.path_exists.call_count, 1)
+
+    def test_missing_countersigned_agreement_is_not_cached_if_ttl_is_zero(self, s3, data_api_client):
+        self.app.config['DM_MISSING_COUNTERSIGNED_AGREEMENT_CACHE_TTL'] = 0
+        s3.return_value.path_exists.return_value = False
+
+        self._get_dashboard_twice(data_api_client)
+
+        assert_equal(s3.return_value.path_exists.call_count, 2)
+
+
+@mock.patch('app.main.views.frameworks.data_api_client', autospec=True)
+class TestDeclarationErrorsCache(BaseCacheTest):
+    caches = [declaration_errors_cache]
+    cache_config = {'DM_DECLARATION_ERRORS_CACHE_TTL': 3600}
+
+    def _post_section(self, data_api_client, saved_answers):
+        data_api_client.get_supplier_declaration.return_value = {"declaration": saved_answers}
+        res = self.client.post(
+            '/suppliers/frameworks/g-cloud-7/declaration/grounds-for-discretionary-exclusion',
+            data=FULL_G7_SUBMISSION)
+        assert_equal(res.status_code, 302)
+        return data_api_client.set_supplier_declaration.call_args[0][2]
+
+    @mock.patch('app.main.helpers.validation.G7Validator.revalidate')
+    def test_saving_again_only_revalidates_changed_fields(self, revalidate, data_api_client):
+        revalidate.return_value = {}
+        with self.app.test_client():
+            self.login()
+            data_api_client.get_framework.return_value = self.framework(status='open')
+
+            saved_answers = self._post_section(data_api_client, dict(FULL_G7_SUBMISSION, status='started'))
+            assert not revalidate.called
+
+            saved_answers = self._post_section(data_api_client, saved_answers)
+            assert_equal(revalidate.call_count, 1)
+            assert_equal(saved_answers['status'], 'complete')
+
+    @mock.patch('app.main.helpers.validation.G7Validator.revalidate')
+    def test_declaration_changed_elsewhere_is_validated_in_full(self, revalidate, data_api_client):
+        with self.app.test_client():
+            self.login()
+            data_api_client.get_framework.return_value = self.framework(status='open')
+
+            self._post_section(data_api_client, dict(FULL_G7_SUBMISSION, status='started'))
+            saved_answers = self._post_section(data_api_client, dict(FULL_G7_SUBMISSION, PR1=False))
+
+            assert not revalidate.called
+            assert_equal(saved_answers['status'], 'complete')
+
+
 @mock.patch('app.main.views.frameworks.data_api_client')
 @mock.patch('dmutils.s3.S3')
 class TestFrameworkUpdatesPage(BaseApplicationTest):
@@ -1428,7 +1809,7 @@ class TestSendClarificationQuestionEmail(BaseApplicationTest):
 
 
 @mock.patch('app.main.views.frameworks.data_api_client', autospec=True)
-@mock.patch('app.main.views.frameworks.count_unanswered_questions')
+@mock.patch('app.main.helpers.services.count_unanswered_questions')
 class TestG7ServicesList(BaseApplicationTest):
 
     def test_404_when_g7_pending_and_no_complete_services(self, count_unanswered, data_api_client):
@@ -1645,3 +2026,84 @@ class TestG7ServicesList(BaseApplicationTest):
 
         assert_in(u'Submitted', submissions.get_data(as_text=True))
         assert_not_in(u'Apply to provide', submissions.get_data(as_text=True))
+
+
+@mock.patch('app.main.views.services.data_api_client', autospec=True)
+@mock.patch('app.main.views.frameworks.data_api_client', autospec=True)
+class TestDraftsCache(BaseCacheTest):
+    caches = [drafts_cache]
+    cache_config = {'DM_DRAFTS_CACHE_TTL': 60}
+
+    def setup(self):
+        super(TestDraftsCache, self).setup()
+        with self.app.test_client():
+            self.login()
+
+    def _setup_api_clients(self, frameworks_api_client, services_api_client):
+        for api_client in (frameworks_api_client, services_api_client):
+            api_client.get_framework.return_value = self.framework(status='open')
+            api_client.get_supplier_declaration.return_value = {'declaration': FULL_G7_SUBMISSION}
+            api_client.find_draft_services.return_value = {'services': [empty_g7_draft()]}
+            api_client.get_draft_service.return_value = {'services': empty_g7_draft()}
+
+    def test_drafts_are_fetched_once(self, frameworks_api_client, services_api_client):
+        self._setup_api_clients(frameworks_api_client, services_api_client)
+
+        self.client.get('/suppliers/frameworks/g-cloud-7/submissions')
+        res = self.client.get('/suppliers/frameworks/g-cloud-7/submissions')
+
+        assert_equal(res.status_code, 200)
+        assert_equal(frameworks_api_client.find_draft_services.call_count, 1)
+
+    def test_drafts_are_fetched_again_after_completing_a_draft(self, frameworks_api_client, services_api_client):
+        self._setup_api_clients(frameworks_api_client, services_api_client)
+
+        self.client.get('/suppliers/frameworks/g-cloud-7/submissions')
+        self.client.post('/suppliers/frameworks/g-cloud-7/submissions/scs/1/complete')
+        self.client.get('/suppliers/frameworks/g-cloud-7/submissions')
+
+        assert_equal(frameworks_api_client.find_draft_services.call_count, 2)
+
+    def test_drafts_are_cached_per_framework(self, frameworks_api_client, services_api_client):
+        self._setup_api_clients(frameworks_api_client, services_api_client)
+        frameworks_api_client.get_framework.side_effect = lambda slug: self.framework(slug=slug, status='open')
+
+        self.client.get('/suppliers/frameworks/g-cloud-7/submissions')
+        self.client.get('/suppliers/frameworks/digital-outcomes-and-specialists/submissions')
+
+        assert_equal(frameworks_api_client.find_draft_services.call_count, 2)
+
+
+@mock.patch('app.main.helpers.services.count_unanswered_questions')
+@mock.patch('app.main.views.frameworks.data_api_client', autospec=True)
+class TestDraftSummariesCache(BaseCacheTest):
+    caches = [draft_summaries_cache]
+    cache_config = {'DM_DRAFT_SUMMARY_CACHE_TTL': 60}
+
+    def setup(self):
+        super(TestDraftSummariesCache, self).setup()
+        with self.app.test_client():
+            self.login()
+
+    def _find_draft_services(self, updated_at):
+        return {'services': [
+            {'id': 1, 'serviceName': 'draft', 'lotSlug': 'scs', 'status': 'not-submitted', 'updatedAt': updated_at},
+            {'id': 2, 'serviceName': 'draft', 'lotSlug': 'scs', 'status': 'submitted', 'updatedAt': updated_at},
+        ]}
+
+    def test_summaries_are_reused_until_a_draft_is_updated(self, data_api_client, count_unanswered):
+        count_unanswered.return_value = 3, 1
+        data_api_client.get_framework.return_value = self.framework(status='open')
+        data_api_client.find_draft_services.return_value = self._find_draft_services('2016-01-01T00:00:00.000000Z')
+
+        self.client.get('/suppliers/frameworks/g-cloud-7/submissions/scs')
+        res = self.client.get('/suppliers/frameworks/g-cloud-7/submissions/scs')
+
+        assert_equal(res.status_code, 200)
+        assert_in(u'4 unanswered questions', res.get_data(as_text=True))
+        assert_equal(count_unanswered.call_count, 2)
+
+        data_api_client.find_draft_services.return_value = self._find_draft_services('2016-01-02T00:00:00.000000Z')
+        self.client.get('/suppliers/frameworks/g-cloud-7/submissions/scs')
+
+        assert_equal(count_unanswered.call_count, 4)
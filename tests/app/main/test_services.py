@@ -6,6 +6,7 @@ except ImportError:
 
 from dmapiclient import HTTPError
 import copy
+import json
 import mock
 import pytest
 from lxml import html
@@ -799,7 +800,7 @@ class TestEditDraftService(BaseApplicationTest):
             res = self.client.post(
                 '/suppliers/frameworks/g-cloud-7/submissions/scs/1/edit/service-definition',
                 data={
-                    'serviceDefinitionDocumentURL': (StringIO(b'doc'), 'document.pdf'),
+                    'serviceDefinitionDocumentURL': (StringIO(b'%PDF-1.4 doc'), 'document.pdf'),
                 }
             )
 
@@ -824,8 +825,8 @@ class TestEditDraftService(BaseApplicationTest):
             '/suppliers/frameworks/g-cloud-7/submissions/scs/1/edit/service-definition',
             data={
                 'serviceDefinitionDocumentURL': (StringIO(b''), 'document.pdf'),
-                'unknownDocumentURL': (StringIO(b'doc'), 'document.pdf'),
-                'pricingDocumentURL': (StringIO(b'doc'), 'document.pdf'),
+                'unknownDocumentURL': (StringIO(b'%PDF-1.4 doc'), 'document.pdf'),
+                'pricingDocumentURL': (StringIO(b'%PDF-1.4 doc'), 'document.pdf'),
             })
 
         assert_equal(res.status_code, 302)
@@ -1164,6 +1165,156 @@ class TestEditDraftService(BaseApplicationTest):
         assert_equal(res.status_code, 504)
 
 
+@mock.patch('dmutils.s3.S3')
+@mock.patch('app.main.views.services.data_api_client')
+class TestDirectSectionDocumentUpload(BaseApplicationTest):
+    section_url = '/suppliers/frameworks/g-cloud-7/submissions/scs/1/edit/service-definition'
+    path = 'g-cloud-7/submissions/1234/1-service-definition-document-2015-01-02-0304.pdf'
+
+    def setup(self):
+        super(TestDirectSectionDocumentUpload, self).setup()
+        with self.app.test_client():
+            self.login()
+
+    def _set_up_draft(self, data_api_client):
+        data_api_client.get_framework.return_value = self.framework(status='open')
+        data_api_client.get_draft_service.return_value = {'services': empty_g7_draft()}
+
+    def test_upload_policy_is_for_the_document_path(self, data_api_client, s3):
+        self._set_up_draft(data_api_client)
+        build_post_form_args = s3.return_value.bucket.connection.build_post_form_args
+        build_post_form_args.return_value = {
+            'action': 'https://submissions.s3.amazonaws.com/',
+            'fields': [{'name': 'key', 'value': self.path}, {'name': 'policy', 'value': 'abc'}],
+        }
+
+        with freeze_time('2015-01-02 03:04:05'):
+            res = self.client.post(self.section_url + '/upload-policy', data={
+                'field': 'serviceDefinitionDocumentURL',
+                'filename': 'document.pdf',
+            })
+
+        assert_equal(res.status_code, 200)
+        assert_equal(json.loads(res.get_data(as_text=True)), {
+            'url': 'https://submissions.s3.amazonaws.com/',
+            'fields': {'key': self.path, 'policy': 'abc'},
+        })
+        args, kwargs = build_post_form_args.call_args
+        assert_equal(args, ('digitalmarketplace-submissions-dev-dev', self.path))
+        assert_equal(kwargs['acl'], 'private')
+        assert_equal(kwargs['max_content_length'], 5399999)
+        assert_in('{"Content-Type": "application/pdf"}', kwargs['conditions'])
+
+    def test_upload_policy_is_not_given_for_other_file_types(self, data_api_client, s3):
+        self._set_up_draft(data_api_client)
+
+        res = self.client.post(self.section_url + '/upload-policy', data={
+            'field': 'serviceDefinitionDocumentURL',
+            'filename': 'document.exe',
+        })
+
+        assert_equal(res.status_code, 400)
+        assert_equal(json.loads(res.get_data(as_text=True)),
+                     {'errors': {'serviceDefinitionDocumentURL': 'file_is_open_document_format'}})
+        assert not s3.return_value.bucket.connection.build_post_form_args.called
+
+    def test_upload_policy_is_not_given_for_fields_not_in_the_section(self, data_api_client, s3):
+        self._set_up_draft(data_api_client)
+
+        res = self.client.post(self.section_url + '/upload-policy', data={
+            'field': 'pricingDocumentURL',
+            'filename': 'document.pdf',
+        })
+
+        assert_equal(res.status_code, 400)
+
+    def test_upload_policy_is_not_given_for_questions_that_are_not_uploads(self, data_api_client, s3):
+        self._set_up_draft(data_api_client)
+
+        res = self.client.post(
+            '/suppliers/frameworks/g-cloud-7/submissions/scs/1/edit/service-description/upload-policy',
+            data={'field': 'serviceSummary', 'filename': 'document.pdf'})
+
+        assert_equal(res.status_code, 400)
+        assert not s3.return_value.bucket.connection.build_post_form_args.called
+
+    def test_upload_policy_is_not_given_for_another_suppliers_draft(self, data_api_client, s3):
+        self._set_up_draft(data_api_client)
+        data_api_client.get_draft_service.return_value['services']['supplierId'] = 1235
+
+        res = self.client.post(self.section_url + '/upload-policy', data={
+            'field': 'serviceDefinitionDocumentURL',
+            'filename': 'document.pdf',
+        })
+
+        assert_equal(res.status_code, 404)
+
+    def test_confirmed_upload_is_saved_to_the_draft(self, data_api_client, s3):
+        self._set_up_draft(data_api_client)
+        s3.return_value.bucket.get_key.return_value = mock.Mock(size=100)
+        s3.return_value.bucket.get_key.return_value.get_contents_as_string.return_value = b'%PDF-1.4'
+
+        res = self.client.post(self.section_url + '/uploaded', data={
+            'field': 'serviceDefinitionDocumentURL',
+            'key': self.path,
+        })
+
+        assert_equal(res.status_code, 200)
+        s3.return_value.bucket.get_key.assert_called_once_with(self.path)
+        data_api_client.update_draft_service.assert_called_once_with(
+            '1',
+            {'serviceDefinitionDocumentURL': 'http://localhost/suppliers/assets/' + self.path},
+            'email@email.com',
+            page_questions=['serviceDefinitionDocumentURL']
+        )
+
+    def test_confirmed_upload_must_be_for_the_draft(self, data_api_client, s3):
+        self._set_up_draft(data_api_client)
+
+        res = self.client.post(self.section_url + '/uploaded', data={
+            'field': 'serviceDefinitionDocumentURL',
+            'key': 'g-cloud-7/submissions/1235/1-service-definition-document-2015-01-02-0304.pdf',
+        })
+
+        assert_equal(res.status_code, 400)
+        assert not data_api_client.update_draft_service.called
+
+    def test_confirmed_upload_must_be_for_the_field(self, data_api_client, s3):
+        self._set_up_draft(data_api_client)
+
+        res = self.client.post(self.section_url + '/uploaded', data={
+            'field': 'serviceDefinitionDocumentURL',
+            'key': 'g-cloud-7/submissions/1234/1-pricing-document-2015-01-02-0304.pdf',
+        })
+
+        assert_equal(res.status_code, 400)
+        assert not data_api_client.update_draft_service.called
+
+    def test_confirmed_upload_must_be_for_an_upload_question(self, data_api_client, s3):
+        self._set_up_draft(data_api_client)
+
+        res = self.client.post(
+            '/suppliers/frameworks/g-cloud-7/submissions/scs/1/edit/service-description/uploaded',
+            data={'field': 'serviceSummary', 'key': self.path})
+
+        assert_equal(res.status_code, 400)
+        assert not data_api_client.update_draft_service.called
+
+    def test_missing_upload_is_not_saved_to_the_draft(self, data_api_client, s3):
+        self._set_up_draft(data_api_client)
+        s3.return_value.bucket.get_key.return_value = None
+
+        res = self.client.post(self.section_url + '/uploaded', data={
+            'field': 'serviceDefinitionDocumentURL',
+            'key': self.path,
+        })
+
+        assert_equal(res.status_code, 400)
+        assert_equal(json.loads(res.get_data(as_text=True)),
+                     {'errors': {'serviceDefinitionDocumentURL': 'file_can_be_saved'}})
+        assert not data_api_client.update_draft_service.called
+
+
 @mock.patch('app.main.views.services.data_api_client')
 class TestShowDraftService(BaseApplicationTest):
 
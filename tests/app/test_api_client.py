@@ -0,0 +1,363 @@
+import threading
+
+import mock
+import requests_mock
+from dmapiclient import HTTPError
+from nose.tools import assert_equal, assert_false, assert_is, assert_raises, assert_true
+
+from app.api_client import DataAPIClient, _InFlightCall, frameworks_cache
+from app.parallel import gather, submit
+from .helpers import BaseApplicationTest, BaseCacheTest
+
+
+@mock.patch('app.api_client.DataAPIClient._send_request')
+class TestRequestCache(BaseApplicationTest):
+    def setup(self):
+        super(TestRequestCache, self).setup()
+        self.api_client = DataAPIClient('http://baseurl', 'auth-token')
+
+    def test_repeated_reads_are_only_requested_once(self, _request):
+        _request.return_value = {'frameworks': {'slug': 'g-cloud-7'}}
+
+        with self.app.test_request_context('/'):
+            self.api_client.get_framework('g-cloud-7')
+            framework = self.api_client.get_framework('g-cloud-7')
+
+        assert_equal(framework, {'frameworks': {'slug': 'g-cloud-7'}})
+        assert_equal(_request.call_count, 1)
+
+    def test_reads_are_keyed_on_url_and_params(self, _request):
+        _request.return_value = {'services': []}
+
+        with self.app.test_request_context('/'):
+            self.api_client.find_draft_services(1234, framework='g-cloud-7')
+            self.api_client.find_draft_services(1234, framework='g-cloud-8')
+            self.api_client.find_draft_services(1234, framework='g-cloud-7')
+
+        assert_equal(_request.call_count, 2)
+
+    def test_cached_responses_are_copied(self, _request):
+        _request.return_value = {'frameworks': {'slug': 'g-cloud-7'}}
+
+        with self.app.test_request_context('/'):
+            self.api_client.get_framework('g-cloud-7')['frameworks']['slug'] = 'changed'
+            framework = self.api_client.get_framework('g-cloud-7')
+
+        assert_equal(framework['frameworks']['slug'], 'g-cloud-7')
+
+    def test_writes_clear_the_cache(self, _request):
+        _request.return_value = {'frameworks': {'slug': 'g-cloud-7'}}
+
+        with self.app.test_request_context('/'):
+            self.api_client.get_framework('g-cloud-7')
+            self.api_client.register_framework_interest(1234, 'g-cloud-7', 'user@example.com')
+            self.api_client.get_framework('g-cloud-7')
+
+        assert_equal(_request.call_count, 3)
+
+    def test_cache_does_not_outlive_the_request(self, _request):
+        _request.return_value = {'frameworks': {'slug': 'g-cloud-7'}}
+
+        with self.app.test_request_context('/'):
+            self.api_client.get_framework('g-cloud-7')
+        with self.app.test_request_context('/'):
+            self.api_client.get_framework('g-cloud-7')
+
+        assert_equal(_request.call_count, 2)
+
+    def test_identical_parallel_reads_in_a_request_share_its_cache(self, _request):
+        _request.return_value = {'frameworks': {'slug': 'g-cloud-7', 'status': 'open'}}
+
+        with self.app.test_request_context('/') as ctx:
+            frameworks = gather(
+                submit(self.api_client.get_framework, 'g-cloud-7'),
+                submit(self.api_client.get_framework, 'g-cloud-7'),
+            )
+            self.api_client.get_framework('g-cloud-7')
+            cache = ctx.data_api_cache
+
+        assert_equal(frameworks, [{'frameworks': {'slug': 'g-cloud-7', 'status': 'open'}}] * 2)
+        assert_equal(_request.call_count, 1)
+        assert_equal(cache['hits'] + cache['misses'], 3)
+
+    def test_reads_outside_a_request_are_not_cached(self, _request):
+        _request.return_value = {'frameworks': {'slug': 'g-cloud-7'}}
+
+        self.api_client.get_framework('g-cloud-7')
+        self.api_client.get_framework('g-cloud-7')
+
+        assert_equal(_request.call_count, 2)
+
+
+@mock.patch('app.api_client.DataAPIClient._send_request')
+class TestCoalescedRequests(BaseApplicationTest):
+    def setup(self):
+        super(TestCoalescedRequests, self).setup()
+        self.api_client = DataAPIClient('http://baseurl', 'auth-token')
+
+        # Set when a read starts waiting for an identical one that's in flight
+        self.waiting = threading.Event()
+        wait = _InFlightCall.wait
+
+        def wait_and_signal(call):
+            self.waiting.set()
+            return wait(call)
+        self.wait_patch = mock.patch.object(_InFlightCall, 'wait', wait_and_signal)
+        self.wait_patch.start()
+
+    def teardown(self):
+        self.wait_patch.stop()
+        super(TestCoalescedRequests, self).teardown()
+
+    def _get_framework_in_threads(self, slugs):
+        results = {}
+
+        def get_framework(slug):
+            results[slug] = self.api_client.get_framework(slug)
+
+        threads = [threading.Thread(target=get_framework, args=(slug,)) for slug in slugs]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def _join(self, threads):
+        for thread in threads:
+            thread.join(5)
+            assert_false(thread.is_alive())
+
+    def test_identical_concurrent_reads_are_sent_once(self, _send_request):
+        sent = threading.Event()
+        release = threading.Event()
+
+        def send_request(method, url, **kwargs):
+            sent.set()
+            release.wait(5)
+            return {'frameworks': {'slug': 'g-cloud-7', 'status': 'open'}}
+        _send_request.side_effect = send_request
+
+        threads, results = self._get_framework_in_threads(['g-cloud-7'])
+        assert_true(sent.wait(5))
+        more_threads, more_results = self._get_framework_in_threads(['g-cloud-7'])
+        assert_true(self.waiting.wait(5))
+        release.set()
+        self._join(threads + more_threads)
+
+        assert_equal(_send_request.call_count, 1)
+        assert_equal(self.api_client.coalesced, 1)
+        assert_equal(more_results['g-cloud-7'], {'frameworks': {'slug': 'g-cloud-7', 'status': 'open'}})
+
+    def test_different_reads_are_not_coalesced(self, _send_request):
+        _send_request.side_effect = lambda method, url, **kwargs: {
+            'frameworks': {'slug': url.split('/')[-1], 'status': 'open'}}
+
+        threads, results = self._get_framework_in_threads(['g-cloud-7', 'g-cloud-8'])
+        self._join(threads)
+
+        assert_equal(_send_request.call_count, 2)
+        assert_equal(results['g-cloud-8'], {'frameworks': {'slug': 'g-cloud-8', 'status': 'open'}})
+
+    def test_waiting_reads_get_the_error(self, _send_request):
+        sent = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def send_request(method, url, **kwargs):
+            sent.set()
+            release.wait(5)
+            raise ValueError('fail')
+        _send_request.side_effect = send_request
+
+        def get_framework():
+            try:
+                self.api_client.get_framework('g-cloud-7')
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=get_framework) for _ in range(2)]
+        threads[0].start()
+        assert_true(sent.wait(5))
+        threads[1].start()
+        assert_true(self.waiting.wait(5))
+        release.set()
+        self._join(threads)
+
+        assert_equal(len(errors), 2)
+        assert_equal(_send_request.call_count, 1)
+
+    def test_reads_after_a_write_do_not_wait_for_reads_sent_before_it(self, _send_request):
+        sent = threading.Event()
+        release = threading.Event()
+
+        def send_request(method, url, **kwargs):
+            if method != 'GET':
+                return {}
+            if not sent.is_set():
+                sent.set()
+                release.wait(5)
+                return {'frameworks': {'slug': 'g-cloud-7', 'status': 'open'}}
+            return {'frameworks': {'slug': 'g-cloud-7', 'status': 'pending'}}
+        _send_request.side_effect = send_request
+
+        threads, results = self._get_framework_in_threads(['g-cloud-7'])
+        try:
+            assert_true(sent.wait(5))
+            with self.app.test_request_context('/'):
+                self.api_client._request('POST', '/frameworks/g-cloud-7/interest')
+                framework = self.api_client._request('GET', '/frameworks/g-cloud-7')
+        finally:
+            release.set()
+        self._join(threads)
+
+        assert_equal(framework, {'frameworks': {'slug': 'g-cloud-7', 'status': 'pending'}})
+        assert_equal(self.api_client.coalesced, 0)
+        assert_equal(results['g-cloud-7'], {'frameworks': {'slug': 'g-cloud-7', 'status': 'open'}})
+
+
+@mock.patch('app.api_client.DataAPIClient._send_request')
+class TestFrameworkCache(BaseCacheTest):
+    caches = [frameworks_cache]
+
+    def setup(self):
+        super(TestFrameworkCache, self).setup()
+        self.api_client = DataAPIClient('http://baseurl', 'auth-token')
+        self.api_client.framework_cache_ttl = 30
+        self.api_client.settled_framework_cache_ttl = 3600
+
+    @staticmethod
+    def framework(slug='g-cloud-7', status='open', clarification_questions_open=True):
+        return {'slug': slug, 'status': status, 'clarificationQuestionsOpen': clarification_questions_open}
+
+    def test_framework_is_cached_between_requests(self, _request):
+        _request.return_value = {'frameworks': self.framework()}
+
+        self.api_client.get_framework('g-cloud-7')
+        framework = self.api_client.get_framework('g-cloud-7')
+
+        assert_equal(framework, {'frameworks': self.framework()})
+        assert_equal(_request.call_count, 1)
+
+    def test_framework_list_is_cached_between_requests(self, _request):
+        _request.return_value = {'frameworks': [self.framework(), self.framework('g-cloud-6', 'live')]}
+
+        self.api_client.find_frameworks()
+        self.api_client.find_frameworks()
+
+        assert_equal(_request.call_count, 1)
+
+    def test_frameworks_are_not_cached_if_ttl_is_zero(self, _request):
+        _request.return_value = {'frameworks': self.framework()}
+        self.api_client.framework_cache_ttl = 0
+
+        self.api_client.get_framework('g-cloud-7')
+        self.api_client.get_framework('g-cloud-7')
+
+        assert_equal(_request.call_count, 2)
+
+    @mock.patch('app.cache.time')
+    def test_open_frameworks_expire_before_live_ones(self, time, _request):
+        time.time.return_value = 1000
+        _request.side_effect = lambda method, url, **kwargs: {
+            'frameworks': self.framework(url.split('/')[-1], 'live' if url.endswith('g-cloud-6') else 'open')
+        }
+
+        self.api_client.get_framework('g-cloud-6')
+        self.api_client.get_framework('g-cloud-7')
+        time.time.return_value = 1060
+        self.api_client.get_framework('g-cloud-6')
+        self.api_client.get_framework('g-cloud-7')
+
+        assert_equal(
+            [args[1] for args, kwargs in _request.call_args_list],
+            ['/frameworks/g-cloud-6', '/frameworks/g-cloud-7', '/frameworks/g-cloud-7']
+        )
+
+    def test_flush_framework_cache(self, _request):
+        _request.return_value = {'frameworks': self.framework()}
+
+        self.api_client.get_framework('g-cloud-7')
+        self.api_client.flush_framework_cache()
+        self.api_client.get_framework('g-cloud-7')
+
+        assert_equal(_request.call_count, 2)
+
+    def test_status_change_flushes_cached_frameworks(self, _request):
+        _request.return_value = {'frameworks': [self.framework()]}
+        self.api_client.find_frameworks()
+
+        _request.return_value = {'frameworks': self.framework(status='pending')}
+        self.api_client.get_framework('g-cloud-7')
+
+        _request.return_value = {'frameworks': [self.framework(status='pending')]}
+        self.api_client.find_frameworks()
+
+        assert_equal(_request.call_count, 3)
+
+    def test_clarification_questions_closing_flushes_cached_frameworks(self, _request):
+        _request.return_value = {'frameworks': self.framework(slug='g-cloud-8')}
+        self.api_client.get_framework('g-cloud-8')
+        _request.return_value = {'frameworks': self.framework()}
+        self.api_client.get_framework('g-cloud-7')
+
+        _request.return_value = {'frameworks': [self.framework(clarification_questions_open=False)]}
+        self.api_client.find_frameworks()
+        _request.return_value = {'frameworks': self.framework(slug='g-cloud-8')}
+        self.api_client.get_framework('g-cloud-8')
+
+        assert_equal(_request.call_count, 4)
+
+
+class TestPooledTransport(BaseApplicationTest):
+    def setup(self):
+        super(TestPooledTransport, self).setup()
+        self.api_client = DataAPIClient('http://baseurl', 'auth-token')
+        self.api_client.init_app(self.app)
+
+    def test_requests_are_sent_with_auth_token(self):
+        with requests_mock.mock() as rmock:
+            rmock.get('http://baseurl/frameworks/g-cloud-7', text='{"frameworks": {"slug": "g-cloud-7"}}')
+            framework = self.api_client.get_framework('g-cloud-7')
+
+            assert_equal(framework, {'frameworks': {'slug': 'g-cloud-7'}})
+            assert_equal(rmock.last_request.headers['Authorization'], 'Bearer auth-token')
+
+    def test_errors_are_raised_as_http_errors(self):
+        with requests_mock.mock() as rmock:
+            rmock.get('http://baseurl/frameworks/g-cloud-7', status_code=404, text='{"error": "Not found"}')
+
+            with assert_raises(HTTPError):
+                self.api_client.get_framework('g-cloud-7')
+
+    def test_session_is_reused(self):
+        assert_is(self.api_client._get_session(), self.api_client._get_session())
+
+    def test_session_is_not_shared_with_forked_processes(self):
+        session = self.api_client._get_session()
+
+        with mock.patch('app.api_client.os.getpid', return_value=-1):
+            assert session is not self.api_client._get_session()
+
+    def test_pool_stats_count_requests(self):
+        with requests_mock.mock() as rmock:
+            rmock.get('http://baseurl/frameworks/g-cloud-7', text='{"frameworks": {"slug": "g-cloud-7"}}')
+            rmock.get('http://baseurl/frameworks/g-cloud-8', text='{"frameworks": {"slug": "g-cloud-8"}}')
+            self.api_client.get_framework('g-cloud-7')
+            self.api_client.get_framework('g-cloud-8')
+
+        stats = self.api_client.pool_stats()
+        assert_equal(stats['requests'], 2)
+        assert_equal(stats['in_flight'], 0)
+        assert_equal(stats['max_in_flight'], 1)
+        assert_equal(stats['saturated'], 0)
+
+    def test_pool_stats_count_requests_made_when_pool_is_in_use(self):
+        self.api_client.pool_maxsize = 2
+
+        for _ in range(3):
+            self.api_client._start_pooled_request()
+        for _ in range(3):
+            self.api_client._finish_pooled_request()
+
+        stats = self.api_client.pool_stats()
+        assert_equal(stats['saturated'], 1)
+        assert_equal(stats['max_in_flight'], 3)
+        assert_equal(stats['pool_maxsize'], 2)
@@ -0,0 +1,149 @@
+import os
+import shutil
+import tempfile
+import time
+
+import mock
+from nose.tools import assert_equal, assert_is_none, assert_raises
+
+from app.cache import TTLCache, flush_caches, get_cache_stats, invalidate_session_cache_key, session_cache_key
+from .helpers import BaseApplicationTest
+
+
+class TestTTLCache(object):
+    def setup(self):
+        self.cache = TTLCache('test-cache', max_size=2)
+
+    def test_get_returns_default_for_missing_keys(self):
+        assert_is_none(self.cache.get('missing'))
+        assert_equal(self.cache.get('missing', 'default'), 'default')
+
+    def test_values_are_copied(self):
+        value = {'key': ['value']}
+        self.cache.set('key', value, ttl=10)
+        value['key'].append('changed')
+        self.cache.get('key')['key'].append('changed')
+
+        assert_equal(self.cache.get('key'), {'key': ['value']})
+
+    @mock.patch('app.cache.time')
+    def test_entries_expire(self, time):
+        time.time.return_value = 1000
+        self.cache.set('key', 'value', ttl=10)
+
+        time.time.return_value = 1009
+        assert_equal(self.cache.get('key'), 'value')
+        time.time.return_value = 1010
+        assert_is_none(self.cache.get('key'))
+
+    @mock.patch('app.cache.time')
+    def test_entries_without_ttl_do_not_expire(self, time):
+        time.time.return_value = 1000
+        self.cache.set('key', 'value')
+
+        time.time.return_value = 10 ** 10
+        assert_equal(self.cache.get('key'), 'value')
+
+    def test_zero_ttl_disables_caching(self):
+        self.cache.set('key', 'value', ttl=0)
+
+        assert_is_none(self.cache.get('key'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        assert_equal(self.cache.get('a'), 1)
+        assert_is_none(self.cache.get('b'))
+        assert_equal(self.cache.get('c'), 3)
+
+    def test_delete_where(self):
+        self.cache.set((1, 'g-cloud-7'), 'a')
+        self.cache.set((2, 'g-cloud-7'), 'b')
+        self.cache.delete_where(lambda key: key[0] == 1)
+
+        assert_is_none(self.cache.get((1, 'g-cloud-7')))
+        assert_equal(self.cache.get((2, 'g-cloud-7')), 'b')
+
+    def test_stats(self):
+        self.cache.set('key', 'value')
+        self.cache.get('key')
+        self.cache.get('missing')
+
+        assert_equal(get_cache_stats()['test-cache'], {'size': 1, 'hits': 1, 'misses': 1})
+
+
+class TestFlushCaches(object):
+    def setup(self):
+        self.flush_dir = tempfile.mkdtemp()
+        TTLCache.flush_dir = self.flush_dir
+        self.cache = TTLCache('test-cache')
+
+    def teardown(self):
+        TTLCache.flush_dir = None
+        shutil.rmtree(self.flush_dir)
+
+    def test_flush_clears_cache_and_touches_stamp(self):
+        self.cache.set('key', 'value')
+        flush_caches(['test-cache'])
+
+        assert_is_none(self.cache.get('key'))
+        assert os.path.exists(os.path.join(self.flush_dir, 'test-cache'))
+
+    def test_cache_is_cleared_when_stamp_is_newer(self):
+        self.cache.set('key', 'value')
+        self.cache._flushed_at -= 10
+
+        # Stands in for the same cache in another worker process
+        TTLCache('test-cache')
+        flush_caches(['test-cache'])
+
+        assert_is_none(self.cache.get('key'))
+
+    def test_invalidated_entries_are_dropped_by_other_workers(self):
+        cache = TTLCache('test-cache', check_invalidations=True)
+        cache.set('key', 'value')
+
+        # Stands in for the same cache in another worker process
+        TTLCache('test-cache').invalidate('key')
+
+        assert_is_none(cache.get('key'))
+
+    def test_entries_set_after_invalidation_are_kept(self):
+        cache = TTLCache('test-cache', check_invalidations=True)
+        cache.invalidate('key')
+        cache.stamp_resolution = 0
+        time.sleep(0.01)
+        cache.set('key', 'value')
+
+        assert_equal(cache.get('key'), 'value')
+
+    def test_unknown_cache_names_are_rejected(self):
+        with assert_raises(ValueError):
+            flush_caches(['not-a-cache'])
+
+
+class TestSessionCacheKeys(BaseApplicationTest):
+    def test_invalidating_a_key_leaves_other_workers_entries_stale(self):
+        cache = TTLCache('test-cache')
+        # Stands in for the same cache in another worker process
+        other_worker_cache = TTLCache('test-cache')
+
+        with self.app.test_request_context('/'):
+            key = session_cache_key('things', 1234, 'g-cloud-7')
+            cache.set(key, 'old', ttl=10)
+            other_worker_cache.set(key, 'old', ttl=10)
+
+            invalidate_session_cache_key(cache, 'things', 1234, 'g-cloud-7')
+
+            assert_is_none(cache.get(key))
+            assert_is_none(other_worker_cache.get(session_cache_key('things', 1234, 'g-cloud-7')))
+
+    def test_keys_for_other_data_are_unchanged(self):
+        with self.app.test_request_context('/'):
+            key = session_cache_key('others', 1234)
+            invalidate_session_cache_key(TTLCache('test-cache'), 'things', 1234)
+
+            assert_equal(session_cache_key('others', 1234), key)
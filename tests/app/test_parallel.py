@@ -0,0 +1,146 @@
+import threading
+import time
+
+import mock
+from flask import current_app, request
+from nose.tools import assert_equal, assert_false, assert_not_equal, assert_raises, assert_true
+from werkzeug.exceptions import ServiceUnavailable
+
+from app.parallel import CallCancelled, submit, submit_to, gather, wait_for, wait_for_optional
+from .helpers import BaseApplicationTest
+
+
+class TestParallel(BaseApplicationTest):
+    def test_calls_run_on_other_threads(self):
+        with self.app.test_request_context('/'):
+            thread_name = submit(lambda: threading.current_thread().name).get()
+
+        assert_not_equal(thread_name, threading.current_thread().name)
+
+    def test_gather_returns_values_in_order(self):
+        with self.app.test_request_context('/'):
+            values = gather(
+                submit(lambda x: x * 2, 1),
+                submit(lambda x, y=0: x + y, 2, y=3),
+            )
+
+        assert_equal(values, [2, 5])
+
+    def test_calls_can_use_the_app_and_request_contexts(self):
+        with self.app.test_request_context('/suppliers?page=2'):
+            config_value, page = gather(
+                submit(lambda: current_app.config['DM_DATA_API_AUTH_TOKEN']),
+                submit(lambda: request.args['page']),
+            )
+
+        assert_equal(config_value, 'myToken')
+        assert_equal(page, '2')
+
+    def test_exceptions_are_raised_by_get(self):
+        def fail():
+            raise ValueError('fail')
+
+        with self.app.test_request_context('/'):
+            result = submit(fail)
+
+            with assert_raises(ValueError):
+                result.get()
+
+    def test_nested_calls_run_in_the_same_worker(self):
+        def outer():
+            return threading.current_thread().name, submit(lambda: threading.current_thread().name).get()
+
+        with self.app.test_request_context('/'):
+            outer_thread, inner_thread = submit(outer).get()
+
+        assert_equal(outer_thread, inner_thread)
+
+    def test_submit_needs_an_app_context(self):
+        with assert_raises(RuntimeError):
+            submit(lambda: None)
+
+    def test_wait_for_aborts_if_the_call_takes_too_long(self):
+        with self.app.test_request_context('/'):
+            result = submit(time.sleep, 0.5)
+
+            with assert_raises(ServiceUnavailable):
+                wait_for(result, 0.01)
+
+    def test_wait_for_optional_returns_the_value(self):
+        with self.app.test_request_context('/'):
+            value = wait_for_optional(submit(lambda: 'value'), 1, 'default', 'thing')
+
+        assert_equal(value, 'value')
+
+    def test_wait_for_optional_returns_the_default_if_the_call_takes_too_long(self):
+        with self.app.test_request_context('/'):
+            value = wait_for_optional(submit(time.sleep, 0.5), 0.01, 'default', 'thing')
+
+        assert_equal(value, 'default')
+
+    def test_wait_for_optional_returns_the_default_if_the_call_fails(self):
+        def fail():
+            raise ValueError('fail')
+
+        with self.app.test_request_context('/'):
+            value = wait_for_optional(submit(fail), 1, 'default', 'thing')
+
+        assert_equal(value, 'default')
+
+    @mock.patch.dict('app.parallel.POOL_SIZE_SETTINGS', {'test': 'TEST_POOL_SIZE'})
+    def test_calls_that_time_out_before_starting_never_run(self):
+        self.app.config['TEST_POOL_SIZE'] = 1
+        release_worker = threading.Event()
+        ran = []
+
+        with self.app.test_request_context('/'):
+            busy = submit_to('test', release_worker.wait, 5)
+            queued = submit_to('test', lambda: ran.append(request.path))
+
+            try:
+                value = wait_for_optional(queued, 0.01, 'default', 'thing')
+            finally:
+                release_worker.set()
+
+            assert_true(busy.get(5))
+            with assert_raises(CallCancelled):
+                queued.get(5)
+
+        assert_equal(value, 'default')
+        assert_equal(ran, [])
+
+    @mock.patch.dict('app.parallel.POOL_SIZE_SETTINGS', {'test': 'TEST_POOL_SIZE'})
+    def test_calls_still_waiting_when_the_request_ends_never_run(self):
+        self.app.config['TEST_POOL_SIZE'] = 1
+        release_worker = threading.Event()
+        ran = []
+
+        try:
+            with self.app.test_request_context('/'):
+                submit_to('test', release_worker.wait, 5)
+                queued = submit_to('test', lambda: ran.append(request.path))
+        finally:
+            release_worker.set()
+
+        with assert_raises(CallCancelled):
+            queued.get(5)
+        assert_equal(ran, [])
+
+    def test_late_results_are_not_used_by_the_request(self):
+        started = threading.Event()
+        finish = threading.Event()
+
+        def slow():
+            started.set()
+            assert_true(finish.wait(5))
+            return 'late'
+
+        with self.app.test_request_context('/'):
+            result = submit(slow)
+            assert_true(started.wait(5))
+            value = wait_for_optional(result, 0.01, 'default', 'thing')
+            assert_false(result.cancel())
+
+        finish.set()
+        assert_equal(result.get(5), 'late')
+        assert_equal(value, 'default')
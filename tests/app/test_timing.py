@@ -0,0 +1,47 @@
+import mock
+from dmutils import s3
+from nose.tools import assert_equal, assert_in, assert_not_in
+
+from app.timing import timer, timed, get_timings
+from .helpers import BaseApplicationTest
+
+
+class TestTiming(BaseApplicationTest):
+    @mock.patch('app.timing.time')
+    def test_calls_are_totalled_by_category(self, time):
+        time.time.side_effect = [0, 0.5, 1, 1.25, 2, 3]
+
+        @timed('s3')
+        def list_files():
+            pass
+
+        with self.app.test_request_context('/'):
+            with timer('api'):
+                pass
+            with timer('api'):
+                pass
+            list_files()
+
+            assert_equal(get_timings(), {'api': [2, 0.75], 's3': [1, 1]})
+
+    def test_calls_outside_a_request_are_not_recorded(self):
+        with timer('api'):
+            pass
+
+        with self.app.test_request_context('/'):
+            assert_equal(get_timings(), {})
+
+    def test_s3_calls_are_timed(self):
+        assert_equal(s3.S3.list.timed_category, 's3')
+
+    def test_rendering_is_reported_in_server_timing_header(self):
+        res = self.client.get('/suppliers/create')
+
+        assert_equal(res.status_code, 200)
+        assert_in('render;dur=', res.headers['Server-Timing'])
+        assert_in('desc="Templates (1 calls)"', res.headers['Server-Timing'])
+
+    def test_no_header_without_upstream_calls(self):
+        res = self.client.get('/suppliers/_status?ignore-dependencies')
+
+        assert_not_in('Server-Timing', res.headers)
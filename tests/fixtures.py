@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Test data that's also used outside the tests, eg by the benchmarks"""
+
+FULL_G7_SUBMISSION = {
+    "status": "complete",
+    "PR1": "true",
+    "PR2": "true",
+    "PR3": "true",
+    "PR4": "true",
+    "PR5": "true",
+    "SQ1-1i-i": "true",
+    "SQ2-1abcd": "true",
+    "SQ2-1e": "true",
+    "SQ2-1f": "true",
+    "SQ2-1ghijklmn": "true",
+    "SQ2-2a": "true",
+    "SQ3-1a": "true",
+    "SQ3-1b": "true",
+    "SQ3-1c": "true",
+    "SQ3-1d": "true",
+    "SQ3-1e": "true",
+    "SQ3-1f": "true",
+    "SQ3-1g": "true",
+    "SQ3-1h-i": "true",
+    "SQ3-1h-ii": "true",
+    "SQ3-1i-i": "true",
+    "SQ3-1i-ii": "true",
+    "SQ3-1j": "true",
+    "SQ3-1k": "Blah",
+    "SQ4-1a": "true",
+    "SQ4-1b": "true",
+    "SQ5-2a": "true",
+    "SQD2b": "true",
+    "SQD2d": "true",
+    "SQ1-1a": "Legal Supplier Name",
+    "SQ1-1b": "Blah",
+    "SQ1-1cii": "Blah",
+    "SQ1-1d": "Blah",
+    "SQ1-1d-i": "Blah",
+    "SQ1-1d-ii": "Blah",
+    "SQ1-1e": "Blah",
+    "SQ1-1h": "999999999",
+    "SQ1-1i-ii": "Blah",
+    "SQ1-1j-ii": "Blah",
+    "SQ1-1k": "Blah",
+    "SQ1-1n": "Blah",
+    "SQ1-1o": "Blah@example.com",
+    "SQ1-2a": "Blah",
+    "SQ1-2b": "Blah@example.com",
+    "SQ2-2b": "Blah",
+    "SQ4-1c": "Blah",
+    "SQD2c": "Blah",
+    "SQD2e": "Blah",
+    "SQ1-1ci": "public limited company",
+    "SQ1-1j-i": "licensed?",
+    "SQ1-1m": "micro",
+    "SQ1-3": "on-demand self-service. blah blah",
+    "SQ5-1a": u"Yes – your organisation has, blah blah",
+    "SQC2": [
+        "race?",
+        "sexual orientation?",
+        "disability?",
+        "age equality?",
+        "religion or belief?",
+        "gender (sex)?",
+        "gender reassignment?",
+        "marriage or civil partnership?",
+        "pregnancy or maternity?",
+        "human rights?"
+    ],
+    "SQC3": "true",
+    "SQA2": "true",
+    "SQA3": "true",
+    "SQA4": "true",
+    "SQA5": "true",
+    "AQA3": "true",
+    "SQE2a": ["as a prime contractor, using third parties (subcontractors) to provide some services"]
+}